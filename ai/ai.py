@@ -1,208 +1,217 @@
-import neat
-import pygame as pg
+import random
 
-from ui.display import *
 from snake_game.game import SnakeGame
+from snake_game.bitboard import BitboardSnakeGame
+from ai.sensing import Sensor
+from ai.network_cache import NETWORK_CACHE
+from ai.metrics import PROFILE
+from ai.episodes import EPISODES
 
 DIRECTION_MAP = {0: (0, -1), 1: (1, 0), 2: (0, 1), 3: (-1, 0)}
 
+TRAIN_GRID_WIDTH = 10
+TRAIN_GRID_HEIGHT = 10
+MAX_STEPS_WITHOUT_FOOD = 150
+MEMORY_WINDOW = 10
+# boards with at least this many cells train on BitboardSnakeGame, whose sensing stays flat as they grow
+BITBOARD_MIN_CELLS = 16 * 16
+
+class TrainingGrid:
+    """Process-wide size of the training boards.
+
+    Evaluators read it when they build games, so resize() it before training, in
+    every process that plays episodes. Pool and socket workers get the size from
+    the process that starts them.
+    """
+
+    def __init__(self, width=TRAIN_GRID_WIDTH, height=TRAIN_GRID_HEIGHT):
+        self.width = width
+        self.height = height
+
+    def resize(self, width, height):
+        if width < 3 or height < 3:
+            raise ValueError(f"Training grid must be at least 3x3, got {width}x{height}")
+        self.width = width
+        self.height = height
+
+
+TRAINING_GRID = TrainingGrid()
+
+def new_training_game(rng=None, grid_width=None, grid_height=None):
+    """A training board of TRAINING_GRID's size unless given, bitboard-backed when it is large.
+
+    Both game types play identical episodes for one rng.
+    """
+    grid_width = grid_width or TRAINING_GRID.width
+    grid_height = grid_height or TRAINING_GRID.height
+    game_type = BitboardSnakeGame if grid_width * grid_height >= BITBOARD_MIN_CELLS else SnakeGame
+    return game_type(grid_width, grid_height, rng=rng)
+
 def compute_state(game):
-    head_x, head_y = game.snake[0]
-    max_dim = max(game.grid_width, game.grid_height)
-    
-    directions_8 = {
-        "N": (0, -1),
-        "NE": (1, -1),
-        "E": (1, 0),
-        "SE": (1, 1),
-        "S": (0, 1),
-        "SW": (-1, 1),
-        "W": (-1, 0),
-        "NW": (-1, -1)
-    }
-    
-    wall_info = []
-    for dx, dy in directions_8.values():
-        steps = 0
-        x, y = head_x, head_y
-        while 0 <= x < game.grid_width and 0 <= y < game.grid_height:
-            steps += 1
-            x += dx
-            y += dy
-        wall_info.append((steps - 1) / max_dim)
-    
-    food_info = []
-    if game.food is None:
-        food_x, food_y = -1, -1
-    else:
-        food_x, food_y = game.food
-    for dx, dy in directions_8.values():
-        ratio = 0
-        diff_x = food_x - head_x
-        diff_y = food_y - head_y
-        if dx == 0 and dy != 0:
-            if diff_x == 0 and (diff_y % dy == 0):
-                r = diff_y // dy
-                if r > 0:
-                    ratio = r / max_dim
-        elif dy == 0 and dx != 0:
-            if diff_y == 0 and (diff_x % dx == 0):
-                r = diff_x // dx
-                if r > 0:
-                    ratio = r / max_dim
-        elif dx != 0 and dy != 0:
-            if diff_x % dx == 0 and diff_y % dy == 0:
-                r1 = diff_x // dx
-                r2 = diff_y // dy
-                if r1 == r2 and r1 > 0:
-                    ratio = r1 / max_dim
-        food_info.append(ratio)
-    
-    body_info = []
-    for dx, dy in directions_8.values():
-        min_ratio = None
-        for segment in game.snake[1:]:
-            diff_x = segment[0] - head_x
-            diff_y = segment[1] - head_y
-            ratio = None
-            if dx == 0 and dy != 0:
-                if diff_x == 0 and (diff_y % dy == 0):
-                    r = diff_y // dy
-                    if r > 0:
-                        ratio = r
-            elif dy == 0 and dx != 0:
-                if diff_y == 0 and (diff_x % dx == 0):
-                    r = diff_x // dx
-                    if r > 0:
-                        ratio = r
-            elif dx != 0 and dy != 0:
-                if diff_x % dx == 0 and diff_y % dy == 0:
-                    r1 = diff_x // dx
-                    r2 = diff_y // dy
-                    if r1 == r2 and r1 > 0:
-                        ratio = r1
-            if ratio is not None:
-                if min_ratio is None or ratio < min_ratio:
-                    min_ratio = ratio
-        if min_ratio is None:
-            body_info.append(0)
-        else:
-            body_info.append(min_ratio / max_dim)
-    
-    current_dir = [0, 0, 0, 0]
-    if game.direction == (0, -1):
-        current_dir[0] = 1
-    elif game.direction == (1, 0):
-        current_dir[1] = 1
-    elif game.direction == (0, 1):
-        current_dir[2] = 1
-    elif game.direction == (-1, 0):
-        current_dir[3] = 1
-    
-    tail = game.snake[-1]
-    diff_x = tail[0] - head_x
-    diff_y = tail[1] - head_y
-    tail_dir = [0, 0, 0, 0]
-    if abs(diff_x) >= abs(diff_y):
-        if diff_x > 0:
-            tail_dir[1] = 1
-        elif diff_x < 0:
-            tail_dir[3] = 1
-        else:
-            if diff_y > 0:
-                tail_dir[2] = 1
-            elif diff_y < 0:
-                tail_dir[0] = 1
-    else:
-        if diff_y > 0:
-            tail_dir[2] = 1
-        elif diff_y < 0:
-            tail_dir[0] = 1
-        else:
-            if diff_x > 0:
-                tail_dir[1] = 1
-            elif diff_x < 0:
-                tail_dir[3] = 1
-    
-    state = wall_info + food_info + body_info + current_dir + tail_dir
-    return state
+    return Sensor(game).sense()
 
 def manhattan_distance(pos1, pos2):
     """Compute Manhattan distance between two positions."""
     return abs(pos1[0] - pos2[0]) + abs(pos1[1] - pos2[1])
 
-def eval_genomes_fast(genomes, config):
-    for genome_id, genome in genomes:
-        genome.fitness = 0.0
-        net = neat.nn.FeedForwardNetwork.create(genome, config)
-        game = SnakeGame(10, 10)
-        
-        max_steps_without_food = 150
-        steps_without_food = 0
+def run_episode(net, game, actions=None):
+    """Play one training episode on game with net and return its shaped fitness.
+
+    Each move's direction index is appended to actions when one is given.
+    """
+    sense = Sensor(game).sense
+    activate = net.activate
+    update = game.update
+    if PROFILE.enabled:
+        sense = PROFILE.timed("sensing", sense)
+        activate = PROFILE.timed("activation", activate)
+        update = PROFILE.timed("simulation", update)
+    fitness = 0.0
+    steps = 0
+    steps_without_food = 0
+    recent_positions = []
+    
+    while not game.is_game_over() and steps_without_food < MAX_STEPS_WITHOUT_FOOD:
+        snake_length = len(game.snake)
+        scale_factor = max(1, 0.2 * snake_length)
         
-        recent_positions = []
-        memory_window = 10
+        # Compute Manhattan distance to food before move
+        if game.food is not None:
+            old_distance = manhattan_distance(game.snake[0], game.food)
+        else:
+            old_distance = 0
+
+        prev_score = game.score
+        state = sense()
+        output = activate(state)
+        direction_index = output.index(max(output))
+        if actions is not None:
+            actions.append(direction_index)
+        new_direction = DIRECTION_MAP.get(direction_index, game.direction)
+        game.change_direction(new_direction)
+        update()
+        steps += 1
         
-        while not game.is_game_over() and steps_without_food < max_steps_without_food:
-            snake_length = len(game.snake)
-            scale_factor = max(1, 0.2 * snake_length)
-            
-            # Compute Manhattan distance to food before move
-            if game.food is not None:
-                old_distance = manhattan_distance(game.snake[0], game.food)
-            else:
-                old_distance = 0
-
-            prev_score = game.score
-            state = compute_state(game)
-            output = net.activate(state)
-            direction_index = output.index(max(output))
-            new_direction = DIRECTION_MAP.get(direction_index, game.direction)
-            game.change_direction(new_direction)
-            game.update()
-            
-            # Compute Manhattan distance to food after move
-            if game.food is not None:
-                new_distance = manhattan_distance(game.snake[0], game.food)
-            else:
-                new_distance = 0
-                
-            if old_distance > new_distance:
-                genome.fitness += scale_factor * 0.3 * (old_distance - new_distance)
-            elif new_distance > old_distance:
-                genome.fitness -= 0.3 * (new_distance - old_distance)
-            
-            # Apply a constant step penalty
-            genome.fitness -= 0.5
+        # Compute Manhattan distance to food after move
+        if game.food is not None:
+            new_distance = manhattan_distance(game.snake[0], game.food)
+        else:
+            new_distance = 0
             
-            # Check for food consumption.
-            if game.score > prev_score:
-                genome.fitness += scale_factor * 20
-                steps_without_food = 0
-                recent_positions = []
-            else:
-                steps_without_food += 1
-
-            # Circling / Loop Detection
-            current_head = game.snake[0]
-            recent_positions.append(current_head)
-            if len(recent_positions) > memory_window:
-                recent_positions.pop(0)
-            if recent_positions.count(current_head) > 2:
-                genome.fitness -= 0.5
-
-        if game.is_game_over():
-            genome.fitness -= 24
+        if old_distance > new_distance:
+            fitness += scale_factor * 0.3 * (old_distance - new_distance)
+        elif new_distance > old_distance:
+            fitness -= 0.3 * (new_distance - old_distance)
+        
+        # Apply a constant step penalty
+        fitness -= 0.5
+        
+        # Check for food consumption.
+        if game.score > prev_score:
+            fitness += scale_factor * 20
+            steps_without_food = 0
+            recent_positions = []
+        else:
+            steps_without_food += 1
+
+        # Circling / Loop Detection
+        current_head = game.snake[0]
+        recent_positions.append(current_head)
+        if len(recent_positions) > MEMORY_WINDOW:
+            recent_positions.pop(0)
+        if recent_positions.count(current_head) > 2:
+            fitness -= 0.5
+
+    if game.is_game_over():
+        fitness -= 24
+    if PROFILE.enabled:
+        PROFILE.count("steps", steps)
+        PROFILE.count("episodes")
+    return fitness
+
+class _RecordedActions:
+    """Stands in for a network, answering each activation with the next recorded action."""
+
+    def __init__(self, actions):
+        self.actions = iter(actions.tolist())
+
+    def activate(self, state):
+        output = [0.0] * len(DIRECTION_MAP)
+        output[next(self.actions)] = 1.0
+        return output
+
+def replay_fitness(recording):
+    """Shaped fitness of a snake_game.replay.EpisodeRecording, replayed through run_episode."""
+    game = new_training_game(random.Random(recording.seed), recording.grid_width, recording.grid_height)
+    return run_episode(_RecordedActions(recording.actions()), game)
+
+def eval_genomes_fast(genomes, config):
+    record = EPISODES.enabled
+    for genome_id, genome in genomes:
+        net = NETWORK_CACHE.create(genome, config)
+        # a drawn seed keeps the episode replayable from the seed alone
+        seed = random.getrandbits(64)
+        game = new_training_game(random.Random(seed))
+        actions = bytearray() if record else None
+        genome.fitness = run_episode(net, game, actions)
+        if record:
+            EPISODES.add(genome.key, seed, game.grid_width, game.grid_height, actions, game.score)
+
+class WinnerReplay:
+    """Plays a genome on a game one move per step() call so render loops never block."""
+
+    def __init__(self, genome, config, game, move_limit=150):
+        self.genome = genome
+        self.net = NETWORK_CACHE.create(genome, config, prune=True)
+        self.input_keys = config.genome_config.input_keys
+        self.output_keys = config.genome_config.output_keys
+        self.game = game
+        self.sensor = Sensor(game)
+        self.state = self.output = ()
+        self.move_limit = move_limit
+        self.moves_without_food = 0
+        self.game.reset_game()
+
+    @property
+    def finished(self):
+        return self.game.is_game_over() or self.moves_without_food >= self.move_limit
+
+    def step(self):
+        previous_score = self.game.score
+
+        state = self.sensor.sense()
+        output = self.net.activate(state)
+        self.state, self.output = state, output
+        direction_index = output.index(max(output))
+        new_direction = DIRECTION_MAP.get(direction_index, self.game.direction)
+        self.game.change_direction(new_direction)
+
+        self.game.update()
+
+        if self.game.score > previous_score:
+            self.moves_without_food = 0
+        else:
+            self.moves_without_food += 1
+
+    def activations(self):
+        """Input and output node values of the last step, for the net panel highlights."""
+        values = dict(zip(self.input_keys, self.state))
+        values.update(zip(self.output_keys, self.output))
+        return values
 
 def simulate_winner_genome(winner, app, neural_net_width, neural_net_height, move_limit=150, rounds=1):
-    net = neat.nn.FeedForwardNetwork.create(winner, app.config)
+    # pygame opens fonts when ui.display is imported, keep it out of headless training
+    import pygame as pg
+    from ui.display import draw_replay_frame
+
     clock = pg.time.Clock()
+    timestep = app.replay_timestep
     
     for _ in range(rounds):
-        app.game.reset_game()
-        moves_without_food = 0
+        replay = WinnerReplay(winner, app.config, app.game, move_limit)
+        timestep.reset()
 
-        while not app.game.is_game_over() and moves_without_food < move_limit:
+        while not replay.finished:
             for event in pg.event.get():
                 if event.type == pg.QUIT:
                     app.state = "QUIT"
@@ -210,36 +219,19 @@ def simulate_winner_genome(winner, app, neural_net_width, neural_net_height, mov
                 elif event.type == pg.KEYDOWN and event.key == pg.K_ESCAPE:
                     app.state = "IDLE"
                     return
-
-            previous_score = app.game.score
-
-            state = compute_state(app.game)
-            output = net.activate(state)
-            direction_index = output.index(max(output))
-            new_direction = DIRECTION_MAP.get(direction_index, app.game.direction)
-            app.game.change_direction(new_direction)
-
-            app.game.update()
-
-            if app.game.score > previous_score:
-                moves_without_food = 0
-            else:
-                moves_without_food += 1
-                
+                elif event.type == pg.KEYDOWN:
+                    timestep.handle_key(event.key)
+
+            # at higher speeds several moves run per frame and only the last one is drawn
+            for _ in timestep.ticks():
+                if replay.finished:
+                    break
+                replay.step()
             if app.game.score > app.best_score:
                 app.best_score = app.game.score
 
-            app.screen.fill(BACKGROUND)
-            draw_snake_game(app.screen, app.game, app.GAME_AREA, app.screen.get_height(), app.CELL_SIZE)
-            
             gen_value = getattr(app, "current_best_genome", {}).get("generation", app.generation)
-            info_surface = pg.Surface((app.INFO_AREA_WIDTH, app.INFO_AREA_HEIGHT))
-            draw_info_panel(info_surface, app.game.score, app.best_score, f"Gen: {gen_value}", app)
-            app.screen.blit(info_surface, (app.GAME_AREA, 0))
-            
-            net_surface = pg.Surface((app.NET_AREA_WIDTH, app.NET_AREA_HEIGHT))
-            draw_neural_net(net_surface, winner, app.config, neural_net_width=neural_net_width, neural_net_height=neural_net_height)
-            app.screen.blit(net_surface, (app.GAME_AREA, 80))
-
-            pg.display.update()
-            clock.tick(60)
\ No newline at end of file
+            activations = replay.activations() if app.NET_ACTIVATIONS else None
+            pg.display.update(draw_replay_frame(app, winner, f"Gen: {gen_value} {timestep.label}", neural_net_width, neural_net_height,
+                                                activations))
+            clock.tick(60)
@@ -0,0 +1,134 @@
+import time
+import queue
+import logging
+import multiprocessing
+
+from ai.parallel import load_config
+from ai.train import load_population, build_evaluator, add_metrics_reporter, add_episode_archive
+from ai.checkpoint import Checkpointer
+
+
+class SummarizingEvaluator:
+    """Wraps a fitness function and keeps a fitness summary of the last generation."""
+
+    def __init__(self, evaluator):
+        self.evaluator = evaluator
+        self.summary = {}
+
+    def __call__(self, genomes, config):
+        self.evaluator(genomes, config)
+        fitnesses = [genome.fitness for _, genome in genomes]
+        self.summary = {
+            "generation_best": max(fitnesses),
+            "mean_fitness": sum(fitnesses) / len(fitnesses),
+            "population": len(fitnesses),
+        }
+
+    def close(self):
+        if hasattr(self.evaluator, "close"):
+            self.evaluator.close()
+
+
+def _training_loop(config_path, checkpoint_path, resume, max_generations, checkpoint_every, checkpoint_options, metrics_path,
+                   episode_archive_path, evaluator_options, updates, stop_event):
+    logging.basicConfig(level=logging.INFO)
+    config = load_config(config_path)
+    resume_path = resume if isinstance(resume, str) else (checkpoint_path if resume else None)
+    population = load_population(config, resume_path)
+    evaluator = SummarizingEvaluator(build_evaluator(config_path, population, **evaluator_options))
+    metrics = add_metrics_reporter(population, metrics_path) if metrics_path else None
+    archive = add_episode_archive(population, episode_archive_path)
+    checkpointer = None
+    if checkpoint_path:
+        checkpointer = Checkpointer(checkpoint_path, every_generations=checkpoint_every, generation=population.generation,
+                                    **checkpoint_options)
+
+    winner = population.best_genome
+    try:
+        while not stop_event.is_set() and (max_generations is None or population.generation < max_generations):
+            start = time.perf_counter()
+            winner = population.run(evaluator, 1)
+            seconds = time.perf_counter() - start
+            checkpoint_seconds = 0.0
+            if checkpointer:
+                checkpointer.maybe_save(population, winner)
+                checkpoint_seconds = time.perf_counter() - start - seconds
+            update = {
+                "generation": population.generation,
+                "genome": winner,
+                "best_fitness": winner.fitness,
+                "seconds": seconds,
+                "checkpoint_seconds": checkpoint_seconds,
+                "species": len(population.species.species),
+            }
+            update.update(evaluator.summary)
+            if archive.best is not None and archive.best.genome_key == winner.key:
+                update["episode"] = archive.best
+            updates.put(update)
+    finally:
+        evaluator.close()
+        if checkpointer and winner is not None:
+            checkpointer.finish(population, winner)
+            logging.info(f"Checkpoint saved at generation {population.generation}.")
+        if metrics:
+            metrics.close()
+        archive.close()
+        updates.put({"finished": True, "generation": population.generation})
+
+
+class BackgroundTrainer:
+    """Runs NEAT generations in a separate process and reports them through a queue.
+
+    Every generation pushes a dict with the best genome so far and fitness stats,
+    plus its recorded "episode" when the evaluator captured it.
+    checkpoint_path is a Checkpointer directory, resume may also name another
+    checkpoint file or directory to start from.
+    poll() never blocks, it drains the queue and returns only the newest update,
+    so a render loop can call it every frame.
+    """
+
+    def __init__(self, config_path, checkpoint_path=None, resume=True, max_generations=None, checkpoint_every=1,
+                 checkpoint_options=None, metrics_path=None, episode_archive_path=None, **evaluator_options):
+        # spawn, unlike fork, does not hand the trainer copies of the parent's window, display
+        # connection and threads. It does re-import the launching script as __mp_main__, so
+        # when that is main.py the child still imports and initialises pygame, it only never
+        # opens a window because App is created under the __main__ guard
+        self.context = multiprocessing.get_context("spawn")
+        self.updates = self.context.Queue()
+        self.stop_event = self.context.Event()
+        self.process = self.context.Process(
+            target=_training_loop,
+            args=(config_path, checkpoint_path, resume, max_generations, checkpoint_every, checkpoint_options or {},
+                  metrics_path, episode_archive_path, evaluator_options, self.updates, self.stop_event),
+            name="neat-trainer")
+        self.finished = False
+        self.generation = None
+
+    def start(self):
+        self.process.start()
+
+    def poll(self):
+        latest = None
+        while True:
+            try:
+                update = self.updates.get_nowait()
+            except queue.Empty:
+                break
+            if update.get("finished"):
+                self.finished = True
+                self.generation = update["generation"]
+            else:
+                latest = update
+                self.generation = update["generation"]
+        if latest is None and not self.finished and not self.process.is_alive() and self.process.exitcode is not None:
+            logging.error(f"Training process exited with code {self.process.exitcode}")
+            self.finished = True
+        return latest
+
+    def stop(self):
+        self.stop_event.set()
+        # keep draining, a child blocked on a full queue pipe would never exit
+        while self.process.is_alive():
+            self.poll()
+            self.process.join(0.1)
+        self.poll()
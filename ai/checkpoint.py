@@ -0,0 +1,275 @@
+import io
+import os
+import re
+import time
+import pickle
+import random
+import logging
+import tempfile
+import threading
+
+import numpy as np
+
+from ai.metrics import PROFILE
+
+FORMAT_VERSION = 2
+FILE_PATTERN = re.compile(r"^(?P<prefix>.+)-(?P<generation>\d+)\.pkl$")
+
+
+class _SnapshotPickler(pickle.Pickler):
+    """Pickles everything but the genomes and the config, which it swaps for references.
+
+    Each genome is packed into genome_records arrays on the spot, with the fitness
+    it has now, so neither the pickle nor the packed genomes change when training
+    carries on.
+    """
+
+    def __init__(self, f, config):
+        super().__init__(f, pickle.HIGHEST_PROTOCOL)
+        self.config = config
+        self.genome_type = config.genome_type
+        self.tokens = {}
+        self.genomes = []
+        self.activations = []
+        self.aggregations = []
+
+    def persistent_id(self, obj):
+        # called for every object pickled, keep the common miss cheap
+        if type(obj) is self.genome_type:
+            token = self.tokens.get(id(obj))
+            if token is None:
+                from ai.genome_file import genome_records  # ai.genome_file imports this module
+
+                token = self.tokens[id(obj)] = len(self.genomes)
+                self.genomes.append((obj.key, obj.fitness, genome_records(obj, self.activations, self.aggregations)))
+            return ("genome", token)
+        if obj is self.config:
+            return ("config",)
+        return None
+
+
+class _SnapshotUnpickler(pickle.Unpickler):
+    def __init__(self, f, config, genomes):
+        super().__init__(f)
+        self.config = config
+        self.genomes = genomes
+
+    def persistent_load(self, pid):
+        if pid[0] == "config":
+            return self.config
+        if pid[0] == "genome":
+            return self.genomes[pid[1]]
+        raise pickle.UnpicklingError(f"Unknown persistent id {pid[0]!r}")
+
+
+def _pack_genomes(genomes, activations, aggregations):
+    """Concatenate the records _SnapshotPickler collected into one table each."""
+    from ai.genome_file import NODE_DTYPE, CONNECTION_DTYPE
+
+    return {
+        "keys": [key for key, _, _ in genomes],
+        "fitness": [fitness for _, fitness, _ in genomes],
+        "node_counts": [len(nodes) for _, _, (nodes, _) in genomes],
+        "connection_counts": [len(connections) for _, _, (_, connections) in genomes],
+        "nodes": np.concatenate([nodes for _, _, (nodes, _) in genomes] or [np.zeros(0, NODE_DTYPE)]),
+        "connections": np.concatenate([connections for _, _, (_, connections) in genomes] or [np.zeros(0, CONNECTION_DTYPE)]),
+        "activations": activations,
+        "aggregations": aggregations,
+    }
+
+
+def _unpack_genomes(tables, config):
+    from ai.genome_file import genome_from_records
+
+    genomes = []
+    node_start = connection_start = 0
+    for key, fitness, nodes, connections in zip(tables["keys"], tables["fitness"], tables["node_counts"],
+                                                tables["connection_counts"]):
+        genome = genome_from_records(key, tables["nodes"][node_start:node_start + nodes],
+                                     tables["connections"][connection_start:connection_start + connections],
+                                     tables["activations"], tables["aggregations"], config)
+        genome.fitness = fitness
+        genomes.append(genome)
+        node_start += nodes
+        connection_start += connections
+    return genomes
+
+
+def atomic_write(path, write):
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def load_snapshot(path):
+    """Load a checkpoint file: its header, the config, the packed genomes, then the rest of the state."""
+    with open(path, "rb") as f:
+        header = pickle.load(f)
+        if header.get("format") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported checkpoint format in {path}: {header.get('format')}")
+        config = pickle.load(f)
+        genomes = _unpack_genomes(pickle.load(f), config)
+        return _SnapshotUnpickler(f, config, genomes).load()
+
+
+def list_checkpoints(directory, prefix="checkpoint"):
+    """(generation, filename) of every checkpoint in directory, oldest written first.
+
+    Sorted by write time rather than generation, so a fresh run started in the
+    same directory takes over from the old one.
+    """
+    if not os.path.isdir(directory):
+        return []
+    found = []
+    for name in os.listdir(directory):
+        match = FILE_PATTERN.match(name)
+        if match and match.group("prefix") == prefix:
+            mtime = os.path.getmtime(os.path.join(directory, name))
+            found.append((mtime, int(match.group("generation")), name))
+    return [(generation, name) for _, generation, name in sorted(found)]
+
+
+def load_latest(directory, prefix="checkpoint", restore_random=True):
+    """Newest loadable checkpoint state in directory, or None. Restores the random state it saved."""
+    for generation, name in reversed(list_checkpoints(directory, prefix)):
+        try:
+            state = load_snapshot(os.path.join(directory, name))
+        except Exception as e:
+            logging.error(f"Skipping unreadable checkpoint {name}: {e}")
+            continue
+        if restore_random and "random_state" in state:
+            random.setstate(state["random_state"])
+        return state
+    return None
+
+
+class Checkpointer:
+    """Writes rolling population checkpoints off the training thread.
+
+    The training thread only takes a flat snapshot: the genomes packed into
+    ai.genome_file records and a pickle of the rest of the population with
+    references in their place, which holds species, reporters and the random state.
+    A writer thread packs the genome tables into one, pickles them and the config,
+    and writes the file. Files are written to a temp file and renamed into place,
+    and only the newest keep checkpoints are retained.
+    """
+
+    def __init__(self, directory, prefix="checkpoint", keep=5, every_generations=1, every_seconds=None, generation=0):
+        self.directory = directory
+        self.prefix = prefix
+        self.keep = keep
+        self.every_generations = every_generations
+        self.every_seconds = every_seconds
+
+        os.makedirs(directory, exist_ok=True)
+        self._pending = None
+        self._last_generation = generation
+        self.saved_generation = None
+        self._last_time = time.monotonic()
+        self.last_stats = {}
+
+    def is_due(self, generation):
+        if self.every_generations and generation - self._last_generation >= self.every_generations:
+            return True
+        if self.every_seconds and time.monotonic() - self._last_time >= self.every_seconds:
+            return True
+        return False
+
+    def maybe_save(self, population, best_genome):
+        if self.is_due(population.generation):
+            self.save(population, best_genome)
+            return True
+        return False
+
+    def save(self, population, best_genome):
+        start = time.perf_counter()
+        self.wait()
+        generation = population.generation
+        name = f"{self.prefix}-{generation:06d}.pkl"
+        path = os.path.join(self.directory, name)
+        header = {"format": FORMAT_VERSION, "generation": generation}
+
+        state = {
+            "generation": generation,
+            "best_genome": best_genome,
+            "population": population,
+            "random_state": random.getstate(),
+        }
+
+        buffer = io.BytesIO()
+        pickler = _SnapshotPickler(buffer, population.config)
+        pickler.dump(state)
+        config, rest = population.config, buffer.getvalue()
+        genomes, activations, aggregations = pickler.genomes, pickler.activations, pickler.aggregations
+
+        def write(f):
+            pickle.dump(header, f, pickle.HIGHEST_PROTOCOL)
+            pickle.dump(config, f, pickle.HIGHEST_PROTOCOL)
+            pickle.dump(_pack_genomes(genomes, activations, aggregations), f, pickle.HIGHEST_PROTOCOL)
+            f.write(rest)
+
+        job = lambda: atomic_write(path, write) or True
+
+        blocking = time.perf_counter() - start
+        if PROFILE.enabled:
+            PROFILE.add_time("checkpoint", blocking)
+        self._last_generation = generation
+        self.saved_generation = generation
+        self._last_time = time.monotonic()
+        self._pending = threading.Thread(target=self._finish, args=(job, name, header, blocking), daemon=True)
+        self._pending.start()
+
+    def _finish(self, job, name, header, blocking):
+        start = time.perf_counter()
+        try:
+            ok = job()
+        except Exception as e:
+            logging.error(f"Failed to write checkpoint {name}: {e}")
+            ok = False
+        background = time.perf_counter() - start
+
+        if not ok:
+            logging.error(f"Checkpoint {name} was not written")
+            return
+        size = os.path.getsize(os.path.join(self.directory, name))
+        self.last_stats = {
+            "generation": header["generation"],
+            "blocking_seconds": blocking,
+            "background_seconds": background,
+            "bytes": size,
+        }
+        logging.info(f"Checkpoint {name} ({size / 1024:.0f} KB): "
+                     f"{blocking * 1000:.1f} ms on the training thread, {background * 1000:.1f} ms in the background")
+        self._prune()
+
+    def _prune(self):
+        if not self.keep:
+            return
+        for _, name in list_checkpoints(self.directory, self.prefix)[:-self.keep]:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError as e:
+                logging.error(f"Failed to remove old checkpoint {name}: {e}")
+
+    def wait(self):
+        if self._pending is not None:
+            self._pending.join()
+            self._pending = None
+
+    def finish(self, population, best_genome):
+        """Save the final generation unless it was just saved, and wait for the write."""
+        if self.saved_generation != population.generation:
+            self.save(population, best_genome)
+        self.wait()
+
+    def close(self):
+        self.wait()
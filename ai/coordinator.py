@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""Fitness evaluation spread over socket workers, on this machine or others.
+
+Start the coordinator through training, then point workers at it:
+
+    python -m ai.train --listen 0.0.0.0:5555
+    python -m ai.worker --connect trainer-host:5555
+
+Time generations against the number of localhost workers with
+
+    python -m ai.coordinator --workers 1,2,4 --generations 5
+"""
+import os
+import sys
+import time
+import queue
+import random
+import socket
+import logging
+import argparse
+import threading
+import subprocess
+from collections import deque
+
+import neat
+
+from ai.ai import TRAINING_GRID
+from ai.parallel import load_config, genome_payload
+from ai.worker import send_message, recv_message
+
+
+class _Worker:
+    def __init__(self, sock, name):
+        self.sock = sock
+        self.name = name
+        self.inflight = set()
+        self.last_seen = time.monotonic()
+        self.alive = False
+
+
+class SocketEvaluator:
+    """Fitness function handing genome batches to workers connected over TCP.
+
+    Genomes are cut into batches of batch_size and each worker holds at most
+    max_inflight of them, the rest wait here, so a slow worker never has more than
+    that queued and the others pick up the remainder. Workers that close their
+    connection or stay silent for heartbeat_timeout seconds are dropped and their
+    batches go back to the front of the queue. A generation waits for a worker when
+    none is connected. Workers may join at any time.
+    """
+
+    def __init__(self, config_path, address=("127.0.0.1", 0), batch_size=10, max_inflight=2, heartbeat_interval=1.0,
+                 heartbeat_timeout=10.0, schedule=None, aggregation="mean", quantile=0.5):
+        self.config_path = config_path
+        self.requested_address = address
+        self.batch_size = batch_size
+        self.max_inflight = max_inflight
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self.schedule = schedule
+        self.aggregation = aggregation
+        self.quantile = quantile
+        self.server = None
+        self.address = None
+        self.events = queue.Queue()
+        self.workers = []
+        self.next_batch = 0
+        self.history = []
+
+    def start(self):
+        if self.server is not None:
+            return
+        with open(self.config_path) as file:
+            self.config_text = file.read()
+        self.server = socket.create_server(self.requested_address)
+        self.address = self.server.getsockname()[:2]
+        logging.info(f"Waiting for evaluation workers on {self.address[0]}:{self.address[1]}")
+        threading.Thread(target=self._accept, args=(self.server,), daemon=True).start()
+
+    def close(self):
+        for worker in list(self.workers):
+            try:
+                send_message(worker.sock, {"type": "bye"})
+            except OSError:
+                pass
+            self._drop(worker, None)
+        if self.server is not None:
+            self.server.close()
+            self.server = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _accept(self, server):
+        while True:
+            try:
+                sock, peer = server.accept()
+            except OSError:
+                return
+            try:
+                sock.settimeout(self.heartbeat_timeout)
+                hello = recv_message(sock)
+                if hello is None or hello.get("type") != "hello":
+                    raise ConnectionError("no hello")
+                send_message(sock, {"type": "config", "config": self.config_text, "heartbeat_interval": self.heartbeat_interval,
+                                    "grid": [TRAINING_GRID.width, TRAINING_GRID.height]})
+                sock.settimeout(None)
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            except (OSError, ValueError, ConnectionError) as e:
+                logging.warning(f"Rejected worker {peer[0]}:{peer[1]}: {e}")
+                sock.close()
+                continue
+            worker = _Worker(sock, hello.get("name") or f"{peer[0]}:{peer[1]}")
+            self.events.put(("joined", worker, None))
+            threading.Thread(target=self._read, args=(worker,), daemon=True).start()
+
+    def _read(self, worker):
+        try:
+            while True:
+                message = recv_message(worker.sock)
+                if message is None:
+                    break
+                # stamped here, events queued between generations must still count as signs of life
+                worker.last_seen = time.monotonic()
+                self.events.put(("message", worker, message))
+        except (OSError, ValueError):
+            pass
+        self.events.put(("lost", worker, None))
+
+    def _drop(self, worker, pending):
+        """Disconnect worker, requeueing its unfinished batches onto pending."""
+        if worker in self.workers:
+            self.workers.remove(worker)
+        worker.alive = False
+        try:
+            worker.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        worker.sock.close()
+        requeued = sorted(worker.inflight)
+        worker.inflight.clear()
+        if pending is not None:
+            pending.extendleft(reversed(requeued))
+        return len(requeued)
+
+    def _handle(self, event, batches, results, pending):
+        """Apply one event from the accept and reader threads, returning how many batches it requeued."""
+        kind, worker, message = event
+        if kind == "joined":
+            worker.alive = True
+            worker.last_seen = time.monotonic()
+            self.workers.append(worker)
+            logging.info(f"Worker {worker.name} joined, {len(self.workers)} connected")
+            return 0
+        if not worker.alive:
+            return 0
+        if kind == "lost":
+            requeued = self._drop(worker, pending)
+            logging.warning(f"Worker {worker.name} disconnected, requeued {requeued} batches")
+            return requeued
+        if message["type"] == "result":
+            batch_id = message["id"]
+            worker.inflight.discard(batch_id)
+            if batch_id in batches:
+                results[batch_id] = message["fitness"]
+        return 0
+
+    def wait_for_workers(self, count, timeout=None):
+        """Block until count workers are connected, returning whether they are."""
+        self.start()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while len(self.workers) < count:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False
+            try:
+                self._handle(self.events.get(timeout=remaining), {}, {}, None)
+            except queue.Empty:
+                return False
+        return True
+
+    def __call__(self, genomes, config):
+        self.start()
+        start = time.perf_counter()
+        seeds = self.schedule.seeds() if self.schedule is not None else None
+        payloads = [genome_payload(genome) for _, genome in genomes]
+        batches = {}
+        for first in range(0, len(payloads), self.batch_size):
+            batches[self.next_batch] = (first, min(first + self.batch_size, len(payloads)))
+            self.next_batch += 1
+        pending = deque(batches)
+        results = {}
+        requeued = 0
+        waiting_since = None
+
+        while len(results) < len(batches):
+            # fill every worker up to max_inflight, least loaded first
+            for worker in sorted(self.workers, key=lambda w: len(w.inflight)):
+                while pending and len(worker.inflight) < self.max_inflight:
+                    batch_id = pending.popleft()
+                    first, stop = batches[batch_id]
+                    message = {"type": "batch", "id": batch_id, "seeds": seeds, "aggregation": self.aggregation,
+                               "quantile": self.quantile, "genomes": payloads[first:stop]}
+                    worker.inflight.add(batch_id)
+                    try:
+                        send_message(worker.sock, message)
+                    except OSError:
+                        requeued += self._drop(worker, pending)
+                        logging.warning(f"Worker {worker.name} failed to take a batch, requeued its work")
+                        break
+
+            try:
+                requeued += self._handle(self.events.get(timeout=self.heartbeat_interval), batches, results, pending)
+                while True:
+                    requeued += self._handle(self.events.get_nowait(), batches, results, pending)
+            except queue.Empty:
+                pass
+
+            now = time.monotonic()
+            for worker in list(self.workers):
+                if now - worker.last_seen > self.heartbeat_timeout:
+                    count = self._drop(worker, pending)
+                    requeued += count
+                    logging.warning(f"Worker {worker.name} missed its heartbeats, requeued {count} batches")
+            if self.workers:
+                waiting_since = None
+            elif waiting_since is None or now - waiting_since > 30:
+                waiting_since = now
+                logging.warning(f"No evaluation workers connected, {len(batches) - len(results)} batches waiting")
+
+        for batch_id, (first, stop) in batches.items():
+            for (genome_id, genome), fitness in zip(genomes[first:stop], results[batch_id]):
+                genome.fitness = fitness
+        seconds = time.perf_counter() - start
+        self.history.append({"seconds": seconds, "workers": len(self.workers), "batches": len(batches), "requeued": requeued})
+        logging.info(f"Evaluated {len(genomes)} genomes on {len(self.workers)} workers in {seconds:.2f}s"
+                     + (f", {requeued} batches requeued" if requeued else ""))
+
+
+def benchmark(config_path, worker_counts, generations, batch_size=10):
+    """Mean generation wall time with each count of localhost workers, one fresh population per count."""
+    config = load_config(config_path)
+    rows = []
+    for count in worker_counts:
+        evaluator = SocketEvaluator(config_path, batch_size=batch_size)
+        evaluator.start()
+        host, port = evaluator.address
+        processes = [subprocess.Popen([sys.executable, "-m", "ai.worker", "--connect", f"{host}:{port}", "--name", f"local-{i}"])
+                     for i in range(count)]
+        try:
+            if not evaluator.wait_for_workers(count, timeout=60):
+                raise RuntimeError(f"Only {len(evaluator.workers)} of {count} workers connected")
+            random.seed(0)
+            population = neat.Population(config)
+            population.run(evaluator, generations)
+        finally:
+            evaluator.close()
+            for process in processes:
+                process.wait(timeout=30)
+        seconds = [row["seconds"] for row in evaluator.history]
+        rows.append((count, sum(seconds) / len(seconds)))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m ai.coordinator",
+                                     description="Time socket evaluation against the number of localhost workers.")
+    parser.add_argument("--workers", type=lambda text: [int(n) for n in text.split(",")], default=[1, 2, 4],
+                        help="comma separated worker counts")
+    parser.add_argument("--generations", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=10, help="genomes per batch")
+    parser.add_argument("--config", default=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config.txt"),
+                        help="NEAT config file")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+
+    rows = benchmark(args.config, args.workers, args.generations, args.batch_size)
+    baseline = rows[0][1]
+    print(f"{'workers':>8} {'s/generation':>13} {'speedup':>8}")
+    for count, seconds in rows:
+        print(f"{count:8} {seconds:13.3f} {baseline / seconds:7.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+import logging
+
+import neat
+
+from snake_game.replay import EpisodeRecording, append_archive
+
+
+class EpisodeLog:
+    """Process-wide store of this generation's episode recordings, keyed by genome key.
+
+    In-process evaluators check enabled once per call and only then capture the
+    action stream of each genome's first episode.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.recordings = {}
+
+    def add(self, genome_key, seed, grid_width, grid_height, actions, score):
+        # packed only for the genome that gets archived
+        self.recordings[genome_key] = (seed, grid_width, grid_height, actions, score)
+
+    def take(self, genome_key=None):
+        """Clear the store, returning the recording of genome_key if there was one."""
+        recordings, self.recordings = self.recordings, {}
+        entry = recordings.get(genome_key)
+        if entry is None:
+            return None
+        seed, grid_width, grid_height, actions, score = entry
+        return EpisodeRecording(seed, grid_width, grid_height, actions, score=score, genome_key=genome_key)
+
+
+EPISODES = EpisodeLog()
+
+
+class EpisodeArchive(neat.reporting.BaseReporter):
+    """Keeps the recording of each generation's best genome and appends it to path if given.
+
+    Recording is process-wide, so the archive only turns the log on in start() and
+    off again in close(). best holds the recording behind the population's best
+    genome so far, when the evaluator recorded it (process-pool workers do not).
+    With verify set, each recording is replayed and logged as an error unless it
+    reaches the fitness of the genome it is filed under, which only holds for
+    single-episode fitness.
+    """
+
+    def __init__(self, path=None, log=EPISODES, verify=False):
+        self.path = path
+        self.log = log
+        self.verify = verify
+        self.started = False
+        self.generation = 0
+        self.latest = None
+        self.best = None
+
+    def __getstate__(self):
+        # checkpoints pickle the reporters, a restored copy keeps its settings and waits for start()
+        return {"path": self.path, "verify": self.verify}
+
+    def __setstate__(self, state):
+        self.__init__(state["path"], verify=state["verify"])
+
+    def start(self):
+        self.started = True
+        self.log.enabled = True
+        return self
+
+    def start_generation(self, generation):
+        self.generation = generation
+        if self.started:
+            self.log.take()
+
+    def post_evaluate(self, config, population, species, best_genome):
+        if not self.started:
+            return
+        recording = self.log.take(best_genome.key)
+        if recording is None:
+            return
+        # the genome's fitness, which may combine several episodes
+        recording.fitness = best_genome.fitness
+        recording.generation = self.generation
+        if self.verify:
+            from ai.ai import replay_fitness
+
+            replayed = replay_fitness(recording)
+            if abs(replayed - recording.fitness) > 1e-6:
+                logging.error(f"Episode recorded for genome {recording.genome_key} replays to fitness {replayed:.3f}, "
+                              f"not its {recording.fitness:.3f}")
+        self.latest = recording
+        if self.best is None or recording.fitness > self.best.fitness:
+            self.best = recording
+        if self.path:
+            append_archive(self.path, recording)
+
+    def close(self):
+        if self.started:
+            self.started = False
+            self.log.enabled = False
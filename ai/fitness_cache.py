@@ -0,0 +1,81 @@
+import struct
+import hashlib
+import logging
+from collections import OrderedDict
+
+
+def genome_structure_hash(genome):
+    """Digest of every node and connection gene, identical genomes hash the same."""
+    digest = hashlib.blake2b(digest_size=16)
+    for key in sorted(genome.nodes):
+        ng = genome.nodes[key]
+        digest.update(struct.pack("<qdd", key, ng.bias, ng.response))
+        digest.update(f"{ng.activation}|{ng.aggregation};".encode())
+    for key in sorted(genome.connections):
+        cg = genome.connections[key]
+        digest.update(struct.pack("<qqd?", key[0], key[1], cg.weight, cg.enabled))
+    return digest.digest()
+
+
+class FitnessCache:
+    """Wraps a fitness function and skips genomes it has already scored.
+
+    Entries are keyed by genome_structure_hash plus the schedule's seed set, so with
+    seeded evaluation a hit is exactly the fitness a new simulation would give.
+    Without a schedule every episode is random and the first, noisy, sample would
+    be kept for good, elites included, so make_evaluator only adds the cache when
+    there is one. Scores carry over between generations only while the seeds stay
+    the same: SeedSchedule's default period of 1 draws new seeds every generation,
+    leaving just the duplicates inside a generation, which are simulated once. Use
+    a longer period, or none, for reuse. The cache keeps at most max_entries,
+    evicting the least recently used.
+    """
+
+    def __init__(self, evaluator, schedule=None, max_entries=4096):
+        self.evaluator = evaluator
+        self.schedule = schedule
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self.entries),
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def close(self):
+        if hasattr(self.evaluator, "close"):
+            self.evaluator.close()
+
+    def __call__(self, genomes, config):
+        seeds = tuple(self.schedule.seeds()) if self.schedule is not None else None
+        pending = OrderedDict()
+        hits = 0
+        for genome_id, genome in genomes:
+            key = (genome_structure_hash(genome), seeds)
+            fitness = self.entries.get(key)
+            if fitness is not None:
+                self.entries.move_to_end(key)
+                genome.fitness = fitness
+                hits += 1
+            else:
+                pending.setdefault(key, []).append((genome_id, genome))
+
+        if pending:
+            self.evaluator([group[0] for group in pending.values()], config)
+        for key, group in pending.items():
+            fitness = group[0][1].fitness
+            for genome_id, genome in group[1:]:
+                genome.fitness = fitness
+            self.entries[key] = fitness
+            if len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+        self.hits += hits
+        self.misses += len(genomes) - hits
+        logging.info(f"Fitness cache: {hits}/{len(genomes)} hits, {len(pending)} simulated, hit rate {self.stats()['hit_rate']:.1%}")
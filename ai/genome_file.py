@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""Compact binary file format for genomes and populations.
+
+A file holds a fixed header, a JSON metadata block, an index with one record per
+genome, then one block per genome of packed little-endian records:
+
+    nodes:       key (i4), bias (f8), response (f8), activation (u1), aggregation (u1)
+    connections: input (i4), output (i4), weight (f8), enabled (u1)
+
+Activation and aggregation names are stored once in the metadata and referenced
+by index. Each block starts on an 8-byte boundary, but records are packed without
+padding (22 bytes per node, 17 per connection), so the float fields inside a block are
+unaligned. numpy reads them fine, and a memory-mapped file still gives zero-copy record
+views of any single genome without reading the rest. Convert old pickles with
+
+    python -m ai.genome_file winner.pkl checkpoint.pkl
+"""
+import os
+import sys
+import json
+import time
+import struct
+import pickle
+import argparse
+
+import numpy as np
+
+from ai.checkpoint import atomic_write, load_snapshot, FORMAT_VERSION as CHECKPOINT_FORMAT_VERSION
+
+MAGIC = b"SNKG"
+VERSION = 1
+EXTENSION = ".sng"
+HEADER = struct.Struct("<4sHHII")
+INDEX_DTYPE = np.dtype([
+    ("key", "<i8"),
+    ("fitness", "<f8"),
+    ("offset", "<u8"),
+    ("nodes", "<u4"),
+    ("connections", "<u4"),
+])
+
+
+def _align(size):
+    return (size + 7) & ~7
+
+
+NODE_DTYPE = np.dtype([
+    ("key", "<i4"),
+    ("bias", "<f8"),
+    ("response", "<f8"),
+    ("activation", "u1"),
+    ("aggregation", "u1"),
+])
+CONNECTION_DTYPE = np.dtype([
+    ("input", "<i4"),
+    ("output", "<i4"),
+    ("weight", "<f8"),
+    ("enabled", "u1"),
+])
+
+
+def _block_size(nodes, connections):
+    return _align(NODE_DTYPE.itemsize * nodes + CONNECTION_DTYPE.itemsize * connections)
+
+
+def genome_records(genome, activations, aggregations):
+    """(nodes, connections) record arrays of a genome, adding new function names to the name lists."""
+    for ng in genome.nodes.values():
+        if ng.activation not in activations:
+            activations.append(ng.activation)
+        if ng.aggregation not in aggregations:
+            aggregations.append(ng.aggregation)
+    nodes = np.array([(ng.key, ng.bias, ng.response, activations.index(ng.activation), aggregations.index(ng.aggregation))
+                      for ng in genome.nodes.values()], dtype=NODE_DTYPE)
+    connections = np.array([(cg.key[0], cg.key[1], cg.weight, cg.enabled) for cg in genome.connections.values()],
+                           dtype=CONNECTION_DTYPE)
+    return nodes, connections
+
+
+def genome_from_records(key, nodes, connections, activations, aggregations, config):
+    """Rebuild a config.genome_type from its record arrays, the inverse of genome_records."""
+    genome_config = config.genome_config
+    genome = config.genome_type(key)
+
+    # skip the gene constructors, they only set the key, like unpickling does
+    node_type, connection_type = genome_config.node_gene_type, genome_config.connection_gene_type
+    for key, bias, response, activation, aggregation in nodes.tolist():
+        ng = node_type.__new__(node_type)
+        ng.__dict__ = {"key": key, "bias": bias, "response": response,
+                       "activation": activations[activation], "aggregation": aggregations[aggregation]}
+        genome.nodes[key] = ng
+
+    for in_key, out_key, weight, enabled in connections.tolist():
+        cg = connection_type.__new__(connection_type)
+        cg.__dict__ = {"key": (in_key, out_key), "weight": weight, "enabled": bool(enabled)}
+        genome.connections[cg.key] = cg
+    return genome
+
+
+def dump_genomes(f, genomes, metadata=None):
+    """Write genomes (an iterable of DefaultGenome) to the binary file object f."""
+    genomes = list(genomes)
+    activations, aggregations = [], []
+    packed = [genome_records(genome, activations, aggregations) for genome in genomes]
+
+    meta = json.dumps({
+        "activations": activations,
+        "aggregations": aggregations,
+        "metadata": metadata or {},
+    }).encode("utf-8")
+    index_offset = _align(HEADER.size + len(meta))
+    offset = index_offset + INDEX_DTYPE.itemsize * len(genomes)
+
+    index = np.zeros(len(genomes), dtype=INDEX_DTYPE)
+    for i, (genome, (nodes, connections)) in enumerate(zip(genomes, packed)):
+        index[i] = (genome.key, np.nan if genome.fitness is None else genome.fitness, offset, len(nodes), len(connections))
+        offset += _block_size(len(nodes), len(connections))
+
+    f.write(HEADER.pack(MAGIC, VERSION, 0, len(genomes), len(meta)))
+    f.write(meta)
+    f.write(b"\0" * (index_offset - HEADER.size - len(meta)))
+    f.write(index.tobytes())
+    for nodes, connections in packed:
+        f.write(nodes.tobytes())
+        f.write(connections.tobytes())
+        f.write(b"\0" * (_block_size(len(nodes), len(connections)) - nodes.nbytes - connections.nbytes))
+
+
+def write_genomes(path, genomes, metadata=None):
+    """Atomically write genomes to path, see dump_genomes."""
+    atomic_write(path, lambda f: dump_genomes(f, genomes, metadata))
+
+
+class GenomeFile:
+    """Read access to a genome file, memory-mapped by default.
+
+    Only the header and index are parsed up front. records() returns views into the
+    mapping and genome() rebuilds a single DefaultGenome, so random access to one
+    genome does not touch the others.
+    """
+
+    def __init__(self, path, mmap=True):
+        self.path = path
+        if mmap:
+            self.buffer = np.memmap(path, dtype="u1", mode="r")
+        else:
+            with open(path, "rb") as f:
+                self.buffer = np.frombuffer(f.read(), dtype="u1")
+
+        magic, version, flags, count, meta_len = HEADER.unpack_from(self.buffer, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a genome file")
+        if version != VERSION:
+            raise ValueError(f"Unsupported genome file version {version} in {path}")
+        meta = json.loads(bytes(self.buffer[HEADER.size:HEADER.size + meta_len]).decode("utf-8"))
+        self.activations = meta["activations"]
+        self.aggregations = meta["aggregations"]
+        self.metadata = meta["metadata"]
+        self.index = np.frombuffer(self.buffer, INDEX_DTYPE, count, _align(HEADER.size + meta_len))
+        self.positions = {int(key): i for i, key in enumerate(self.index["key"])}
+
+    def __len__(self):
+        return len(self.index)
+
+    def keys(self):
+        return [int(key) for key in self.index["key"]]
+
+    def records(self, i):
+        """(nodes, connections) record views of the i-th genome of the file."""
+        record = self.index[i]
+        offset = int(record["offset"])
+        nodes = np.frombuffer(self.buffer, NODE_DTYPE, int(record["nodes"]), offset)
+        connections = np.frombuffer(self.buffer, CONNECTION_DTYPE, int(record["connections"]), offset + nodes.nbytes)
+        return nodes, connections
+
+    def genome(self, i, config):
+        """Rebuild the i-th genome as config.genome_type."""
+        record = self.index[i]
+        nodes, connections = self.records(i)
+        genome = genome_from_records(int(record["key"]), nodes, connections, self.activations, self.aggregations, config)
+        fitness = float(record["fitness"])
+        genome.fitness = None if np.isnan(fitness) else fitness
+        return genome
+
+    def genome_by_key(self, key, config):
+        return self.genome(self.positions[key], config)
+
+    def genomes(self, config):
+        return [self.genome(i, config) for i in range(len(self))]
+
+
+def read_genomes(path, config):
+    """(genomes, metadata) of every genome in path."""
+    gf = GenomeFile(path, mmap=False)
+    return gf.genomes(config), gf.metadata
+
+
+def _load_pickle(path):
+    with open(path, "rb") as f:
+        data = pickle.load(f)
+    if isinstance(data, dict) and data.get("format") == CHECKPOINT_FORMAT_VERSION:
+        data = load_snapshot(path)
+    return data
+
+
+def pickled_genomes(data):
+    """(genomes, metadata) from a winner.pkl or checkpoint pickle."""
+    if isinstance(data, dict) and "population" in data:
+        population = data["population"]
+        genomes = list(population.population.values())
+        best = data.get("best_genome") or population.best_genome
+        metadata = {"generation": data.get("generation", population.generation)}
+    elif isinstance(data, dict) and "genome" in data:
+        genomes, best, metadata = [data["genome"]], data["genome"], {"generation": data.get("generation", -1)}
+    elif hasattr(data, "population") and hasattr(data, "species"):
+        genomes, best, metadata = list(data.population.values()), data.best_genome, {"generation": data.generation}
+    else:
+        genomes, best, metadata = [data], data, {"generation": -1}
+
+    if best is not None:
+        metadata["best_key"] = best.key
+        if best.key not in {genome.key for genome in genomes}:
+            genomes.append(best)
+    return genomes, metadata
+
+
+def _best_time(function, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def convert(path, output=None, config=None):
+    """Convert a pickle to the genome format and return size and load-time numbers."""
+    output = output or os.path.splitext(path)[0] + EXTENSION
+    pickle_seconds, data = _best_time(lambda: _load_pickle(path))
+    genomes, metadata = pickled_genomes(data)
+    write_genomes(output, genomes, metadata)
+
+    if config:
+        load_seconds, rebuilt = _best_time(lambda: GenomeFile(output).genomes(config))
+        single_seconds, _ = _best_time(lambda: GenomeFile(output).genome(len(genomes) - 1, config))
+    else:
+        load_seconds, rebuilt = _best_time(lambda: [GenomeFile(output).records(i) for i in range(len(genomes))])
+        single_seconds, _ = _best_time(lambda: GenomeFile(output).records(len(genomes) - 1))
+
+    return {
+        "output": output,
+        "genomes": len(rebuilt),
+        "pickle_bytes": os.path.getsize(path),
+        "bytes": os.path.getsize(output),
+        "pickle_load_seconds": pickle_seconds,
+        "load_seconds": load_seconds,
+        "single_genome_seconds": single_seconds,
+    }
+
+
+def main(argv=None):
+    from ai.parallel import load_config
+
+    parser = argparse.ArgumentParser(prog="python -m ai.genome_file", description="Convert pickled genomes to the packed genome format.")
+    parser.add_argument("paths", nargs="+", help="winner.pkl, checkpoint.pkl or Checkpointer files")
+    parser.add_argument("--config", default=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config.txt"),
+                        help="NEAT config, used to time rebuilding DefaultGenome objects")
+    args = parser.parse_args(argv)
+    config = load_config(args.config) if os.path.exists(args.config) else None
+
+    for path in args.paths:
+        report = convert(path, config=config)
+        print(f"{path} -> {report['output']}: {report['genomes']} genomes")
+        print(f"  size  {report['pickle_bytes'] / 1024:9.1f} KB pickle  {report['bytes'] / 1024:9.1f} KB packed "
+              f"({report['bytes'] / report['pickle_bytes']:.0%})")
+        print(f"  load  {report['pickle_load_seconds'] * 1000:9.2f} ms pickle  {report['load_seconds'] * 1000:9.2f} ms packed, "
+              f"{report['single_genome_seconds'] * 1000:.3f} ms for one genome")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""Island-model training: independent populations in separate processes with migration.
+
+    python -m ai.islands --islands 4 --migration-interval 10 --topology ring --generations 200 --checkpoint islands
+
+Every island evolves its own population for migration_interval generations, then
+sends copies of its best genomes to its neighbours in the topology, which replace
+their weakest offspring before the next epoch, never their elites. Each island checkpoints into its
+own subdirectory and the coordinator keeps the pending migrants next to them, so
+--checkpoint resumes all islands where they stopped. --baseline afterwards runs one
+population for the same wall-clock time and compares best fitness over time.
+"""
+import os
+import sys
+import json
+import time
+import pickle
+import random
+import logging
+import argparse
+import multiprocessing
+
+from ai.parallel import load_config
+from ai.train import PROJECT_DIR, load_population, build_evaluator, parse_grid
+from ai.checkpoint import Checkpointer, atomic_write, list_checkpoints
+
+TOPOLOGIES = ("ring", "full")
+MANIFEST = "islands.pkl"
+MANIFEST_FORMAT = 1
+
+
+def migration_targets(topology, islands):
+    """Island index -> indices of the islands its migrants go to."""
+    if topology not in TOPOLOGIES:
+        raise ValueError(f"Unknown migration topology: {topology}")
+    if islands < 2:
+        return {i: [] for i in range(islands)}
+    if topology == "ring":
+        return {i: [(i + 1) % islands] for i in range(islands)}
+    return {i: [j for j in range(islands) if j != i] for i in range(islands)}
+
+
+def immigrate(population, config, immigrants, parent_fitness=None):
+    """Replace the weakest offspring of population with immigrants under fresh keys, then respeciate.
+
+    Elites are carried over with their fitness and never replaced. Offspring have not
+    been evaluated yet, so they rank by the best of their parents' fitness in
+    parent_fitness, genome key -> fitness in the last generation.
+    """
+    if not immigrants:
+        return
+    parent_fitness = parent_fitness or {}
+    ancestors = population.reproduction.ancestors
+
+    def parents_best(key):
+        scores = [parent_fitness[parent] for parent in ancestors.get(key, ()) if parent in parent_fitness]
+        return max(scores) if scores else float("-inf")
+
+    offspring = [key for key, genome in population.population.items() if genome.fitness is None]
+    # ties, as after a resume with no parent fitness, are broken at random
+    random.shuffle(offspring)
+    offspring.sort(key=parents_best)
+    immigrants = immigrants[:len(offspring)]
+    for key in offspring[:len(immigrants)]:
+        del population.population[key]
+    for genome in immigrants:
+        genome.key = next(population.reproduction.genome_indexer)
+        genome.fitness = None
+        population.population[genome.key] = genome
+    population.species.speciate(config, population.population, population.generation)
+
+
+class _Emigrants:
+    """Wraps a fitness function, keeping the best genomes and every fitness of the last generation and a genome count."""
+
+    def __init__(self, evaluator, count):
+        self.evaluator = evaluator
+        self.count = count
+        self.best = []
+        self.fitness = {}
+        self.generation_best = None
+        self.evaluated = 0
+
+    def __call__(self, genomes, config):
+        self.evaluator(genomes, config)
+        self.evaluated += len(genomes)
+        self.fitness = {genome.key: genome.fitness for _, genome in genomes}
+        ranked = sorted((genome for _, genome in genomes), key=lambda genome: genome.fitness, reverse=True)
+        self.best = ranked[:self.count]
+        self.generation_best = ranked[0].fitness
+
+    def close(self):
+        if hasattr(self.evaluator, "close"):
+            self.evaluator.close()
+
+
+def _island_loop(index, config_path, directory, seed, migrants, evaluator_options, connection):
+    logging.basicConfig(level=logging.WARNING)
+    config = load_config(config_path)
+    random.seed(None if seed is None else f"{seed}:{index}")
+    # a checkpoint restores the island's random state along with its population
+    resume = directory if directory and list_checkpoints(directory) else None
+    population = load_population(config, resume)
+    evaluator = _Emigrants(build_evaluator(config_path, population, **evaluator_options), migrants)
+    checkpointer = Checkpointer(directory, keep=2, every_generations=None, generation=population.generation) if directory else None
+    connection.send(("ready", population.generation))
+
+    try:
+        while True:
+            command = connection.recv()
+            if command[0] == "stop":
+                break
+            _, generations, immigrants = command
+            immigrate(population, config, immigrants, evaluator.fitness)
+            start = time.perf_counter()
+            evaluator.evaluated = 0
+            for _ in range(generations):
+                population.run(evaluator, 1)
+            if checkpointer:
+                checkpointer.save(population, population.best_genome)
+                # the coordinator writes its manifest once every island has replied, so the files must be there
+                checkpointer.wait()
+            connection.send(("epoch", population.generation, population.best_genome, evaluator.generation_best, evaluator.best,
+                             evaluator.evaluated, time.perf_counter() - start))
+    finally:
+        evaluator.close()
+        if checkpointer:
+            checkpointer.close()
+        connection.close()
+
+
+class IslandTrainer:
+    """Runs islands populations in their own processes and migrates between them.
+
+    Epochs are synchronous: every island runs migration_interval generations, then
+    sends copies of the migrants best genomes of its last generation to the islands
+    migration_targets gives for topology. timeline gets one row per epoch with the
+    wall-clock seconds, generations, genomes evaluated, best fitness so far and each
+    island's best fitness in its last generation. evaluator_options go to
+    ai.train.build_evaluator for every island.
+    """
+
+    def __init__(self, config_path, islands=4, migration_interval=10, migrants=2, topology="ring", directory=None, seed=None,
+                 **evaluator_options):
+        self.config_path = config_path
+        self.islands = islands
+        self.migration_interval = migration_interval
+        self.migrants = migrants
+        self.targets = migration_targets(topology, islands)
+        self.topology = topology
+        self.directory = directory
+        self.seed = seed
+        self.evaluator_options = evaluator_options
+        self.context = multiprocessing.get_context("spawn")
+        self.processes = []
+        self.connections = []
+        self.generations = [0] * islands
+        self.pending = [[] for _ in range(islands)]
+        self.timeline = []
+        self.best_genome = None
+        self.seconds = 0.0
+        self.evaluated = 0
+
+    def island_directory(self, index):
+        return os.path.join(self.directory, f"island-{index:02d}") if self.directory else None
+
+    def start(self):
+        for index in range(self.islands):
+            parent, child = self.context.Pipe()
+            process = self.context.Process(
+                target=_island_loop,
+                args=(index, self.config_path, self.island_directory(index), self.seed, self.migrants, self.evaluator_options, child),
+                name=f"neat-island-{index}")
+            process.start()
+            child.close()
+            self.processes.append(process)
+            self.connections.append(parent)
+        self.generations = [connection.recv()[1] for connection in self.connections]
+        self._load_manifest()
+
+    def _load_manifest(self):
+        path = os.path.join(self.directory, MANIFEST) if self.directory else None
+        if not path or not os.path.exists(path):
+            return
+        with open(path, "rb") as f:
+            manifest = pickle.load(f)
+        if manifest.get("format") != MANIFEST_FORMAT or manifest["islands"] != self.islands:
+            raise ValueError(f"{path} was written for a different island setup")
+        self.timeline = manifest["timeline"]
+        self.best_genome = manifest["best_genome"]
+        self.seconds = self.timeline[-1]["seconds"] if self.timeline else 0.0
+        self.evaluated = self.timeline[-1]["evaluated"] if self.timeline else 0
+        # migrants are only still pending if no island has moved on since the manifest was written
+        if manifest["generations"] == self.generations:
+            self.pending = manifest["pending"]
+        logging.info(f"Resumed {self.islands} islands at generations {self.generations}")
+
+    def _save_manifest(self):
+        manifest = {
+            "format": MANIFEST_FORMAT,
+            "islands": self.islands,
+            "topology": self.topology,
+            "generations": self.generations,
+            "pending": self.pending,
+            "timeline": self.timeline,
+            "best_genome": self.best_genome,
+        }
+        atomic_write(os.path.join(self.directory, MANIFEST), lambda f: pickle.dump(manifest, f, pickle.HIGHEST_PROTOCOL))
+
+    def epoch(self, generations=None):
+        """Run one epoch on every island and migrate, returning its timeline row."""
+        generations = generations or self.migration_interval
+        start = time.perf_counter()
+        for connection, immigrants in zip(self.connections, self.pending):
+            connection.send(("run", generations, immigrants))
+        replies = [connection.recv() for connection in self.connections]
+        self.seconds += time.perf_counter() - start
+
+        self.pending = [[] for _ in range(self.islands)]
+        bests = []
+        for index, (_, generation, best_genome, generation_best, emigrants, evaluated, _) in enumerate(replies):
+            self.generations[index] = generation
+            self.evaluated += evaluated
+            bests.append(generation_best)
+            if self.best_genome is None or best_genome.fitness > self.best_genome.fitness:
+                self.best_genome = best_genome
+            for target in self.targets[index]:
+                # every target gets its own copies, pickling already made them
+                self.pending[target].extend(pickle.loads(pickle.dumps(emigrants, pickle.HIGHEST_PROTOCOL)))
+
+        row = {
+            "seconds": self.seconds,
+            "generation": max(self.generations),
+            "evaluated": self.evaluated,
+            "genomes_per_second": self.evaluated / self.seconds if self.seconds else 0.0,
+            "best_fitness": self.best_genome.fitness,
+            "island_best": bests,
+        }
+        self.timeline.append(row)
+        if self.directory:
+            self._save_manifest()
+        return row
+
+    def run(self, max_generations=None, max_seconds=None, report=None):
+        """Run epochs until an island reaches max_generations or max_seconds have passed, calling report with each row."""
+        while True:
+            generation = max(self.generations)
+            if max_generations is not None and generation >= max_generations:
+                break
+            if max_seconds is not None and self.seconds >= max_seconds:
+                break
+            remaining = self.migration_interval if max_generations is None else min(self.migration_interval, max_generations - generation)
+            row = self.epoch(remaining)
+            if report:
+                report(row)
+        return self.best_genome
+
+    def close(self):
+        for connection in self.connections:
+            try:
+                connection.send(("stop",))
+            except OSError:
+                pass
+        for process in self.processes:
+            process.join()
+        self.processes = []
+        self.connections = []
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def best_at(timeline, seconds):
+    """Best fitness a timeline had reached after seconds of wall-clock time, None before its first epoch."""
+    best = None
+    for row in timeline:
+        if row["seconds"] > seconds:
+            break
+        best = row["best_fitness"]
+    return best
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m ai.islands", description="Train island populations with migration.")
+    parser.add_argument("--islands", type=int, default=os.cpu_count() or 1, help="populations, each in its own process")
+    parser.add_argument("--migration-interval", type=int, default=10, help="generations between migrations")
+    parser.add_argument("--migrants", type=int, default=2, help="best genomes each island sends per migration")
+    parser.add_argument("--topology", choices=TOPOLOGIES, default="ring")
+    parser.add_argument("--generations", type=int, default=None, help="stop when the islands reach this generation")
+    parser.add_argument("--seconds", type=float, default=None, help="stop after this much wall-clock time")
+    parser.add_argument("--checkpoint", default=None, help="directory to checkpoint all islands into and resume from")
+    parser.add_argument("--seed", type=int, default=None, help="seed each island's random state from this")
+    parser.add_argument("--grid", type=parse_grid, default=None, metavar="WxH", help="training board size")
+    parser.add_argument("--config", default=os.path.join(PROJECT_DIR, "config.txt"), help="NEAT config file")
+    parser.add_argument("--report", default=None, help="write the best-fitness timeline as JSON lines")
+    parser.add_argument("--baseline", action="store_true", help="then run one population for the same wall-clock time and compare")
+    args = parser.parse_args(argv)
+    if args.generations is None and args.seconds is None:
+        parser.error("give --generations or --seconds")
+    return args
+
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO)
+    args = parse_args(argv)
+
+    def report(row):
+        logging.info(f"Generation {row['generation']}: best fitness {row['best_fitness']:.2f} after {row['seconds']:.1f}s, "
+                     f"{row['genomes_per_second']:.0f} genomes/s, island bests "
+                     + " ".join(f"{fitness:.1f}" for fitness in row["island_best"]))
+
+    with IslandTrainer(args.config, args.islands, args.migration_interval, args.migrants, args.topology, args.checkpoint,
+                       args.seed, grid=args.grid) as trainer:
+        trainer.run(args.generations, args.seconds, report)
+    runs = {f"islands x{args.islands}": trainer.timeline}
+
+    if args.baseline:
+        logging.info(f"Running a single population for {trainer.seconds:.1f}s")
+        with IslandTrainer(args.config, 1, args.migration_interval, 0, args.topology, None, args.seed, grid=args.grid) as baseline:
+            baseline.run(max_seconds=trainer.seconds, report=report)
+        runs["single population"] = baseline.timeline
+
+    if args.report:
+        with open(args.report, "w") as f:
+            for name, timeline in runs.items():
+                for row in timeline:
+                    f.write(json.dumps({"run": name, **row}) + "\n")
+
+    print(f"{'run':>20} {'genomes/s':>10} " + " ".join(f"{f'best@{share:.0%}':>10}" for share in (0.25, 0.5, 0.75, 1.0)))
+    for name, timeline in runs.items():
+        rate = timeline[-1]["genomes_per_second"] if timeline else 0.0
+        cells = []
+        for share in (0.25, 0.5, 0.75, 1.0):
+            best = best_at(timeline, trainer.seconds * share)
+            cells.append(f"{'-' if best is None else f'{best:.2f}':>10}")
+        print(f"{name:>20} {rate:10.0f} " + " ".join(cells))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
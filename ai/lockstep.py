@@ -0,0 +1,252 @@
+import numpy as np
+
+from snake_game.vec_game import VecSnakeGame
+from ai.ai import TRAINING_GRID, MAX_STEPS_WITHOUT_FOOD, MEMORY_WINDOW
+from ai.network import ACTIVATIONS
+from ai.network_cache import NETWORK_CACHE
+from ai.metrics import PROFILE
+from ai.episodes import EPISODES
+
+
+def network_signature(net):
+    """Activation of each block in order. Networks whose signature is a prefix of another's can share its group."""
+    return tuple(block.activation_name for block in net.blocks)
+
+
+class StackedBlock:
+    """The same LayerBlock position of several networks, padded to one width and stacked on axis 0.
+
+    Every block becomes a dense (sources x targets) matrix of the largest width at
+    this position. Padding sources read slot 0 through zero weights, padding targets,
+    and the whole row of a network without a block here, write the group's scratch
+    slot, which no real node reads.
+    """
+
+    def __init__(self, blocks, scratch):
+        present = [block for block in blocks if block is not None]
+        self.activation = ACTIVATIONS[present[0].activation_name]
+        width = max(len(block.sources) for block in present)
+        height = max(len(block.targets) for block in present)
+        self.sources = np.zeros((len(blocks), width), dtype=np.int64)
+        self.targets = np.full((len(blocks), height), scratch, dtype=np.int64)
+        self.bias = np.zeros((len(blocks), height), dtype=np.float64)
+        self.response = np.zeros((len(blocks), height), dtype=np.float64)
+        self.weights = np.zeros((len(blocks), width, height), dtype=np.float64)
+        for row, block in enumerate(blocks):
+            if block is None:
+                continue
+            sources, targets = len(block.sources), len(block.targets)
+            self.sources[row, :sources] = block.sources
+            self.targets[row, :targets] = block.targets
+            self.bias[row, :targets] = block.bias
+            self.response[row, :targets] = block.response
+            if block.dense:
+                self.weights[row, :sources, :targets] = block.weights
+            else:
+                np.add.at(self.weights[row], (block.edge_sources, block.edge_targets), block.weights)
+
+    def keep(self, mask):
+        self.sources = self.sources[mask]
+        self.targets = self.targets[mask]
+        self.bias = self.bias[mask]
+        self.response = self.response[mask]
+        self.weights = self.weights[mask]
+
+    def forward(self, values):
+        gathered = np.take_along_axis(values, self.sources, axis=1)
+        total = (gathered[:, None, :] @ self.weights)[:, 0, :]
+        np.put_along_axis(values, self.targets, self.activation(self.bias + self.response * total), axis=1)
+
+
+class NetworkGroup:
+    """Networks evaluated with one forward pass per tick, padded to the deepest and widest of them.
+
+    Each network keeps its own slot numbering in its row of values, which has one
+    extra scratch slot at the end for padding to write.
+    """
+
+    def __init__(self, members, nets, depth):
+        first = nets[0]
+        scratch = max(net.num_values for net in nets)
+        self.members = np.array(members, dtype=np.int64)
+        self.num_inputs = first.num_inputs
+        self.output_slots = first.output_slots
+        self.blocks = [StackedBlock([net.blocks[i] if i < len(net.blocks) else None for net in nets], scratch)
+                       for i in range(depth)]
+        self.values = np.zeros((len(members), scratch + 1), dtype=np.float64)
+
+    def keep(self, mask):
+        self.members = self.members[mask]
+        self.values = self.values[mask]
+        for block in self.blocks:
+            block.keep(mask)
+
+    def activate(self, states):
+        self.values[:, :self.num_inputs] = states
+        for block in self.blocks:
+            block.forward(self.values)
+        return self.values[:, self.output_slots]
+
+
+def group_networks(nets, boards=None):
+    """Group nets whose signatures are prefixes of one another, members are positions in nets or the matching boards.
+
+    With a single activation function, as in config.txt, that is one group for the
+    whole population, however far the topologies have diverged.
+    """
+    boards = range(len(nets)) if boards is None else boards
+    by_signature = {}
+    for board, net in zip(boards, nets):
+        by_signature.setdefault(network_signature(net), []).append((board, net))
+    merged = {}
+    for signature in sorted(by_signature, key=len, reverse=True):
+        longest = next((other for other in merged if other[:len(signature)] == signature), signature)
+        merged.setdefault(longest, []).extend(by_signature[signature])
+    return [NetworkGroup([board for board, _ in pairs], [net for _, net in pairs], len(signature))
+            for signature, pairs in merged.items()]
+
+
+def food_distance(games, boards):
+    width = games.grid_width
+    head = games.heads[boards]
+    food = games.food[boards]
+    distance = np.abs(head % width - food % width) + np.abs(head // width - food // width)
+    return np.where(food >= 0, distance, 0)
+
+
+class LockstepEpisodes:
+    """One training episode per network, all boards advancing one tick together.
+
+    Networks are padded into groups, see group_networks, so each tick costs one
+    batched forward pass per group, and a network leaves its group when its game
+    ends. advance() can stop boards after a step budget and later resume any subset
+    of them, which plays out exactly as if they had never paused. Given the same seeds, every finished
+    fitness equals run_episode on SnakeGame(rng=random.Random(seed)).
+    """
+
+    def __init__(self, nets, seeds=None, record=False):
+        num_boards = len(nets)
+        self.nets = nets
+        self.fitness = np.zeros(num_boards, dtype=np.float64)
+        self.steps = np.zeros(num_boards, dtype=np.int64)
+        self.running = np.ones(num_boards, dtype=bool)
+        self.games = VecSnakeGame(num_boards, TRAINING_GRID.width, TRAINING_GRID.height, seeds=seeds)
+
+        self.steps_without_food = np.zeros(num_boards, dtype=np.int64)
+        self.recent_positions = np.full((num_boards, MEMORY_WINDOW), -1, dtype=np.int64)
+        self.recent_count = np.zeros(num_boards, dtype=np.int64)
+        self.actions = np.zeros(num_boards, dtype=np.int64)
+        self.states = self.games.observe()
+        # (boards, actions) of every tick when recording
+        self.action_log = [] if record else None
+
+    def advance(self, boards=None, max_steps=None):
+        """Play boards (default all) until they finish or have taken max_steps steps in total."""
+        active = self.running.copy()
+        if boards is not None:
+            selected = np.zeros_like(active)
+            selected[boards] = True
+            active &= selected
+        if max_steps is not None:
+            active &= self.steps < max_steps
+        if not active.any():
+            return
+
+        games, fitness = self.games, self.fitness
+        steps_without_food, recent_positions, recent_count = self.steps_without_food, self.recent_positions, self.recent_count
+        live = np.flatnonzero(active)
+        groups = group_networks([self.nets[i] for i in live], live)
+        steps_before = int(self.steps.sum())
+        running_before = int(self.running.sum())
+        activate_groups, move, observe = self._activate_groups, games.move, games.observe
+        if PROFILE.enabled:
+            activate_groups = PROFILE.timed("activation", activate_groups)
+            move = PROFILE.timed("simulation", move)
+            observe = PROFILE.timed("sensing", observe)
+
+        while groups:
+            live = np.flatnonzero(active)
+            scale_factor = np.maximum(1, 0.2 * games.length[live])
+            old_distance = food_distance(games, live)
+
+            activate_groups(groups)
+            if self.action_log is not None:
+                self.action_log.append((live, self.actions[live].astype(np.uint8)))
+            move(self.actions, live)
+            self.states = observe()
+            self.steps[live] += 1
+            new_distance = food_distance(games, live)
+
+            closer = old_distance > new_distance
+            further = new_distance > old_distance
+            fitness[live[closer]] += scale_factor[closer] * 0.3 * (old_distance[closer] - new_distance[closer])
+            fitness[live[further]] -= 0.3 * (new_distance[further] - old_distance[further])
+            fitness[live] -= 0.5
+
+            ate = games.ate[live]
+            fitness[live[ate]] += scale_factor[ate] * 20
+            steps_without_food[live[ate]] = 0
+            steps_without_food[live[~ate]] += 1
+            recent_positions[live[ate]] = -1
+            recent_count[live[ate]] = 0
+
+            # the window only ever holds the last MEMORY_WINDOW heads, so a ring buffer
+            # gives the same counts as appending and popping from a list
+            heads = games.heads[live]
+            recent_positions[live, recent_count[live] % MEMORY_WINDOW] = heads
+            recent_count[live] += 1
+            circling = (recent_positions[live] == heads[:, None]).sum(axis=1) > 2
+            fitness[live[circling]] -= 0.5
+
+            crashed = games.done[live]
+            fitness[live[crashed]] -= 24
+            finished = live[crashed | (steps_without_food[live] >= MAX_STEPS_WITHOUT_FOOD)]
+            self.running[finished] = False
+            games.done[finished] = True
+            stopped = finished
+            if max_steps is not None:
+                stopped = np.union1d(finished, live[self.steps[live] >= max_steps])
+            if stopped.size:
+                active[stopped] = False
+                for group in groups:
+                    group.keep(active[group.members])
+                groups = [group for group in groups if len(group.members)]
+
+        if PROFILE.enabled:
+            PROFILE.count("steps", int(self.steps.sum()) - steps_before)
+            PROFILE.count("episodes", running_before - int(self.running.sum()))
+
+    def recorded_actions(self):
+        """The action bytes each board played so far, in board order."""
+        num_boards = len(self.nets)
+        if not self.action_log:
+            return [b""] * num_boards
+        boards = np.concatenate([boards for boards, _ in self.action_log])
+        actions = np.concatenate([actions for _, actions in self.action_log])
+        order = np.argsort(boards, kind="stable")
+        counts = np.bincount(boards, minlength=num_boards)
+        return [chunk.tobytes() for chunk in np.split(actions[order], np.cumsum(counts)[:-1])]
+
+    def record_episodes(self, genomes, boards=None):
+        """Hand boards, the first len(genomes) by default, to EPISODES as those genomes' episodes."""
+        recorded = self.recorded_actions()
+        if boards is None:
+            boards = range(len(genomes))
+        for board, (genome_id, genome) in zip(boards, genomes):
+            EPISODES.add(genome.key, self.games.seeds[board], self.games.grid_width, self.games.grid_height,
+                         recorded[board], int(self.games.score[board]))
+
+    def _activate_groups(self, groups):
+        for group in groups:
+            output = group.activate(self.states[group.members])
+            self.actions[group.members] = np.argmax(output, axis=1)
+
+
+def eval_genomes_lockstep(genomes, config, seeds=None):
+    nets = [NETWORK_CACHE.create(genome, config) for _, genome in genomes]
+    episodes = LockstepEpisodes(nets, seeds, record=EPISODES.enabled)
+    episodes.advance()
+    if EPISODES.enabled:
+        episodes.record_episodes(genomes)
+    for (genome_id, genome), value in zip(genomes, episodes.fitness.tolist()):
+        genome.fitness = value
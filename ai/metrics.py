@@ -0,0 +1,172 @@
+import csv
+import json
+import time
+from collections import defaultdict
+
+import numpy as np
+import neat
+
+
+class Profile:
+    """Process-wide timers and counters fed by the training hot paths.
+
+    Hot paths check enabled once per episode or batch and only then wrap their
+    calls with timed(), so a disabled profile costs a single attribute lookup.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.seconds = defaultdict(float)
+        self.counts = defaultdict(int)
+
+    def timed(self, name, function):
+        seconds = self.seconds
+        clock = time.perf_counter
+
+        def wrapper(*args, **kwargs):
+            start = clock()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                seconds[name] += clock() - start
+        return wrapper
+
+    def add_time(self, name, seconds):
+        self.seconds[name] += seconds
+
+    def count(self, name, amount=1):
+        self.counts[name] += amount
+
+    def take(self):
+        """Return (seconds, counts) gathered so far and start over."""
+        taken = dict(self.seconds), dict(self.counts)
+        self.seconds.clear()
+        self.counts.clear()
+        return taken
+
+
+PROFILE = Profile()
+
+
+def fitness_summary(fitnesses):
+    values = np.array([f for f in fitnesses if f is not None], dtype=np.float64)
+    if not values.size:
+        return {}
+    p25, median, p75 = np.percentile(values, (25, 50, 75)).tolist()
+    return {
+        "fitness_min": float(values.min()),
+        "fitness_p25": p25,
+        "fitness_median": median,
+        "fitness_p75": p75,
+        "fitness_max": float(values.max()),
+        "fitness_mean": float(values.mean()),
+        "fitness_std": float(values.std()),
+    }
+
+
+def genome_size_summary(genomes):
+    nodes = [len(genome.nodes) for genome in genomes]
+    connections = [sum(1 for cg in genome.connections.values() if cg.enabled) for genome in genomes]
+    return {
+        "nodes_mean": sum(nodes) / len(nodes),
+        "nodes_max": max(nodes),
+        "connections_mean": sum(connections) / len(connections),
+        "connections_max": max(connections),
+    }
+
+
+class MetricsReporter(neat.reporting.BaseReporter):
+    """Writes one row of timings and population statistics per generation.
+
+    Rows go to a JSONL file, or CSV when the path ends in .csv, and are flushed as
+    they are written. Timings cover evaluation as a whole plus the simulation,
+    sensing and activation time of in-process evaluators, reproduction and
+    speciation, and checkpointing. Checkpoints are saved after population.run
+    returns, so a generation's row is written when the next one starts or on close().
+    """
+
+    def __init__(self, path, profile=PROFILE):
+        self.path = path
+        self.profile = profile
+        self.csv = path.endswith(".csv")
+        self.file = open(path, "a", newline="")
+        self.writer = None
+        self.pending = None
+        self.generation_start = None
+        self.evaluated = None
+        profile.enabled = True
+
+    def __getstate__(self):
+        # checkpoints pickle the reporters, a restored copy stays closed and silent
+        return {"path": self.path, "file": None}
+
+    def start_generation(self, generation):
+        if self.file is None:
+            return
+        self.flush()
+        self.profile.take()
+        self.generation_start = time.perf_counter()
+        self.pending = {"generation": generation}
+
+    def post_evaluate(self, config, population, species, best_genome):
+        if self.file is None or self.pending is None:
+            return
+        self.evaluated = time.perf_counter()
+        seconds, counts = self.profile.take()
+        evaluation = self.evaluated - self.generation_start
+        steps = counts.get("steps", 0)
+        episodes = counts.get("episodes", 0)
+        networks = counts.get("network_cache_hits", 0) + counts.get("network_cache_misses", 0)
+        self.pending.update({
+            "evaluation_seconds": evaluation,
+            "simulation_seconds": seconds.get("simulation", 0.0),
+            "sensing_seconds": seconds.get("sensing", 0.0),
+            "activation_seconds": seconds.get("activation", 0.0),
+            "serialization_seconds": seconds.get("serialization", 0.0),
+            "bytes_transferred": counts.get("bytes_transferred", 0),
+            "steps": steps,
+            "episodes": episodes,
+            "steps_per_second": steps / evaluation if evaluation else 0.0,
+            "episodes_per_second": episodes / evaluation if evaluation else 0.0,
+            "network_cache_hit_rate": counts.get("network_cache_hits", 0) / networks if networks else 0.0,
+            "best_fitness": best_genome.fitness,
+        })
+        genomes = list(population.values())
+        self.pending.update(fitness_summary([genome.fitness for genome in genomes]))
+        self.pending.update(genome_size_summary(genomes))
+
+    def end_generation(self, config, population, species_set):
+        if self.file is None or self.pending is None or self.evaluated is None:
+            return
+        now = time.perf_counter()
+        self.pending["reproduction_seconds"] = now - self.evaluated
+        self.pending["population"] = len(population)
+        self.pending["species"] = len(species_set.species)
+
+    def flush(self):
+        """Write the pending row, adding the checkpoint time spent since its generation ended."""
+        if self.file is None or self.pending is None or "reproduction_seconds" not in self.pending:
+            return
+        seconds, _ = self.profile.take()
+        row = self.pending
+        row["checkpoint_seconds"] = seconds.get("checkpoint", 0.0)
+        row["wall_seconds"] = time.perf_counter() - self.generation_start
+        self.pending = None
+
+        if self.csv:
+            if self.writer is None:
+                self.writer = csv.DictWriter(self.file, fieldnames=list(row), extrasaction="ignore")
+                if self.file.tell() == 0:
+                    self.writer.writeheader()
+            self.writer.writerow(row)
+        else:
+            self.file.write(json.dumps(row) + "\n")
+        self.file.flush()
+
+    def close(self):
+        if self.file is None:
+            return
+        self.flush()
+        self.file.close()
+        self.file = None
+        self.profile.enabled = False
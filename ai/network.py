@@ -0,0 +1,317 @@
+import copy
+
+import numpy as np
+from neat.activations import ActivationFunctionSet
+
+
+def _sigmoid(z):
+    z = np.clip(5.0 * z, -60.0, 60.0)
+    return 1.0 / (1.0 + np.exp(-z))
+
+
+def _tanh(z):
+    return np.tanh(np.clip(2.5 * z, -60.0, 60.0))
+
+
+def _sin(z):
+    return np.sin(np.clip(5.0 * z, -60.0, 60.0))
+
+
+def _gauss(z):
+    z = np.clip(z, -3.4, 3.4)
+    return np.exp(-5.0 * z ** 2)
+
+
+def _relu(z):
+    return np.where(z > 0.0, z, 0.0)
+
+
+def _softplus(z):
+    z = np.clip(5.0 * z, -60.0, 60.0)
+    return 0.2 * np.log(1 + np.exp(z))
+
+
+def _identity(z):
+    return z
+
+
+def _clamped(z):
+    return np.clip(z, -1.0, 1.0)
+
+
+def _exp(z):
+    return np.exp(np.clip(z, -60.0, 60.0))
+
+
+def _abs(z):
+    return np.abs(z)
+
+
+def _hat(z):
+    return np.maximum(0.0, 1 - np.abs(z))
+
+
+def _square(z):
+    return z ** 2
+
+
+def _cube(z):
+    return z ** 3
+
+
+# NumPy versions of neat.activations, same clamping so results agree to float precision
+ACTIVATIONS = {
+    "sigmoid": _sigmoid,
+    "tanh": _tanh,
+    "sin": _sin,
+    "gauss": _gauss,
+    "relu": _relu,
+    "softplus": _softplus,
+    "identity": _identity,
+    "clamped": _clamped,
+    "exp": _exp,
+    "abs": _abs,
+    "hat": _hat,
+    "square": _square,
+    "cube": _cube,
+}
+
+# neat's own scalar functions, single states are stepped in plain Python with them
+SCALAR_ACTIVATIONS = {name: ActivationFunctionSet().get(name) for name in ACTIVATIONS}
+
+# Blocks whose share of non-zero weights falls below this are evaluated edge by edge
+SPARSE_DENSITY = 0.25
+
+
+def feed_forward_layers(inputs, outputs, connections):
+    """The layers of neat.graphs.feed_forward_layers, found in linear time.
+
+    Nodes are required when they feed an output, and evaluated once every source is
+    an input or evaluated, one layer after the deepest of them. neat's version
+    rescans every connection for every candidate node, which dominates building
+    networks for large genomes.
+    """
+    inputs = set(inputs)
+    sources = {}
+    targets = {}
+    for a, b in connections:
+        sources.setdefault(b, []).append(a)
+        targets.setdefault(a, []).append(b)
+
+    required = set()
+    stack = list(outputs)
+    while stack:
+        node = stack.pop()
+        if node in required or node in inputs:
+            continue
+        required.add(node)
+        stack.extend(sources.get(node, ()))
+
+    pending = {node: len(sources.get(node, ())) for node in required}
+    depth = dict.fromkeys(inputs, 0)
+    ready = list(inputs)
+    layers = []
+    while ready:
+        node = ready.pop()
+        for target in targets.get(node, ()):
+            if target not in pending:
+                continue
+            depth[target] = max(depth.get(target, 0), depth[node] + 1)
+            pending[target] -= 1
+            if not pending[target]:
+                while len(layers) < depth[target]:
+                    layers.append(set())
+                layers[depth[target] - 1].add(target)
+                ready.append(target)
+    return layers
+
+
+class LayerBlock:
+    """Nodes of one topological layer sharing an activation function.
+
+    sources are slots of the value vector feeding the block and targets the slots it
+    writes. Dense blocks keep a (sources x targets) weight matrix, sparse ones keep
+    the edge list as (source position, target position, weight) arrays. node_keys
+    and edge_keys name the genes behind targets and edges, so patched() can refill
+    the parameters from another genome of the same topology.
+    """
+
+    def __init__(self, activation, sources, targets, edges, bias, response, node_keys=(), edge_keys=()):
+        self.activation = ACTIVATIONS[activation]
+        self.activation_name = activation
+        self.sources = np.array(sources, dtype=np.int64)
+        self.targets = np.array(targets, dtype=np.int64)
+        self.bias = np.array(bias, dtype=np.float64)
+        self.response = np.array(response, dtype=np.float64)
+        self.node_keys = tuple(node_keys)
+        self.edge_keys = tuple(edge_keys)
+
+        rows = np.array([e[0] for e in edges], dtype=np.int64)
+        cols = np.array([e[1] for e in edges], dtype=np.int64)
+        weights = np.array([e[2] for e in edges], dtype=np.float64)
+        size = len(sources) * len(targets)
+        self.dense = size > 0 and len(edges) / size >= SPARSE_DENSITY
+        self.edge_sources = rows
+        self.edge_targets = cols
+        if self.dense:
+            self.weights = np.zeros((len(sources), len(targets)), dtype=np.float64)
+            np.add.at(self.weights, (rows, cols), weights)
+        else:
+            self.weights = weights
+
+    @property
+    def nbytes(self):
+        arrays = (self.sources, self.targets, self.bias, self.response, self.edge_sources, self.edge_targets, self.weights)
+        return sum(a.nbytes for a in arrays) + 64 * (len(self.node_keys) + len(self.edge_keys))
+
+    def patched(self, genome):
+        """A copy sharing this block's structure with genome's biases, responses and weights."""
+        block = copy.copy(self)
+        nodes = [genome.nodes[key] for key in self.node_keys]
+        connections = genome.connections
+        block.bias = np.fromiter([ng.bias for ng in nodes], np.float64, len(nodes))
+        block.response = np.fromiter([ng.response for ng in nodes], np.float64, len(nodes))
+        weights = np.fromiter([connections[key].weight for key in self.edge_keys], np.float64, len(self.edge_keys))
+        if self.dense:
+            block.weights = np.zeros_like(self.weights)
+            block.weights[self.edge_sources, self.edge_targets] = weights
+        else:
+            block.weights = weights
+        return block
+
+    def node_evals(self):
+        """(slot, activation, bias, response, [(source slot, weight), ...]) of each target, for activate()."""
+        links = [[] for _ in range(len(self.targets))]
+        weights = self.weights[self.edge_sources, self.edge_targets] if self.dense else self.weights
+        for source, col, weight in zip(self.sources[self.edge_sources].tolist(), self.edge_targets.tolist(), weights.tolist()):
+            links[col].append((source, weight))
+        activation = SCALAR_ACTIVATIONS[self.activation_name]
+        return [(slot, activation, bias, response, node_links) for slot, bias, response, node_links
+                in zip(self.targets.tolist(), self.bias.tolist(), self.response.tolist(), links)]
+
+    def forward(self, values):
+        gathered = values[..., self.sources]
+        if self.dense:
+            total = gathered @ self.weights
+        else:
+            total = np.zeros(values.shape[:-1] + (len(self.targets),), dtype=np.float64)
+            contributions = gathered[..., self.edge_sources] * self.weights
+            if total.ndim == 1:
+                np.add.at(total, self.edge_targets, contributions)
+            else:
+                np.add.at(total, (slice(None), self.edge_targets), contributions)
+        values[..., self.targets] = self.activation(self.bias + self.response * total)
+
+
+class CompiledNetwork:
+    """A feed-forward NEAT phenotype flattened into NumPy layer blocks.
+
+    Evaluates the same nodes in the same topological layers as
+    neat.nn.FeedForwardNetwork, so outputs match it to float tolerance, and can
+    run a whole matrix of inputs through activate_batch. A single state is too
+    small to pay for a NumPy call per block, so activate walks a flat plan built
+    from the blocks on first use instead, summing edges in neat's order.
+    """
+
+    def __init__(self, num_inputs, output_slots, num_values, blocks):
+        self.num_inputs = num_inputs
+        self.output_slots = np.array(output_slots, dtype=np.int64)
+        self.num_values = num_values
+        self.blocks = blocks
+        self.plan = None
+
+    @staticmethod
+    def create(genome, config, prune=False):
+        """Compile genome, after ai.pruning.prune_genome if prune is set."""
+        if prune:
+            from ai.pruning import prune_genome
+            genome = prune_genome(genome, config)[0]
+        genome_config = config.genome_config
+        input_keys = genome_config.input_keys
+        output_keys = genome_config.output_keys
+
+        connections = [cg.key for cg in genome.connections.values() if cg.enabled]
+        layers = feed_forward_layers(input_keys, output_keys, connections)
+
+        # Inputs take the first slots and every output gets one, evaluated or not,
+        # so unreachable outputs read 0.0 as they do in FeedForwardNetwork.
+        slots = {key: i for i, key in enumerate(input_keys)}
+        for key in output_keys:
+            slots[key] = len(slots)
+        for layer in layers:
+            for node in sorted(layer):
+                if node not in slots:
+                    slots[node] = len(slots)
+
+        incoming = {}
+        for key in connections:
+            incoming.setdefault(key[1], []).append((key[0], genome.connections[key].weight))
+
+        blocks = []
+        for layer in layers:
+            by_activation = {}
+            for node in sorted(layer):
+                ng = genome.nodes[node]
+                if ng.aggregation != "sum":
+                    raise ValueError(f"Unsupported aggregation for compiled network: {ng.aggregation}")
+                if ng.activation not in ACTIVATIONS:
+                    raise ValueError(f"Unsupported activation for compiled network: {ng.activation}")
+                by_activation.setdefault(ng.activation, []).append(node)
+
+            for activation, nodes in by_activation.items():
+                sources = []
+                source_pos = {}
+                edges = []
+                edge_keys = []
+                for col, node in enumerate(nodes):
+                    for src, weight in incoming.get(node, ()):
+                        slot = slots[src]
+                        if slot not in source_pos:
+                            source_pos[slot] = len(sources)
+                            sources.append(slot)
+                        edges.append((source_pos[slot], col, weight))
+                        edge_keys.append((src, node))
+                blocks.append(LayerBlock(
+                    activation,
+                    sources,
+                    [slots[node] for node in nodes],
+                    edges,
+                    [genome.nodes[node].bias for node in nodes],
+                    [genome.nodes[node].response for node in nodes],
+                    nodes,
+                    edge_keys))
+
+        return CompiledNetwork(len(input_keys), [slots[key] for key in output_keys], len(slots), blocks)
+
+    @property
+    def nbytes(self):
+        return self.output_slots.nbytes + sum(block.nbytes for block in self.blocks)
+
+    def patched(self, genome):
+        """The same network with genome's parameters, genome must have this network's topology."""
+        return CompiledNetwork(self.num_inputs, self.output_slots, self.num_values, [block.patched(genome) for block in self.blocks])
+
+    def activate(self, inputs):
+        if len(inputs) != self.num_inputs:
+            raise RuntimeError(f"Expected {self.num_inputs} inputs, got {len(inputs)}")
+        if self.plan is None:
+            self.plan = ([entry for block in self.blocks for entry in block.node_evals()], self.output_slots.tolist())
+        node_evals, output_slots = self.plan
+        values = [0.0] * self.num_values
+        values[:self.num_inputs] = inputs
+        for slot, activation, bias, response, links in node_evals:
+            total = 0.0
+            for source, weight in links:
+                total += values[source] * weight
+            values[slot] = activation(bias + response * total)
+        return [values[slot] for slot in output_slots]
+
+    def activate_batch(self, states):
+        states = np.asarray(states, dtype=np.float64)
+        if states.ndim != 2 or states.shape[1] != self.num_inputs:
+            raise RuntimeError(f"Expected a (batch, {self.num_inputs}) input matrix, got shape {states.shape}")
+        values = np.zeros((states.shape[0], self.num_values), dtype=np.float64)
+        values[:, :self.num_inputs] = states
+        for block in self.blocks:
+            block.forward(values)
+        return values[:, self.output_slots]
@@ -0,0 +1,87 @@
+import sys
+import logging
+from collections import OrderedDict
+
+from ai.network import CompiledNetwork
+from ai.metrics import PROFILE
+from ai.fitness_cache import genome_structure_hash
+
+
+def genome_topology_key(genome):
+    """What CompiledNetwork.create's graph analysis depends on, as a dict key.
+
+    Node keys, activations and aggregations and the enabled connection keys, so
+    genomes that differ only in weights, biases or responses share a key. The key
+    is exact, frozensets hash without sorting the genes.
+    """
+    nodes = frozenset([(key, ng.activation, ng.aggregation) for key, ng in genome.nodes.items()])
+    connections = frozenset([key for key, cg in genome.connections.items() if cg.enabled])
+    return nodes, connections
+
+
+class NetworkCache:
+    """LRU of compiled networks, so only new topologies pay for the graph analysis.
+
+    A genome whose topology is cached gets the cached network patched with its own
+    biases, responses and weights, the same network create would build. Pruned
+    networks depend on the weights too (zero edges and constant nodes go), so they
+    are cached under the full genome_structure_hash and returned as they are. The
+    cache keeps at most max_entries networks and roughly max_bytes of networks and keys.
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self.entries),
+            "bytes": self.bytes,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def clear(self):
+        self.entries.clear()
+        self.bytes = 0
+
+    def create(self, genome, config, prune=False):
+        """CompiledNetwork.create(genome, config, prune) through the cache."""
+        key = ("pruned", genome_structure_hash(genome)) if prune else genome_topology_key(genome)
+        entry = self.entries.get(key)
+        if entry is not None:
+            net = entry[0]
+            self.entries.move_to_end(key)
+            self.hits += 1
+            if PROFILE.enabled:
+                PROFILE.count("network_cache_hits")
+            return net if prune else net.patched(genome)
+
+        self.misses += 1
+        if PROFILE.enabled:
+            PROFILE.count("network_cache_misses")
+        net = CompiledNetwork.create(genome, config, prune)
+        size = net.nbytes + sum(sys.getsizeof(part) for part in key)
+        self.entries[key] = (net, size)
+        self.bytes += size
+        while len(self.entries) > 1 and (len(self.entries) > self.max_entries or self.bytes > self.max_bytes):
+            self.bytes -= self.entries.popitem(last=False)[1][1]
+            self.evictions += 1
+        return net
+
+    def log_stats(self):
+        stats = self.stats()
+        logging.info(f"Network cache: {stats['entries']} networks, {stats['bytes'] / 1024:.0f} KiB, "
+                     f"hit rate {stats['hit_rate']:.1%} ({stats['hits']}/{stats['hits'] + stats['misses']})")
+
+
+# process-wide cache used by the evaluators and the winner replay
+NETWORK_CACHE = NetworkCache()
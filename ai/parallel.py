@@ -0,0 +1,185 @@
+import os
+import time
+import pickle
+import random
+import logging
+import multiprocessing
+
+import neat
+
+from ai.ai import eval_genomes_fast, run_episode, new_training_game, TRAINING_GRID
+from ai.network_cache import NETWORK_CACHE
+from ai.seeding import MultiSeedEvaluator, aggregate_fitness, seeded_episodes
+from ai.fitness_cache import FitnessCache
+from ai.racing import RacingEvaluator
+from ai.lockstep import eval_genomes_lockstep
+from ai.metrics import PROFILE
+
+_worker_config = None
+
+
+def load_config(config_path):
+    return neat.Config(
+        neat.DefaultGenome,
+        neat.DefaultReproduction,
+        neat.DefaultSpeciesSet,
+        neat.DefaultStagnation,
+        config_path)
+
+
+def genome_payload(genome):
+    """Reduce a genome to plain tuples, all a worker needs to rebuild its network."""
+    nodes = tuple((ng.key, ng.bias, ng.response, ng.activation, ng.aggregation) for ng in genome.nodes.values())
+    connections = tuple((cg.key[0], cg.key[1], cg.weight, cg.enabled) for cg in genome.connections.values())
+    return genome.key, nodes, connections
+
+
+def genome_from_payload(payload, config):
+    key, nodes, connections = payload
+    genome_config = config.genome_config
+    genome = config.genome_type(key)
+    for node_key, bias, response, activation, aggregation in nodes:
+        ng = genome_config.node_gene_type(node_key)
+        ng.bias = bias
+        ng.response = response
+        ng.activation = activation
+        ng.aggregation = aggregation
+        genome.nodes[node_key] = ng
+    for in_key, out_key, weight, enabled in connections:
+        cg = genome_config.connection_gene_type((in_key, out_key))
+        cg.weight = weight
+        cg.enabled = enabled
+        genome.connections[cg.key] = cg
+    return genome
+
+
+def init_worker(config_path, grid=None):
+    """Set up an evaluation process: load the NEAT config, take the training grid size and reseed."""
+    global _worker_config
+    _worker_config = load_config(config_path)
+    if grid is not None:
+        TRAINING_GRID.resize(*grid)
+    # forked workers inherit the parent's random state, so give each its own food stream
+    random.seed()
+
+
+def worker_config():
+    """The NEAT config init_worker loaded in this process."""
+    return _worker_config
+
+
+def evaluate_genome(genome, seeds, aggregation, quantile):
+    """Fitness of genome in a worker, its seeded episodes combined when seeds are given."""
+    net = NETWORK_CACHE.create(genome, _worker_config)
+    if seeds is None:
+        return run_episode(net, new_training_game())
+    return aggregate_fitness(seeded_episodes(net, seeds), aggregation, quantile)
+
+
+def evaluate_payload(task):
+    """evaluate_genome for a (genome_payload, seeds, aggregation, quantile) task."""
+    payload, seeds, aggregation, quantile = task
+    return evaluate_genome(genome_from_payload(payload, _worker_config), seeds, aggregation, quantile)
+
+
+class ParallelEvaluator:
+    """Fitness function that shards genomes across a persistent process pool.
+
+    Workers load the NEAT config once at startup and receive genome_payload tuples.
+    Fitness comes back in genome order. Given a SeedSchedule, each genome plays
+    every scheduled seed and the episodes are combined with aggregate_fitness.
+    With one worker it evaluates in-process instead.
+    """
+
+    def __init__(self, config_path, workers=None, chunksize=None, schedule=None, aggregation="mean", quantile=0.5):
+        self.config_path = config_path
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+        self.chunksize = chunksize
+        self.schedule = schedule
+        self.aggregation = aggregation
+        self.quantile = quantile
+        self.pool = None
+
+    def start(self):
+        if self.pool is None and self.workers > 1:
+            logging.info(f"Starting evaluation pool with {self.workers} workers")
+            self.pool = multiprocessing.Pool(self.workers, initializer=init_worker,
+                                             initargs=(self.config_path, (TRAINING_GRID.width, TRAINING_GRID.height)))
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __call__(self, genomes, config):
+        if self.workers <= 1:
+            if self.schedule is None:
+                eval_genomes_fast(genomes, config)
+            else:
+                MultiSeedEvaluator(self.schedule, self.aggregation, self.quantile)(genomes, config)
+            return
+
+        self.start()
+        start = time.perf_counter()
+        seeds = self.schedule.seeds() if self.schedule is not None else None
+        tasks = [(genome_payload(genome), seeds, self.aggregation, self.quantile) for _, genome in genomes]
+        if PROFILE.enabled:
+            # the pool pickles the tasks again, this pass only measures them
+            PROFILE.count("bytes_transferred", len(pickle.dumps(tasks, pickle.HIGHEST_PROTOCOL)))
+            PROFILE.add_time("serialization", time.perf_counter() - start)
+        chunksize = self.chunksize or max(1, len(tasks) // (self.workers * 4))
+        for (genome_id, genome), fitness in zip(genomes, self.pool.map(evaluate_payload, tasks, chunksize)):
+            genome.fitness = fitness
+
+
+def make_evaluator(config_path, workers=1, chunksize=None, schedule=None, aggregation="mean", quantile=0.5, cache_size=0,
+                   racing=None, racing_keep=0.5, listen=None, shared_memory=False, lockstep=False, grid=None):
+    if grid is not None:
+        # workers started from here take the size with them
+        TRAINING_GRID.resize(*grid)
+    if cache_size and schedule is None:
+        logging.warning("The fitness cache needs seeded episodes, unseeded fitness is re-sampled every generation")
+        cache_size = 0
+    if listen:
+        from ai.worker import parse_address
+        from ai.coordinator import SocketEvaluator
+
+        if racing:
+            raise ValueError("Racing cannot be combined with socket workers")
+        evaluator = SocketEvaluator(config_path, parse_address(listen), schedule=schedule, aggregation=aggregation, quantile=quantile)
+        evaluator.start()
+        return FitnessCache(evaluator, schedule, cache_size) if cache_size else evaluator
+    if racing:
+        if cache_size:
+            # cut genomes only get an estimate, caching it would mix it with full scores
+            raise ValueError("Racing cannot be combined with the fitness cache")
+        if workers is None or workers > 1:
+            logging.warning("Racing evaluates in-process, ignoring the worker count")
+        return RacingEvaluator(schedule, racing, racing_keep, aggregation, quantile)
+    if lockstep and (workers is None or workers > 1):
+        logging.warning("Lockstep evaluation runs in-process, the worker pool evaluates genome by genome")
+    if workers is None or workers > 1:
+        if shared_memory:
+            from ai.shared_arena import SharedArenaEvaluator
+
+            evaluator = SharedArenaEvaluator(config_path, workers, chunksize, schedule, aggregation, quantile)
+        else:
+            evaluator = ParallelEvaluator(config_path, workers, chunksize, schedule, aggregation, quantile)
+    elif schedule is not None:
+        # seeded episodes already run as one lockstep batch
+        evaluator = MultiSeedEvaluator(schedule, aggregation, quantile)
+    elif lockstep:
+        evaluator = eval_genomes_lockstep
+    else:
+        evaluator = eval_genomes_fast
+    if cache_size:
+        evaluator = FitnessCache(evaluator, schedule, cache_size)
+    return evaluator
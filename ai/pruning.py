@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""Structural simplification of feed-forward genomes before they are compiled.
+
+neat's feed_forward_layers already skips nodes that cannot reach an output or that
+no input feeds, but it still evaluates nodes whose only consumers never run (a
+consumer with an unfed input is skipped as a whole) and every zero-weight edge.
+prune_genome removes those, folds nodes left without inputs into the biases of
+their consumers, and returns a genome whose network gives the same outputs to
+float tolerance. Report a population's savings with
+
+    python -m ai.pruning winner.sng checkpoints/checkpoint-000100.pkl
+"""
+import os
+import sys
+import copy
+import argparse
+
+from ai.network import feed_forward_layers
+
+
+class PruneResult:
+    """Gene counts of a genome before and after pruning.
+
+    nodes and connections count every node and enabled connection gene, evaluated
+    ones count what the compiled network actually computes each step.
+    """
+
+    def __init__(self, key, nodes, connections, evaluated_nodes, evaluated_connections):
+        self.key = key
+        self.nodes = nodes
+        self.connections = connections
+        self.evaluated_nodes = evaluated_nodes
+        self.evaluated_connections = evaluated_connections
+        self.pruned_nodes = nodes
+        self.pruned_connections = connections
+        self.pruned_evaluated_nodes = evaluated_nodes
+        self.pruned_evaluated_connections = evaluated_connections
+        self.folded = 0
+
+    @property
+    def nodes_removed(self):
+        return self.nodes - self.pruned_nodes
+
+    @property
+    def connections_removed(self):
+        return self.connections - self.pruned_connections
+
+
+def prune_genome(genome, config):
+    """(pruned genome, PruneResult).
+
+    The genome itself is left untouched, the pruned one shares its unchanged genes
+    and is meant to be compiled, not mutated.
+    """
+    genome_config = config.genome_config
+    inputs = genome_config.input_keys
+    outputs = genome_config.output_keys
+    enabled = {cg.key: cg for cg in genome.connections.values() if cg.enabled}
+
+    layers = feed_forward_layers(inputs, outputs, list(enabled))
+    evaluated = set().union(*layers)
+    incoming = {}
+    for key, cg in enabled.items():
+        if key[1] in evaluated:
+            incoming.setdefault(key[1], []).append(cg)
+    result = PruneResult(genome.key, len(genome.nodes), len(enabled), len(evaluated),
+                         sum(len(edges) for edges in incoming.values()))
+
+    # forward in layer order: drop zero-weight edges, fold edges from constant nodes
+    constants = {}
+    biases = {}
+    kept = {}
+    for layer in layers:
+        for node in sorted(layer):
+            ng = genome.nodes[node]
+            if ng.aggregation != "sum":
+                raise ValueError(f"Unsupported aggregation for pruning: {ng.aggregation}")
+            offset = 0.0
+            remaining = []
+            for cg in incoming[node]:
+                if cg.weight == 0.0:
+                    continue
+                if cg.key[0] in constants:
+                    offset += cg.weight * constants[cg.key[0]]
+                else:
+                    remaining.append(cg)
+            bias = ng.bias + ng.response * offset if offset else ng.bias
+            biases[node] = bias
+            kept[node] = remaining
+            if not remaining:
+                constants[node] = genome_config.activation_defs.get(ng.activation)(bias)
+                result.folded += 1
+
+    # backward from the outputs over the kept edges, constants no longer need their sources
+    needed = set()
+    stack = [key for key in outputs if key in kept and key not in constants]
+    while stack:
+        node = stack.pop()
+        if node in needed:
+            continue
+        needed.add(node)
+        stack.extend(cg.key[0] for cg in kept[node] if cg.key[0] not in needed and cg.key[0] in kept)
+
+    pruned = config.genome_type(genome.key)
+    pruned.fitness = genome.fitness
+    for node in set(outputs) | needed:
+        ng = genome.nodes[node]
+        if biases.get(node, ng.bias) != ng.bias:
+            ng = copy.copy(ng)
+            ng.bias = biases[node]
+        pruned.nodes[node] = ng
+        for cg in kept.get(node, ()):
+            pruned.connections[cg.key] = cg
+    for node in outputs:
+        if node in constants:
+            # an output without inputs is never evaluated, a zero edge keeps its constant value
+            anchor = copy.copy(incoming[node][0])
+            anchor.key = (inputs[0], node)
+            anchor.weight = 0.0
+            anchor.enabled = True
+            pruned.connections[anchor.key] = anchor
+
+    # every node left is evaluated except outputs nothing reaches
+    result.pruned_nodes = len(pruned.nodes)
+    result.pruned_connections = len(pruned.connections)
+    result.pruned_evaluated_nodes = len(needed) + sum(1 for key in outputs if key in constants)
+    result.pruned_evaluated_connections = len(pruned.connections)
+    return pruned, result
+
+
+def prune_report(genomes, config):
+    """(per-genome PruneResults, population totals)."""
+    results = [prune_genome(genome, config)[1] for genome in genomes]
+    totals = {"genomes": len(results), "folded": sum(r.folded for r in results)}
+    for name in ("nodes", "connections", "evaluated_nodes", "evaluated_connections"):
+        totals[name] = sum(getattr(r, name) for r in results)
+        totals["pruned_" + name] = sum(getattr(r, "pruned_" + name) for r in results)
+    return results, totals
+
+
+def _load_genomes(path, config):
+    from ai.genome_file import EXTENSION, read_genomes, pickled_genomes, _load_pickle
+
+    if path.endswith(EXTENSION):
+        return read_genomes(path, config)[0]
+    return pickled_genomes(_load_pickle(path))[0]
+
+
+def main(argv=None):
+    from ai.parallel import load_config
+
+    parser = argparse.ArgumentParser(prog="python -m ai.pruning", description="Report what structural pruning removes from genomes.")
+    parser.add_argument("paths", nargs="+", help=".sng genome files, winner.pkl or checkpoint files")
+    parser.add_argument("--config", default=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config.txt"),
+                        help="NEAT config file")
+    parser.add_argument("--top", type=int, default=10, help="genomes to list, most evaluated connections removed first")
+    args = parser.parse_args(argv)
+    config = load_config(args.config)
+
+    for path in args.paths:
+        results, totals = prune_report(_load_genomes(path, config), config)
+        print(f"{path}: {totals['genomes']} genomes, {totals['folded']} constant nodes folded")
+        for name in ("nodes", "connections", "evaluated_nodes", "evaluated_connections"):
+            before, after = totals[name], totals["pruned_" + name]
+            print(f"  {name.replace('_', ' '):22} {before:7} -> {after:7} ({(before - after) / before if before else 0:.1%} removed)")
+        results.sort(key=lambda r: r.evaluated_connections - r.pruned_evaluated_connections, reverse=True)
+        for r in results[:args.top]:
+            print(f"  genome {r.key:6}: -{r.nodes_removed} nodes, -{r.connections_removed} connections, "
+                  f"evaluated {r.evaluated_nodes}/{r.evaluated_connections} -> {r.pruned_evaluated_nodes}/{r.pruned_evaluated_connections}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+import random
+
+import numpy as np
+import neat
+
+from ai.ai import run_episode, new_training_game
+from ai.network_cache import NETWORK_CACHE
+from ai.lockstep import LockstepEpisodes
+from ai.episodes import EPISODES
+
+AGGREGATIONS = ("mean", "min", "quantile")
+
+
+class SeedSchedule(neat.reporting.BaseReporter):
+    """Hands out the episode seeds for the current generation.
+
+    Add it to the population with add_reporter so it tracks the generation. Every
+    genome of a generation plays the same seeds, so they all see the same food
+    sequences. The seeds are redrawn every period generations, never if period is
+    None, which lets a FitnessCache reuse scores across generations.
+    """
+
+    def __init__(self, base_seed=0, episodes=1, period=1):
+        self.base_seed = base_seed
+        self.episodes = episodes
+        self.period = period
+        self.generation = 0
+
+    def start_generation(self, generation):
+        self.generation = generation
+
+    def seeds_for(self, generation):
+        epoch = generation // self.period if self.period else 0
+        rng = random.Random(f"{self.base_seed}:{epoch}")
+        return [rng.getrandbits(32) for _ in range(self.episodes)]
+
+    def seeds(self):
+        return self.seeds_for(self.generation)
+
+
+def aggregate_fitness(values, aggregation="mean", quantile=0.5):
+    if aggregation == "mean":
+        return sum(values) / len(values)
+    if aggregation == "min":
+        return min(values)
+    if aggregation == "quantile":
+        return float(np.quantile(values, quantile))
+    raise ValueError(f"Unknown fitness aggregation: {aggregation}")
+
+
+def seeded_episodes(net, seeds, genome_key=None):
+    """Play net on each seed in turn, recording the first episode when EPISODES is enabled."""
+    episodes = []
+    for i, seed in enumerate(seeds):
+        game = new_training_game(random.Random(seed))
+        if i == 0 and genome_key is not None and EPISODES.enabled:
+            actions = bytearray()
+            episodes.append(run_episode(net, game, actions))
+            EPISODES.add(genome_key, seed, game.grid_width, game.grid_height, actions, game.score)
+        else:
+            episodes.append(run_episode(net, game))
+    return episodes
+
+
+class MultiSeedEvaluator:
+    """Fitness function playing each genome on every seed of the schedule.
+
+    The per-episode scores are combined with aggregate_fitness. In batched mode
+    all genomes x seeds episodes run as one lockstep batch, otherwise each genome
+    plays its seeds one after another.
+    """
+
+    def __init__(self, schedule, aggregation="mean", quantile=0.5, batched=True):
+        if aggregation not in AGGREGATIONS:
+            raise ValueError(f"Unknown fitness aggregation: {aggregation}")
+        self.schedule = schedule
+        self.aggregation = aggregation
+        self.quantile = quantile
+        self.batched = batched
+
+    def __call__(self, genomes, config):
+        seeds = self.schedule.seeds()
+        nets = [NETWORK_CACHE.create(genome, config) for _, genome in genomes]
+
+        if self.batched:
+            # seed-major boards, so the first len(nets) boards play the first seed
+            batch = LockstepEpisodes(nets * len(seeds), [seed for seed in seeds for _ in nets], record=EPISODES.enabled)
+            batch.advance()
+            if EPISODES.enabled:
+                batch.record_episodes(genomes)
+            episodes = batch.fitness.reshape(len(seeds), len(nets)).T.tolist()
+        else:
+            episodes = [seeded_episodes(net, seeds, genome.key) for net, (_, genome) in zip(nets, genomes)]
+
+        for (genome_id, genome), values in zip(genomes, episodes):
+            genome.fitness = aggregate_fitness(values, self.aggregation, self.quantile)
@@ -0,0 +1,141 @@
+# N, NE, E, SE, S, SW, W, NW, the order compute_state has always used
+DIRECTIONS_8 = ((0, -1), (1, -1), (1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1))
+
+CURRENT_DIRECTION_INDEX = {(0, -1): 0, (1, 0): 1, (0, 1): 2, (-1, 0): 3}
+
+_TABLES = {}
+
+
+class SensorTables:
+    """Per-cell lookups for one board size, shared by every sensor on that size."""
+
+    def __init__(self, grid_width, grid_height):
+        self.grid_width = grid_width
+        self.grid_height = grid_height
+        self.max_dim = max(grid_width, grid_height)
+
+        # walls[cell] holds the 8 normalized wall distances seen from that cell and
+        # rays[cell][d] the flat indices of the cells along direction d, nearest first
+        self.walls = []
+        self.rays = []
+        for y in range(grid_height):
+            for x in range(grid_width):
+                walls = []
+                rays = []
+                for dx, dy in DIRECTIONS_8:
+                    ray = []
+                    rx, ry = x + dx, y + dy
+                    while 0 <= rx < grid_width and 0 <= ry < grid_height:
+                        ray.append(ry * grid_width + rx)
+                        rx += dx
+                        ry += dy
+                    walls.append(len(ray) / self.max_dim)
+                    rays.append(tuple(ray))
+                self.walls.append(tuple(walls))
+                self.rays.append(tuple(rays))
+        self._bit_rays = None
+
+    @property
+    def bit_rays(self):
+        """bit_rays[cell][d] is (mask of the ray's cells, index step along it), built on first use."""
+        if self._bit_rays is None:
+            deltas = [dy * self.grid_width + dx for dx, dy in DIRECTIONS_8]
+            self._bit_rays = [tuple((sum(1 << c for c in ray), delta) for ray, delta in zip(rays, deltas))
+                              for rays in self.rays]
+        return self._bit_rays
+
+
+def get_tables(grid_width, grid_height):
+    key = (grid_width, grid_height)
+    tables = _TABLES.get(key)
+    if tables is None:
+        tables = _TABLES[key] = SensorTables(grid_width, grid_height)
+    return tables
+
+
+class Sensor:
+    """Builds the 32-value network input for a game, matching compute_state exactly.
+
+    Wall distances come from the cached per-cell tables, body rays walk the game's
+    occupancy grid and stop at the first hit, and food is located in closed form.
+    For a BitboardSnakeGame each body ray is one masked bit scan instead.
+    """
+
+    def __init__(self, game):
+        self.game = game
+        self.tables = get_tables(game.grid_width, game.grid_height)
+        self.bitboard = isinstance(game.occupancy, int)
+
+    def sense(self):
+        game = self.game
+        tables = self.tables
+        max_dim = tables.max_dim
+        head_x, head_y = game.snake[0]
+        head = head_y * game.grid_width + head_x
+
+        wall_info = list(tables.walls[head])
+
+        food_info = [0] * 8
+        if game.food is None:
+            food_x, food_y = -1, -1
+        else:
+            food_x, food_y = game.food
+        diff_x = food_x - head_x
+        diff_y = food_y - head_y
+        if diff_x == 0:
+            if diff_y < 0:
+                food_info[0] = -diff_y / max_dim
+            elif diff_y > 0:
+                food_info[4] = diff_y / max_dim
+        elif diff_y == 0:
+            if diff_x > 0:
+                food_info[2] = diff_x / max_dim
+            else:
+                food_info[6] = -diff_x / max_dim
+        elif diff_x == diff_y:
+            if diff_x > 0:
+                food_info[3] = diff_x / max_dim
+            else:
+                food_info[7] = -diff_x / max_dim
+        elif diff_x == -diff_y:
+            if diff_x > 0:
+                food_info[1] = diff_x / max_dim
+            else:
+                food_info[5] = -diff_x / max_dim
+
+        body_info = [0] * 8
+        occupancy = game.occupancy
+        if self.bitboard:
+            # the nearest hit is the lowest set bit on rays running up the index, the highest otherwise
+            for d, (mask, delta) in enumerate(tables.bit_rays[head]):
+                hits = occupancy & mask
+                if hits:
+                    hit = (hits & -hits).bit_length() - 1 if delta > 0 else hits.bit_length() - 1
+                    body_info[d] = (hit - head) // delta / max_dim
+        else:
+            for d, ray in enumerate(tables.rays[head]):
+                for steps, cell in enumerate(ray, 1):
+                    if occupancy[cell]:
+                        body_info[d] = steps / max_dim
+                        break
+
+        current_dir = [0, 0, 0, 0]
+        index = CURRENT_DIRECTION_INDEX.get(game.direction)
+        if index is not None:
+            current_dir[index] = 1
+
+        tail = game.snake[-1]
+        diff_x = tail[0] - head_x
+        diff_y = tail[1] - head_y
+        tail_dir = [0, 0, 0, 0]
+        if abs(diff_x) >= abs(diff_y):
+            if diff_x > 0:
+                tail_dir[1] = 1
+            elif diff_x < 0:
+                tail_dir[3] = 1
+        elif diff_y > 0:
+            tail_dir[2] = 1
+        else:
+            tail_dir[0] = 1
+
+        return wall_info + food_info + body_info + current_dir + tail_dir
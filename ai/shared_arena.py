@@ -0,0 +1,254 @@
+"""Population transfer to pool workers through shared memory.
+
+GenomeArena keeps the packed node and connection records of ai.genome_file in
+shared memory segments, next to a slot directory and a fitness array. Between
+generations only genomes that are not in the arena yet are packed and written,
+elites and other survivors keep their slots. Pool tasks then carry nothing but
+the arena layout and a list of slots, and workers write fitness straight into the
+shared array.
+"""
+import os
+import sys
+import time
+import pickle
+import logging
+from multiprocessing import shared_memory, resource_tracker
+
+import numpy as np
+
+from ai import parallel
+from ai.parallel import ParallelEvaluator
+from ai.genome_file import NODE_DTYPE, CONNECTION_DTYPE, genome_records, genome_from_records
+from ai.metrics import PROFILE
+
+SLOT_DTYPE = np.dtype([
+    ("key", "<i8"),
+    ("node_start", "<i8"),
+    ("nodes", "<i8"),
+    ("connection_start", "<i8"),
+    ("connections", "<i8"),
+])
+TABLES = (("slots", SLOT_DTYPE), ("nodes", NODE_DTYPE), ("connections", CONNECTION_DTYPE), ("fitness", np.dtype("<f8")))
+
+
+def _attach_segment(name):
+    """Open an existing segment without letting this process's resource tracker unlink it on exit.
+
+    The owner unlinks its segments, a worker that only attached must leave them alone.
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    segment = shared_memory.SharedMemory(name=name)
+    if os.name == "posix":
+        # registered under the POSIX name, with the leading slash SharedMemory.name leaves off
+        resource_tracker.unregister("/" + segment.name, "shared_memory")
+    return segment
+
+
+class ArenaBuffers:
+    """The shared segments of an arena and numpy views over them.
+
+    The owner creates them with capacities, a worker attaches by the names in the
+    owner's layout.
+    """
+
+    def __init__(self, capacities, names=None):
+        self.capacities = dict(capacities)
+        self.segments = {}
+        for name, dtype in TABLES:
+            size = max(1, self.capacities[name] * dtype.itemsize)
+            if names is None:
+                segment = shared_memory.SharedMemory(create=True, size=size)
+            else:
+                segment = _attach_segment(names[name])
+            self.segments[name] = segment
+            setattr(self, name, np.ndarray(self.capacities[name], dtype, segment.buf))
+
+    @property
+    def names(self):
+        return {name: segment.name for name, segment in self.segments.items()}
+
+    def close(self, unlink=False):
+        for name, _ in TABLES:
+            setattr(self, name, None)
+        for segment in self.segments.values():
+            segment.close()
+            if unlink:
+                segment.unlink()
+        self.segments = {}
+
+
+class GenomeArena:
+    """Genomes packed into shared memory, each one in a slot of the directory.
+
+    update() writes the genomes that are not in the arena yet and frees the slots
+    of those that are gone. A genome is recognised by key and identity, NEAT hands
+    survivors over as the same objects and builds every offspring anew. When the
+    new records do not fit after the last one, the live records are compacted, and
+    when they still do not fit the segments are reallocated twice as large.
+    """
+
+    def __init__(self, slots=512, nodes=1 << 14, connections=1 << 16):
+        self.buffers = ArenaBuffers({"slots": slots, "nodes": nodes, "connections": connections, "fitness": slots})
+        self.activations = []
+        self.aggregations = []
+        self.locations = {}
+        self.free_slots = list(range(slots - 1, -1, -1))
+        self.node_top = 0
+        self.connection_top = 0
+
+    @property
+    def layout(self):
+        """What a worker needs to attach, see read()."""
+        return self.buffers.capacities, self.buffers.names, tuple(self.activations), tuple(self.aggregations)
+
+    @property
+    def fitness(self):
+        return self.buffers.fitness
+
+    def close(self):
+        self.buffers.close(unlink=True)
+
+    def update(self, genomes):
+        """(slots of genomes in order, newly written genomes, bytes written)."""
+        live = {}
+        new = []
+        for genome in genomes:
+            location = self.locations.get(genome.key)
+            if location is not None and location[1] is genome:
+                live[genome.key] = location
+            else:
+                new.append(genome)
+        for key, (slot, _) in self.locations.items():
+            if key not in live:
+                self.free_slots.append(slot)
+        self.locations = live
+
+        packed = [genome_records(genome, self.activations, self.aggregations) for genome in new]
+        node_count = sum(len(nodes) for nodes, _ in packed)
+        connection_count = sum(len(connections) for _, connections in packed)
+        written = self._reserve(len(new), node_count, connection_count)
+
+        directory = self.buffers.slots
+        for genome, (nodes, connections) in zip(new, packed):
+            slot = self.free_slots.pop()
+            self.buffers.nodes[self.node_top:self.node_top + len(nodes)] = nodes
+            self.buffers.connections[self.connection_top:self.connection_top + len(connections)] = connections
+            directory[slot] = (genome.key, self.node_top, len(nodes), self.connection_top, len(connections))
+            self.node_top += len(nodes)
+            self.connection_top += len(connections)
+            self.locations[genome.key] = (slot, genome)
+            written += nodes.nbytes + connections.nbytes + SLOT_DTYPE.itemsize
+        return [self.locations[genome.key][0] for genome in genomes], len(new), written
+
+    def _reserve(self, slots, nodes, connections):
+        """Make room for new records, returning the bytes moved to do it."""
+        capacities = self.buffers.capacities
+        if (len(self.free_slots) >= slots and self.node_top + nodes <= capacities["nodes"]
+                and self.connection_top + connections <= capacities["connections"]):
+            return 0
+
+        # gather the live records, in slot order, before anything is overwritten
+        live = sorted(slot for slot, _ in self.locations.values())
+        directory = self.buffers.slots
+        entries = directory[live].copy()
+        old_nodes = [self.buffers.nodes[start:start + count] for start, count in zip(entries["node_start"], entries["nodes"])]
+        old_connections = [self.buffers.connections[start:start + count]
+                           for start, count in zip(entries["connection_start"], entries["connections"])]
+        live_nodes = np.concatenate(old_nodes) if old_nodes else np.zeros(0, NODE_DTYPE)
+        live_connections = np.concatenate(old_connections) if old_connections else np.zeros(0, CONNECTION_DTYPE)
+
+        needed = {"slots": len(live) + slots, "nodes": len(live_nodes) + nodes, "connections": len(live_connections) + connections}
+        if any(needed[name] > capacities[name] for name in needed):
+            grown = {name: max(capacities[name], 2 * needed[name]) for name in needed}
+            grown["fitness"] = grown["slots"]
+            logging.info(f"Growing the genome arena to {grown['slots']} slots, {grown['nodes']} nodes and "
+                         f"{grown['connections']} connections")
+            self.buffers.close(unlink=True)
+            self.buffers = ArenaBuffers(grown)
+            directory = self.buffers.slots
+            # slots are renumbered densely in the new segments
+            remap = {slot: i for i, slot in enumerate(live)}
+            self.locations = {key: (remap[slot], genome) for key, (slot, genome) in self.locations.items()}
+            live = list(range(len(live)))
+            self.free_slots = list(range(grown["slots"] - 1, len(live) - 1, -1))
+
+        self.buffers.nodes[:len(live_nodes)] = live_nodes
+        self.buffers.connections[:len(live_connections)] = live_connections
+        entries["node_start"] = np.cumsum(entries["nodes"]) - entries["nodes"]
+        entries["connection_start"] = np.cumsum(entries["connections"]) - entries["connections"]
+        directory[live] = entries
+        self.node_top = len(live_nodes)
+        self.connection_top = len(live_connections)
+        return live_nodes.nbytes + live_connections.nbytes + entries.nbytes
+
+
+_worker_buffers = None
+
+
+def _attach(capacities, names):
+    global _worker_buffers
+    if _worker_buffers is None or _worker_buffers.names != names:
+        if _worker_buffers is not None:
+            _worker_buffers.close()
+        _worker_buffers = ArenaBuffers(capacities, names)
+    return _worker_buffers
+
+
+def _evaluate_slots(task):
+    (capacities, names, activations, aggregations), slots, seeds, aggregation, quantile = task
+    buffers = _attach(capacities, names)
+    config = parallel.worker_config()
+    for slot in slots:
+        key, node_start, nodes, connection_start, connections = buffers.slots[slot].tolist()
+        genome = genome_from_records(key, buffers.nodes[node_start:node_start + nodes],
+                                     buffers.connections[connection_start:connection_start + connections],
+                                     activations, aggregations, config)
+        buffers.fitness[slot] = parallel.evaluate_genome(genome, seeds, aggregation, quantile)
+    return len(slots)
+
+
+class SharedArenaEvaluator(ParallelEvaluator):
+    """ParallelEvaluator whose workers read genomes from a GenomeArena.
+
+    history keeps, per generation, the genomes written to the arena and the bytes
+    and seconds spent packing and writing their records. With profiling on, the
+    pickled slot tasks are measured too and added to bytes_transferred.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.arena = None
+        self.history = []
+
+    def close(self):
+        super().close()
+        if self.arena is not None:
+            self.arena.close()
+            self.arena = None
+
+    def __call__(self, genomes, config):
+        if self.workers <= 1:
+            return super().__call__(genomes, config)
+
+        self.start()
+        if self.arena is None:
+            self.arena = GenomeArena()
+        start = time.perf_counter()
+        slots, new, written = self.arena.update([genome for _, genome in genomes])
+        seeds = self.schedule.seeds() if self.schedule is not None else None
+        chunksize = self.chunksize or max(1, len(slots) // (self.workers * 4))
+        tasks = [(self.arena.layout, slots[i:i + chunksize], seeds, self.aggregation, self.quantile)
+                 for i in range(0, len(slots), chunksize)]
+        seconds = time.perf_counter() - start
+        if PROFILE.enabled:
+            # the pool pickles the tasks again, this pass only measures them
+            task_bytes = sum(len(pickle.dumps(task, pickle.HIGHEST_PROTOCOL)) for task in tasks)
+            PROFILE.count("bytes_transferred", written + task_bytes)
+            PROFILE.add_time("serialization", time.perf_counter() - start)
+
+        self.pool.map(_evaluate_slots, tasks, 1)
+        for (genome_id, genome), fitness in zip(genomes, self.arena.fitness[slots].tolist()):
+            genome.fitness = fitness
+
+        self.history.append({"genomes": len(genomes), "written": new, "bytes": written, "serialization_seconds": seconds})
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""Headless training entry point, never imports pygame.
+
+    python -m ai.train --generations 500 --workers 8 --checkpoint checkpoints
+"""
+import time
+
+_import_start = time.perf_counter()
+
+import argparse
+import logging
+import pickle
+import random
+import sys
+import os
+
+import neat
+
+from ai.parallel import load_config, make_evaluator
+from ai.seeding import SeedSchedule
+from ai.checkpoint import Checkpointer, load_latest, load_snapshot, FORMAT_VERSION
+from ai.metrics import MetricsReporter
+from ai.episodes import EpisodeArchive
+from ai.network_cache import NETWORK_CACHE
+
+IMPORT_SECONDS = time.perf_counter() - _import_start
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_checkpoint(path):
+    """Return (population, generation) from a Checkpointer directory or file, or an old checkpoint.pkl.
+
+    The random state saved with the checkpoint is restored so training carries on
+    exactly where it stopped.
+    """
+    if os.path.isdir(path):
+        checkpoint_data = load_latest(path)
+        if checkpoint_data is None:
+            raise FileNotFoundError(f"No checkpoints in {path}")
+    else:
+        with open(path, "rb") as f:
+            checkpoint_data = pickle.load(f)
+        if isinstance(checkpoint_data, dict) and checkpoint_data.get("format") == FORMAT_VERSION:
+            checkpoint_data = load_snapshot(path)
+            random.setstate(checkpoint_data["random_state"])
+    if isinstance(checkpoint_data, dict) and "population" in checkpoint_data:
+        return checkpoint_data["population"], checkpoint_data.get("generation", 0)
+    return checkpoint_data, checkpoint_data.generation
+
+
+def load_population(config, checkpoint_path=None):
+    """Resume from checkpoint_path when it has a checkpoint, otherwise start a new population."""
+    if checkpoint_path and os.path.exists(checkpoint_path):
+        try:
+            population, generation = load_checkpoint(checkpoint_path)
+            logging.info(f"Resumed from {checkpoint_path} at generation {generation}")
+            return population
+        except Exception as e:
+            logging.error(f"Failed to load checkpoint, initializing new population: {e}")
+    return neat.Population(config)
+
+
+def build_evaluator(config_path, population, workers=1, chunksize=None, seed=None, episodes=1, seed_period=1,
+                    aggregation="mean", quantile=0.5, cache_size=0, racing=None, racing_keep=0.5, listen=None,
+                    shared_memory=False, lockstep=False, grid=None):
+    """Make the fitness function for population, attaching a SeedSchedule when seeded."""
+    schedule = None
+    if seed is not None:
+        schedule = SeedSchedule(seed, episodes, seed_period or None)
+        # checkpoints pickle their reporters, drop any schedule restored with them
+        for reporter in list(population.reporters.reporters):
+            if isinstance(reporter, SeedSchedule):
+                population.remove_reporter(reporter)
+        population.add_reporter(schedule)
+    return make_evaluator(config_path, workers, chunksize, schedule, aggregation, quantile, cache_size, racing, racing_keep, listen,
+                          shared_memory, lockstep, grid)
+
+
+def add_metrics_reporter(population, path):
+    """Stream per-generation metrics to path, replacing any reporter restored from a checkpoint."""
+    for reporter in list(population.reporters.reporters):
+        if isinstance(reporter, MetricsReporter):
+            population.remove_reporter(reporter)
+    reporter = MetricsReporter(path)
+    population.add_reporter(reporter)
+    return reporter
+
+
+def add_episode_archive(population, path=None, verify=False):
+    """Record each generation's best episode, appending it to path if given. Close the archive to stop recording."""
+    for reporter in list(population.reporters.reporters):
+        if isinstance(reporter, EpisodeArchive):
+            population.remove_reporter(reporter)
+    reporter = EpisodeArchive(path, verify=verify)
+    population.add_reporter(reporter)
+    return reporter.start()
+
+
+def parse_grid(text):
+    width, _, height = text.lower().partition("x")
+    return int(width), int(height or width)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m ai.train", description="Train the Snake NEAT population without a display.")
+    parser.add_argument("--generations", type=int, default=100, help="generations to run in this session")
+    parser.add_argument("--workers", type=int, default=1, help="evaluation processes, 1 evaluates in-process, 0 uses every core")
+    parser.add_argument("--chunksize", type=int, default=None, help="genomes per pool task")
+    parser.add_argument("--config", default=os.path.join(PROJECT_DIR, "config.txt"), help="NEAT config file")
+    parser.add_argument("--checkpoint", default=None, help="checkpoint directory to resume from and save to")
+    parser.add_argument("--resume-from", default=None, help="checkpoint file or directory to resume from instead")
+    parser.add_argument("--checkpoint-every", type=int, default=10, help="save a checkpoint every N generations, 0 disables it")
+    parser.add_argument("--checkpoint-seconds", type=float, default=None, help="also save when this many seconds have passed")
+    parser.add_argument("--keep", type=int, default=5, help="checkpoints to keep, 0 keeps all")
+    parser.add_argument("--seed", type=int, default=None, help="seed the episodes for reproducible fitness")
+    parser.add_argument("--episodes", type=int, default=1, help="seeded episodes per genome")
+    parser.add_argument("--seed-period", type=int, default=1, help="generations between seed changes, 0 keeps them fixed")
+    parser.add_argument("--aggregation", choices=("mean", "min", "quantile"), default="mean")
+    parser.add_argument("--quantile", type=float, default=0.5)
+    parser.add_argument("--cache-size", type=int, default=0,
+                        help="fitness cache entries, 0 disables it; needs --seed, and with the default --seed-period 1 "
+                             "new seeds every generation leave only duplicates within one to reuse")
+    parser.add_argument("--race", type=lambda text: tuple(int(step) for step in text.split(",")), default=None,
+                        metavar="STEPS", help="successive-halving step budgets, e.g. 25,75")
+    parser.add_argument("--race-keep", type=float, default=0.5, help="fraction of genomes kept at each racing budget")
+    parser.add_argument("--grid", type=parse_grid, default=None, metavar="WxH",
+                        help="training board size, boards of 16x16 and larger run on the bitboard game")
+    parser.add_argument("--lockstep", action="store_true",
+                        help="play unseeded in-process episodes as one batch with batched network inference")
+    parser.add_argument("--shared-memory", action="store_true",
+                        help="send genomes to the worker pool through shared memory, only new ones each generation")
+    parser.add_argument("--listen", default=None, metavar="HOST:PORT",
+                        help="evaluate on socket workers (python -m ai.worker --connect HOST:PORT) instead of locally")
+    parser.add_argument("--metrics", default=None, help="write per-generation metrics to this .jsonl or .csv file")
+    parser.add_argument("--episode-archive", default=None, help="append each generation's best episode to this file")
+    parser.add_argument("--verify-episodes", action="store_true",
+                        help="replay each archived episode and log an error unless it reaches its genome's single-episode fitness")
+    args = parser.parse_args(argv)
+    if args.verify_episodes and args.episodes > 1:
+        parser.error("--verify-episodes compares against single-episode fitness, it cannot be used with --episodes")
+    return args
+
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO)
+    args = parse_args(argv)
+    logging.info(f"Training modules imported in {IMPORT_SECONDS * 1000:.1f} ms (pygame loaded: {'pygame' in sys.modules})")
+
+    if not os.path.exists(args.config):
+        logging.error(f"Config file path not found: {args.config}")
+        return 1
+    config = load_config(args.config)
+
+    population = load_population(config, args.resume_from or args.checkpoint)
+    evaluator = build_evaluator(
+        args.config,
+        population,
+        workers=args.workers or None,
+        chunksize=args.chunksize,
+        seed=args.seed,
+        episodes=args.episodes,
+        seed_period=args.seed_period,
+        aggregation=args.aggregation,
+        quantile=args.quantile,
+        cache_size=args.cache_size,
+        racing=args.race,
+        racing_keep=args.race_keep,
+        listen=args.listen,
+        shared_memory=args.shared_memory,
+        lockstep=args.lockstep,
+        grid=args.grid)
+
+    metrics = add_metrics_reporter(population, args.metrics) if args.metrics else None
+    archive = add_episode_archive(population, args.episode_archive, args.verify_episodes) if args.episode_archive else None
+
+    checkpointer = None
+    if args.checkpoint:
+        checkpointer = Checkpointer(args.checkpoint, keep=args.keep, every_generations=args.checkpoint_every or None,
+                                    every_seconds=args.checkpoint_seconds, generation=population.generation)
+
+    winner = population.best_genome
+    try:
+        for _ in range(args.generations):
+            start = time.perf_counter()
+            winner = population.run(evaluator, 1)
+            message = f"Generation {population.generation}: best fitness {winner.fitness:.2f} in {time.perf_counter() - start:.2f}s"
+            if checkpointer:
+                checkpoint_start = time.perf_counter()
+                checkpointer.maybe_save(population, winner)
+                message += f" (checkpoint {(time.perf_counter() - checkpoint_start) * 1000:.1f} ms)"
+            logging.info(message)
+    except KeyboardInterrupt:
+        logging.info("Interrupted, saving checkpoint")
+    finally:
+        if hasattr(evaluator, "close"):
+            evaluator.close()
+        if checkpointer and winner is not None:
+            checkpointer.finish(population, winner)
+            logging.info(f"Checkpoint saved at generation {population.generation}.")
+        if metrics:
+            metrics.close()
+        if archive:
+            archive.close()
+        # worker processes keep their own caches, this one only sees in-process evaluation
+        if NETWORK_CACHE.hits + NETWORK_CACHE.misses:
+            NETWORK_CACHE.log_stats()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
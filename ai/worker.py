@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""Evaluation worker for ai.coordinator.SocketEvaluator.
+
+    python -m ai.worker --connect host:port
+
+Connects to a coordinator, receives its NEAT config, then plays the genome batches
+it is sent and streams their fitness back. A heartbeat thread keeps the coordinator
+from requeueing the worker's batches while long ones run. Messages on either side
+are JSON objects behind a 4-byte big-endian length.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import struct
+import logging
+import argparse
+import tempfile
+import threading
+
+from ai import parallel
+
+HEADER = struct.Struct(">I")
+MAX_MESSAGE_BYTES = 64 * 1024 * 1024
+
+
+def send_message(sock, message):
+    data = json.dumps(message, separators=(",", ":")).encode()
+    sock.sendall(HEADER.pack(len(data)) + data)
+
+
+def _recv_exact(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def recv_message(sock):
+    """The next message, None once the peer has closed the connection."""
+    header = _recv_exact(sock, HEADER.size)
+    if header is None:
+        return None
+    (size,) = HEADER.unpack(header)
+    if size > MAX_MESSAGE_BYTES:
+        raise ValueError(f"Message of {size} bytes exceeds the {MAX_MESSAGE_BYTES} byte limit")
+    body = _recv_exact(sock, size)
+    if body is None:
+        return None
+    return json.loads(body)
+
+
+def parse_address(text):
+    host, _, port = text.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+class _Heartbeat(threading.Thread):
+    def __init__(self, send, interval):
+        super().__init__(daemon=True)
+        self.send = send
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                self.send({"type": "heartbeat"})
+            except OSError:
+                return
+
+
+def evaluate_batch(batch):
+    """Fitness of each genome payload in a batch message, as ParallelEvaluator's workers compute it."""
+    seeds = batch["seeds"]
+    return [parallel.evaluate_payload((payload, seeds, batch["aggregation"], batch["quantile"]))
+            for payload in batch["genomes"]]
+
+
+def serve(sock, name=None):
+    """Handle one coordinator connection until it says bye or goes away, returning the batches evaluated."""
+    lock = threading.Lock()
+
+    def send(message):
+        with lock:
+            send_message(sock, message)
+
+    send({"type": "hello", "name": name or f"{socket.gethostname()}:{os.getpid()}"})
+    welcome = recv_message(sock)
+    if welcome is None or welcome.get("type") != "config":
+        raise ConnectionError("Coordinator closed the connection before sending its config")
+
+    # neat.Config only reads files, keep the coordinator's copy for the session
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as file:
+        file.write(welcome["config"])
+    try:
+        parallel.init_worker(file.name, welcome.get("grid"))
+    finally:
+        os.unlink(file.name)
+
+    heartbeat = _Heartbeat(send, welcome["heartbeat_interval"])
+    heartbeat.start()
+    batches = 0
+    try:
+        while True:
+            message = recv_message(sock)
+            if message is None or message["type"] == "bye":
+                return batches
+            if message["type"] == "batch":
+                send({"type": "result", "id": message["id"], "fitness": evaluate_batch(message)})
+                batches += 1
+    finally:
+        heartbeat.stopped.set()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m ai.worker", description="Evaluate genomes for a training coordinator.")
+    parser.add_argument("--connect", required=True, metavar="HOST:PORT", help="coordinator address")
+    parser.add_argument("--name", default=None, help="name shown in the coordinator's log")
+    parser.add_argument("--wait", type=float, default=30.0, help="seconds to keep retrying the connection")
+    parser.add_argument("--reconnect", action="store_true", help="connect again after the coordinator goes away")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    address = parse_address(args.connect)
+
+    while True:
+        deadline = time.monotonic() + args.wait
+        while True:
+            try:
+                sock = socket.create_connection(address)
+                break
+            except OSError as e:
+                if time.monotonic() >= deadline:
+                    logging.error(f"Could not connect to {args.connect}: {e}")
+                    return 1
+                time.sleep(0.5)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        logging.info(f"Connected to {args.connect}")
+        try:
+            with sock:
+                batches = serve(sock, args.name)
+            logging.info(f"Coordinator finished after {batches} batches")
+        except (OSError, ConnectionError) as e:
+            logging.warning(f"Lost coordinator {args.connect}: {e}")
+        if not args.reconnect:
+            return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""Benchmarks for the simulation, sensing, network and evolution hot paths.
+
+    python -m bench -o baseline.json
+    python -m bench --compare baseline.json
+    python -m bench --results current.json --compare baseline.json
+"""
+import os
+import sys
+import argparse
+
+from ai.parallel import load_config
+from bench.cases import build_cases
+from bench.harness import run_cases, save_results, load_results, compare
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench", description="Time the Snake NEAT hot paths.")
+    parser.add_argument("-o", "--output", default=None, help="write the results as JSON")
+    parser.add_argument("--compare", default=None, metavar="BASELINE", help="flag regressions against a saved results file")
+    parser.add_argument("--results", default=None, help="compare this saved results file instead of running")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative slowdown counted as a regression")
+    parser.add_argument("--filter", action="append", default=[], help="only run cases whose name contains this, repeatable")
+    parser.add_argument("--quick", action="store_true", help="small boards plus the largest, small networks, shorter timing")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc peak memory pass")
+    parser.add_argument("--config", default=os.path.join(PROJECT_DIR, "config.txt"), help="NEAT config file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.results:
+        results = load_results(args.results)
+    else:
+        cases = build_cases(load_config(args.config), args.quick)
+        if args.filter:
+            cases = [case for case in cases if any(text in case.name for text in args.filter)]
+        min_seconds, repeat = (0.05, 3) if args.quick else (0.2, 5)
+        results = run_cases(cases, min_seconds, repeat, memory=not args.no_memory)
+        if args.output:
+            save_results(args.output, results, args.quick)
+            print(f"Results written to {args.output}")
+
+    if args.compare:
+        print(f"\nCompared with {args.compare}:")
+        regressions = compare(load_results(args.compare), results, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+            return 1
+        print("No regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
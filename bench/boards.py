@@ -0,0 +1,83 @@
+import random
+from collections import deque
+
+from snake_game.game import SnakeGame
+
+BOARD_SIZES = ((10, 10), (16, 16), (32, 32), (64, 64))
+
+
+def cycle_path(grid_width, grid_height):
+    """A Hamiltonian cycle over the grid: along row 0, serpentine down, back up column 0.
+
+    grid_height must be even, so the serpentine ends next to column 0.
+    """
+    path = [(x, 0) for x in range(grid_width)]
+    for y in range(1, grid_height):
+        xs = range(grid_width - 1, 0, -1) if y % 2 else range(1, grid_width)
+        path.extend((x, y) for x in xs)
+    path.extend((0, y) for y in range(grid_height - 1, 0, -1))
+    return path
+
+
+class CycleBoard:
+    """A SnakeGame whose snake of a given length lies on cycle_path and never dies.
+
+    steer() points the snake at the next cycle cell, so update() can run for as long
+    as a benchmark needs. The board is rebuilt once the snake has grown to fill it.
+    """
+
+    def __init__(self, grid_width, grid_height, length, seed=0, game_type=SnakeGame):
+        self.path = cycle_path(grid_width, grid_height)
+        self.next_cell = {cell: self.path[(i + 1) % len(self.path)] for i, cell in enumerate(self.path)}
+        self.length = length
+        self.seed = seed
+        self.game = game_type(grid_width, grid_height, rng=random.Random(seed))
+        self.reset()
+
+    def reset(self):
+        game = self.game
+        game.rng = random.Random(self.seed)
+        game.reset_game()
+        game._vacate(game.snake.pop())
+        body = self.path[:self.length]
+        game.snake = deque(reversed(body))
+        for cell in body:
+            game._occupy(cell)
+        self.steer()
+        game.place_food()
+
+    def steer(self):
+        head = self.game.snake[0]
+        nx, ny = self.next_cell[head]
+        self.game.direction = (nx - head[0], ny - head[1])
+
+    def step(self):
+        game = self.game
+        self.steer()
+        game.update()
+        if game.game_over or not game.free_cells:
+            self.reset()
+
+
+def board_lengths(grid_width, grid_height):
+    """Short, long and nearly full snake lengths for a board size."""
+    return {"short": 3, "long": grid_width * grid_height // 2, "full": grid_width * grid_height * 15 // 16}
+
+
+def synthetic_genome(config, hidden_nodes, seed=0):
+    """A genome grown to hidden_nodes hidden nodes plus extra connections, the same for a given seed."""
+    state = random.getstate()
+    random.seed(seed)
+    try:
+        genome_config = config.genome_config
+        genome = config.genome_type(hidden_nodes)
+        genome.configure_new(genome_config)
+        while len(genome.nodes) - genome_config.num_outputs < hidden_nodes:
+            genome.mutate_add_node(genome_config)
+            genome.mutate_add_connection(genome_config)
+            genome.mutate_add_connection(genome_config)
+        genome.fitness = 0.0
+        return genome
+    finally:
+        random.setstate(state)
+
@@ -0,0 +1,256 @@
+import os
+import random
+
+import numpy as np
+import neat
+
+from snake_game.vec_game import VecSnakeGame
+from snake_game.bitboard import BitboardSnakeGame
+from ai.ai import compute_state, eval_genomes_fast, TRAIN_GRID_WIDTH, TRAIN_GRID_HEIGHT
+from ai.sensing import Sensor
+from ai.network import CompiledNetwork
+from ai.network_cache import NetworkCache
+from ai.pruning import prune_genome
+from ai.lockstep import eval_genomes_lockstep
+from ai.seeding import SeedSchedule, MultiSeedEvaluator
+from bench.boards import BOARD_SIZES, CycleBoard, board_lengths, synthetic_genome
+from bench.harness import Case
+
+SEED = 1234
+LOOP = 1000
+HIDDEN_NODES = (0, 8, 32, 128)
+POPULATION_SIZE = 150
+DIVERGED_GENERATIONS = 30
+
+
+def _board_cases(sizes):
+    cases = []
+    for width, height in sizes:
+        for label, length in board_lengths(width, height).items():
+            tag = f"{width}x{height}/{label}"
+
+            def update(width=width, height=height, length=length):
+                board = CycleBoard(width, height, length, SEED)
+
+                def run():
+                    for _ in range(LOOP):
+                        board.step()
+                return run
+
+            def place_food(width=width, height=height, length=length):
+                game = CycleBoard(width, height, length, SEED).game
+
+                def run():
+                    for _ in range(LOOP):
+                        game.place_food()
+                return run
+
+            def sense(width=width, height=height, length=length):
+                sensor = Sensor(CycleBoard(width, height, length, SEED).game)
+
+                def run():
+                    for _ in range(LOOP):
+                        sensor.sense()
+                return run
+
+            def bitboard_step(width=width, height=height, length=length):
+                board = CycleBoard(width, height, length, SEED, BitboardSnakeGame)
+                sense = Sensor(board.game).sense
+
+                def run():
+                    for _ in range(LOOP):
+                        board.step()
+                        sense()
+                return run
+
+            cases.append(Case(f"game.update/{tag}", update, "step", LOOP))
+            cases.append(Case(f"game.place_food/{tag}", place_food, "call", LOOP))
+            cases.append(Case(f"sensor.sense/{tag}", sense, "call", LOOP))
+            cases.append(Case(f"bitboard.step_sense/{tag}", bitboard_step, "step", LOOP))
+
+        def state(width=width, height=height):
+            game = CycleBoard(width, height, 3, SEED).game
+
+            def run():
+                for _ in range(LOOP):
+                    compute_state(game)
+            return run
+
+        cases.append(Case(f"compute_state/{width}x{height}", state, "call", LOOP))
+    return cases
+
+
+def _vec_cases(sizes, boards=POPULATION_SIZE, ticks=100):
+    cases = []
+    for width, height in sizes:
+        def step(width=width, height=height):
+            games = VecSnakeGame(boards, width, height, seeds=list(range(boards)), auto_reset=True)
+            actions = np.random.default_rng(SEED).integers(0, 4, size=(ticks, boards))
+
+            def run():
+                for tick in range(ticks):
+                    games.step(actions[tick])
+            return run
+
+        cases.append(Case(f"vec.step/{width}x{height}/{boards}", step, "tick", ticks))
+    return cases
+
+
+def _render_cases(sizes, frames=100, window=646):
+    """Frame time of draw_snake_game against GameRenderer on an offscreen window-sized surface."""
+    cases = []
+    for width, height in sizes:
+        for label, length in board_lengths(width, height).items():
+            tag = f"{width}x{height}/{label}"
+
+            def frame(width=width, height=height, length=length, dirty=False):
+                # ui.display needs pygame and a video driver, even offscreen
+                os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+                import pygame as pg
+                from ui.display import GameRenderer, draw_snake_game
+
+                board = CycleBoard(width, height, length, SEED)
+                surface = pg.Surface((window, window))
+                renderer = GameRenderer(surface, window, window)
+
+                def run():
+                    for _ in range(frames):
+                        board.step()
+                        if dirty:
+                            renderer.draw(board.game)
+                        else:
+                            draw_snake_game(surface, board.game, window, window, None)
+                return run
+
+            cases.append(Case(f"render.full/{tag}", frame, "frame", frames))
+            cases.append(Case(f"render.dirty/{tag}", lambda frame=frame: frame(dirty=True), "frame", frames))
+    return cases
+
+
+def _network_cases(config, hidden_nodes):
+    cases = []
+    inputs = np.random.default_rng(SEED).random((POPULATION_SIZE, 32))
+    for hidden in hidden_nodes:
+        genome = synthetic_genome(config, hidden, SEED)
+        single = inputs[0].tolist()
+
+        def activate(genome=genome):
+            net = CompiledNetwork.create(genome, config)
+
+            def run():
+                for _ in range(LOOP):
+                    net.activate(single)
+            return run
+
+        def activate_neat(genome=genome):
+            net = neat.nn.FeedForwardNetwork.create(genome, config)
+
+            def run():
+                for _ in range(LOOP):
+                    net.activate(single)
+            return run
+
+        def activate_batch(genome=genome):
+            net = CompiledNetwork.create(genome, config)
+            return lambda: net.activate_batch(inputs)
+
+        def create(genome=genome):
+            def run():
+                for _ in range(100):
+                    CompiledNetwork.create(genome, config)
+            return run
+
+        cases.append(Case(f"net.activate/hidden{hidden}", activate, "call", LOOP))
+        cases.append(Case(f"net.activate_neat/hidden{hidden}", activate_neat, "call", LOOP))
+        cases.append(Case(f"net.activate_batch/hidden{hidden}/{POPULATION_SIZE}", activate_batch, "batch"))
+        def prune(genome=genome):
+            def run():
+                for _ in range(100):
+                    prune_genome(genome, config)
+            return run
+
+        def cached(genome=genome):
+            # every call after the first is a topology hit, paying for the key and the weight patch
+            cache = NetworkCache()
+            cache.create(genome, config)
+
+            def run():
+                for _ in range(100):
+                    cache.create(genome, config)
+            return run
+
+        cases.append(Case(f"net.create/hidden{hidden}", create, "call", 100))
+        cases.append(Case(f"net.create_cached/hidden{hidden}", cached, "call", 100))
+        cases.append(Case(f"net.prune/hidden{hidden}", prune, "call", 100))
+    return cases
+
+
+def _population(config, seed=SEED):
+    random.seed(seed)
+    population = neat.Population(config)
+    return population
+
+
+def _evolved_genomes(config, generations=5):
+    # a few seeded generations give genomes that actually survive some steps
+    population = _population(config)
+    schedule = SeedSchedule(SEED)
+    population.add_reporter(schedule)
+    for _ in range(generations):
+        population.run(MultiSeedEvaluator(schedule), 1)
+    return list(population.population.items())
+
+
+def _evaluation_cases(config):
+    genomes = _evolved_genomes(config)
+    seeds = [SEED] * len(genomes)
+
+    def fast():
+        def run():
+            random.seed(SEED)
+            eval_genomes_fast(genomes, config)
+        return run
+
+    def lockstep():
+        return lambda: eval_genomes_lockstep(genomes, config, seeds)
+
+    def generation():
+        def run():
+            population = _population(config)
+            schedule = SeedSchedule(SEED)
+            population.add_reporter(schedule)
+            population.run(MultiSeedEvaluator(schedule), 1)
+        return run
+
+    # later generations have diverged topologies, which lockstep groups must pad to share
+    def diverged_fast():
+        genomes = _evolved_genomes(config, DIVERGED_GENERATIONS)
+
+        def run():
+            random.seed(SEED)
+            eval_genomes_fast(genomes, config)
+        return run
+
+    def diverged_lockstep():
+        genomes = _evolved_genomes(config, DIVERGED_GENERATIONS)
+        seeds = [SEED] * len(genomes)
+        return lambda: eval_genomes_lockstep(genomes, config, seeds)
+
+    return [
+        Case(f"eval.fast/{len(genomes)}", fast, "generation"),
+        Case(f"eval.lockstep/{len(genomes)}", lockstep, "generation"),
+        Case(f"eval.fast/gen{DIVERGED_GENERATIONS}", diverged_fast, "generation"),
+        Case(f"eval.lockstep/gen{DIVERGED_GENERATIONS}", diverged_lockstep, "generation"),
+        Case(f"evolve.generation/{POPULATION_SIZE}", generation, "generation"),
+    ]
+
+
+def build_cases(config, quick=False):
+    # the largest board stays in the quick run, the bitboard is meant to pay off there
+    sizes = BOARD_SIZES[:2] + BOARD_SIZES[-1:] if quick else BOARD_SIZES
+    hidden = HIDDEN_NODES[:2] if quick else HIDDEN_NODES
+    return (_board_cases(sizes)
+            + _vec_cases(((TRAIN_GRID_WIDTH, TRAIN_GRID_HEIGHT),) if quick else sizes)
+            + _render_cases(sizes[:2] if quick else sizes[:3])
+            + _network_cases(config, hidden)
+            + _evaluation_cases(config))
@@ -0,0 +1,124 @@
+import os
+import gc
+import sys
+import json
+import time
+import platform
+import tracemalloc
+
+import numpy as np
+
+
+class Case:
+    """A named benchmark. setup() builds the inputs and returns a function doing ops operations per call."""
+
+    def __init__(self, name, setup, unit="call", ops=1):
+        self.name = name
+        self.setup = setup
+        self.unit = unit
+        self.ops = ops
+
+
+def _timed(run, number):
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        for _ in range(number):
+            run()
+        return time.perf_counter() - start
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+
+def time_case(case, min_seconds=0.2, repeat=5):
+    """Best seconds per operation over repeat batches, each batch running at least min_seconds / repeat."""
+    run = case.setup()
+    number = 1
+    target = min_seconds / repeat
+    while _timed(run, number) < target:
+        number *= 2
+    best = min(_timed(run, number) for _ in range(repeat))
+    return best / (number * case.ops)
+
+
+def peak_memory(case):
+    """Peak traced allocation in bytes while setting up the case and running it once."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        case.setup()()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_cases(cases, min_seconds=0.2, repeat=5, memory=True, log=print):
+    results = {}
+    for case in cases:
+        seconds = time_case(case, min_seconds, repeat)
+        result = {
+            "unit": case.unit,
+            "ns_per_op": seconds * 1e9,
+            "ops_per_sec": 1.0 / seconds if seconds else float("inf"),
+        }
+        if memory:
+            result["peak_bytes"] = peak_memory(case)
+        results[case.name] = result
+        log(format_result(case.name, result))
+    return results
+
+
+def format_result(name, result):
+    ns = result["ns_per_op"]
+    timing = f"{ns / 1e6:10.2f} ms/{result['unit']}" if ns >= 1e6 else f"{ns:10.0f} ns/{result['unit']}"
+    line = f"{name:44s} {timing:>18s} {result['ops_per_sec']:14,.0f} {result['unit']}/s"
+    if "peak_bytes" in result:
+        line += f" {result['peak_bytes'] / 1024:10,.0f} KB peak"
+    return line
+
+
+def environment():
+    return {
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def save_results(path, results, quick=False):
+    with open(path, "w") as f:
+        json.dump({"environment": environment(), "quick": quick, "results": results}, f, indent=2, sort_keys=True)
+
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)["results"]
+
+
+def compare(baseline, current, threshold=0.1, log=print):
+    """Print the change of every shared case and return the names that got slower or bigger than threshold."""
+    regressions = []
+    for name in sorted(set(baseline) & set(current)):
+        before, after = baseline[name], current[name]
+        change = after["ns_per_op"] / before["ns_per_op"] - 1
+        status = []
+        if change > threshold:
+            status.append("SLOWER")
+        elif change < -threshold:
+            status.append("faster")
+        if "peak_bytes" in before and "peak_bytes" in after and before["peak_bytes"]:
+            memory_change = after["peak_bytes"] / before["peak_bytes"] - 1
+            if memory_change > threshold:
+                status.append(f"MEMORY +{memory_change:.0%}")
+        if "SLOWER" in status or any(s.startswith("MEMORY") for s in status):
+            regressions.append(name)
+        log(f"{name:44s} {before['ns_per_op']:14,.0f} -> {after['ns_per_op']:14,.0f} ns/{after['unit']} {change:+8.1%} {' '.join(status)}")
+
+    missing = set(baseline) - set(current)
+    if missing:
+        log(f"{len(missing)} baseline case(s) not in the current results")
+    return regressions
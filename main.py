@@ -8,7 +8,12 @@ import os
 
 from snake_game.game import SnakeGame
 from ui.display import *
+from ui.timestep import FixedTimestep
 from ai.ai import *
+from ai.background import BackgroundTrainer
+from ai.checkpoint import list_checkpoints
+from snake_game.replay import EpisodeReplay
+from ai.genome_file import read_genomes, write_genomes, EXTENSION as GENOME_FILE_EXTENSION
 
 logging.basicConfig(level=logging.INFO)
 
@@ -26,6 +31,51 @@ class App:
         self.NET_AREA_WIDTH = 354
         self.NET_AREA_HEIGHT = 566
         
+        # 1 keeps evaluation serial in this process, None uses every core
+        self.EVAL_WORKERS = 1
+        self.EVAL_CHUNKSIZE = None
+        
+        # a seed makes episodes reproducible, each genome then plays EVAL_EPISODES
+        # scheduled seeds combined with EVAL_AGGREGATION ("mean", "min" or "quantile")
+        self.EVAL_SEED = None
+        self.EVAL_EPISODES = 1
+        self.EVAL_AGGREGATION = "mean"
+        self.EVAL_QUANTILE = 0.5
+        self.EVAL_SEED_PERIOD = 1
+        
+        # training board size as (width, height), None keeps 10x10; 16x16 and up train on the bitboard game
+        self.EVAL_GRID = None
+        
+        # plays every genome's episode in one lockstep batch with batched inference,
+        # seeded evaluation always does
+        self.EVAL_LOCKSTEP = False
+        
+        # remembers up to this many genome scores, 0 disables the cache; only used
+        # with EVAL_SEED, unseeded scores are re-sampled every generation
+        self.EVAL_CACHE_SIZE = 0
+        
+        # step budgets like (25, 75) race genomes and stop the worst EVAL_RACING_KEEP early
+        self.EVAL_RACING = None
+        self.EVAL_RACING_KEEP = 0.5
+        
+        # rolling checkpoints in checkpoints/, written off the training thread
+        self.CHECKPOINT_KEEP = 5
+        self.CHECKPOINT_SECONDS = None
+        
+        # per-generation timings and stats, a .jsonl or .csv path, None disables them
+        self.METRICS_PATH = None
+        
+        # every generation's best episode is recorded, this file also keeps them, None disables it
+        self.EPISODE_ARCHIVE_PATH = None
+        
+        # tint the net panel's input and output nodes with their values while replaying a genome
+        self.NET_ACTIVATIONS = False
+        
+        # replays step REPLAY_TICK_RATE times a second at 1x, - and + change the speed
+        # through 1x, 4x, 16x and max, humans play at HUMAN_TICK_RATE
+        self.REPLAY_TICK_RATE = 60
+        self.HUMAN_TICK_RATE = 15
+        
         pg.init()
         
         self.screen = pg.display.set_mode((self.WINDOW_WIDTH, self.WINDOW_HEIGHT))
@@ -33,6 +83,8 @@ class App:
         
         self.load_assets()
         self.game = SnakeGame(10, 10)
+        # repaints only the changed cells, invalidate() it after painting over the screen
+        self.renderer = GameRenderer(self.screen, self.GAME_AREA, self.WINDOW_HEIGHT)
         
         self.state = "IDLE"
         self.generation = 0
@@ -51,11 +103,38 @@ class App:
             neat.DefaultSpeciesSet,
             neat.DefaultStagnation,
             config_path)
+        self.config_path = config_path
+        self.net_panel = NetPanel(self.config)
+        self.replay_timestep = FixedTimestep(self.REPLAY_TICK_RATE)
+        self.evaluator_options = {
+            "workers": self.EVAL_WORKERS,
+            "chunksize": self.EVAL_CHUNKSIZE,
+            "seed": self.EVAL_SEED,
+            "episodes": self.EVAL_EPISODES,
+            "seed_period": self.EVAL_SEED_PERIOD,
+            "aggregation": self.EVAL_AGGREGATION,
+            "quantile": self.EVAL_QUANTILE,
+            "cache_size": self.EVAL_CACHE_SIZE,
+            "racing": self.EVAL_RACING,
+            "racing_keep": self.EVAL_RACING_KEEP,
+            "lockstep": self.EVAL_LOCKSTEP,
+            "grid": self.EVAL_GRID,
+        }
+        self.checkpoint_dir = os.path.join(self.local_dir, "checkpoints")
+        self.checkpoint_options = {
+            "keep": self.CHECKPOINT_KEEP,
+            "every_seconds": self.CHECKPOINT_SECONDS,
+        }
         
     def load_winner_genome(self):
+        winner_file = os.path.join(os.path.dirname(__file__), 'winner' + GENOME_FILE_EXTENSION)
         try:
-            winner_file = os.path.join(os.path.dirname(__file__), 'winner.pkl')
-            with open(winner_file, 'rb') as f:
+            if os.path.exists(winner_file):
+                genomes, metadata = read_genomes(winner_file, self.config)
+                return {'generation': metadata.get('generation', -1), 'genome': genomes[0]}
+            
+            # older versions pickled the genome
+            with open(os.path.join(os.path.dirname(__file__), 'winner.pkl'), 'rb') as f:
                 data = pickle.load(f)
            
             if isinstance(data, dict) and 'generation' in data:
@@ -69,9 +148,8 @@ class App:
         
     def save_winner_genome(self, winner_data):
         try:
-            winner_file = os.path.join(os.path.dirname(__file__), 'winner.pkl')
-            with open(winner_file, 'wb') as f:
-                pickle.dump(winner_data, f)
+            winner_file = os.path.join(os.path.dirname(__file__), 'winner' + GENOME_FILE_EXTENSION)
+            write_genomes(winner_file, [winner_data['genome']], {'generation': winner_data['generation']})
             self.current_best_genome = winner_data
             logging.info(f"Winner genome updated for generation {winner_data['generation']}.")
         except Exception as e:
@@ -103,6 +181,7 @@ class App:
                 self.train_ai_fast()
                 
             self.screen.fill(BACKGROUND)
+            self.renderer.invalidate()
         
         pg.quit()
         sys.exit()
@@ -137,6 +216,8 @@ class App:
         input_buffer = []
         
         clock = pg.time.Clock()
+        # events are read every frame, the snake moves at the fixed tick rate
+        timestep = FixedTimestep(self.HUMAN_TICK_RATE, speeds=(1,))
         
         while self.state == "HUMAN":
             for event in pg.event.get():
@@ -155,109 +236,122 @@ class App:
                         input_buffer.append((-1, 0))
                     elif event.key == pg.K_RIGHT:
                         input_buffer.append((1, 0))
-                        
-            if input_buffer:
-                self.game.change_direction(input_buffer.pop(0))
-                
-            self.game.update()
-            if self.game.score > self.best_score:
-                self.best_score = self.game.score
-                
-            draw_snake_game(self.screen, self.game, self.GAME_AREA, self.WINDOW_HEIGHT, self.CELL_SIZE)
-            
-            info_surface = pg.Surface((self.INFO_AREA_WIDTH, self.INFO_AREA_HEIGHT))
-            draw_info_panel(info_surface, self.game.score, self.best_score, self.generation, app)
-            self.screen.blit(info_surface, (self.GAME_AREA, 0))
             
-            pg.display.update()
-            clock.tick(15)
+            stepped = False
+            for _ in timestep.ticks():
+                stepped = True
+                if input_buffer:
+                    self.game.change_direction(input_buffer.pop(0))
+                    
+                self.game.update()
+                if self.game.score > self.best_score:
+                    self.best_score = self.game.score
+                
+                if self.game.is_game_over():
+                    logging.info("Game over: Snake hit the wall." if self.game.death_cause == "wall" else "Game over: Snake collided with itself.")
+                    self.generation += 1
+                    self.game.reset_game()
             
-            if self.game.is_game_over():
-                self.generation += 1
-                self.game.reset_game()
+            if stepped:
+                pg.display.update(draw_game_frame(self, self.generation))
+            clock.tick(60)
+    
+    def resume_source(self):
+        # both training modes carry on the newest checkpoint, falling back to the
+        # single checkpoint.pkl older versions wrote
+        legacy_file = os.path.join(self.local_dir, "checkpoint.pkl")
+        if not list_checkpoints(self.checkpoint_dir) and os.path.exists(legacy_file):
+            return legacy_file
+        return True
     
     def watch_training(self):
-        checkpoint_file = os.path.join(os.path.dirname(__file__), "checkpoint.pkl")
-        if os.path.exists(checkpoint_file):
-            try:
-                with open(checkpoint_file, "rb") as f:
-                    checkpoint_data = pickle.load(f)
-                
-                if isinstance(checkpoint_data, dict) and "population" in checkpoint_data:
-                    population = checkpoint_data["population"]
-                    self.generation = checkpoint_data.get("generation", 0)
-                else:
-                    population = checkpoint_data
-            
-            except Exception as e:
-                logging.error(f"Failed to load checkpoint, initializing new population: {e}")
-                population = neat.Population(self.config)
+        trainer = BackgroundTrainer(self.config_path, self.checkpoint_dir, resume=self.resume_source(), checkpoint_every=1,
+                                    checkpoint_options=self.checkpoint_options, metrics_path=self.METRICS_PATH,
+                                    episode_archive_path=self.EPISODE_ARCHIVE_PATH, **self.evaluator_options)
+        trainer.start()
+        
+        clock = pg.time.Clock()
+        timestep = self.replay_timestep
+        timestep.reset()
+        replay = None
+        latest = None
+        display_game = self.game
         
-        else:
-            population = neat.Population(self.config)
-
         while self.state == "WATCH_TRAINING":
-            winner = population.run(eval_genomes_fast, 1)
-            self.generation = population.generation
-            simulate_winner_genome(winner, self, self.NET_AREA_WIDTH, self.NET_AREA_HEIGHT)
-
-            try:
-                checkpoint_data = {
-                    "generation": self.generation,
-                    "best_genome": winner,
-                    "population": population
-                }
-                with open(checkpoint_file, "wb") as f:
-                    pickle.dump(checkpoint_data, f)
-                logging.info(f"Checkpoint updated at generation {self.generation}.")
-            except Exception as e:
-                logging.error(f"Failed to save checkpoint: {e}")
-
             for event in pg.event.get():
                 if event.type == pg.QUIT:
                     self.state = "QUIT"
                 elif event.type == pg.KEYDOWN and event.key == pg.K_ESCAPE:
                     self.state = "IDLE"
+                elif event.type == pg.KEYDOWN:
+                    timestep.handle_key(event.key)
+            
+            update = trainer.poll()
+            if update is not None:
+                latest = update
+                logging.info(f"Generation {update['generation']}: best fitness {update['best_fitness']:.2f} in {update['seconds']:.2f}s")
+            
+            # let the running replay finish, then move on to the newest winner, replaying
+            # its recorded training episode when there is one instead of rerunning the net
+            if latest is not None and (replay is None or replay.finished):
+                self.generation = latest["generation"]
+                genome = latest["genome"]
+                if "episode" in latest:
+                    replay = EpisodeReplay(latest["episode"])
+                    self.game = replay.game
+                else:
+                    self.game = display_game
+                    replay = WinnerReplay(genome, self.config, self.game)
+                latest = None
+            
+            if replay is not None:
+                for _ in timestep.ticks():
+                    if replay.finished:
+                        break
+                    replay.step()
+                if self.game.score > self.best_score:
+                    self.best_score = self.game.score
+                activations = replay.activations() if self.NET_ACTIVATIONS and hasattr(replay, "activations") else None
+                pg.display.update(draw_replay_frame(self, genome, f"Gen: {self.generation} {timestep.label}",
+                                                    self.NET_AREA_WIDTH, self.NET_AREA_HEIGHT, activations))
+            else:
+                self.screen.fill(BACKGROUND)
+                draw_text(self.screen, "Training first generation...", 20, self.WINDOW_HEIGHT // 2, self.font_small)
+                self.renderer.invalidate()
+                pg.display.update()
+            
+            clock.tick(60)
+        
+        trainer.stop()
+        self.game = display_game
     
     def train_ai_fast(self):
         total_gens = 5000
-        population = neat.Population(self.config)
+        trainer = BackgroundTrainer(self.config_path, self.checkpoint_dir, resume=self.resume_source(), max_generations=total_gens, checkpoint_every=None,
+                                    checkpoint_options=self.checkpoint_options, metrics_path=self.METRICS_PATH,
+                                    episode_archive_path=self.EPISODE_ARCHIVE_PATH, **self.evaluator_options)
+        trainer.start()
+        self.generation = 0
         clock = pg.time.Clock()
         
-        while self.state == "FAST_TRAINING" and population.generation < total_gens:
-            winner = population.run(eval_genomes_fast, 1)
-            self.generation = population.generation
-            
-            self.screen.fill(BACKGROUND)
-            draw_progress_bar(self.screen, self.generation, total_gens, self.font_med, self.WINDOW_WIDTH, self.WINDOW_HEIGHT)
-            pg.display.update()
-        
+        while self.state == "FAST_TRAINING" and not trainer.finished:
             for event in pg.event.get():
                 if event.type == pg.QUIT:
                     self.state = "QUIT"
-                    return
                 elif event.type == pg.KEYDOWN and event.key == pg.K_ESCAPE:
                     self.state = "IDLE"
-                    return
-        
-            clock.tick(144)
-        
-        checkpoint_file = os.path.join(os.path.dirname(__file__), "checkpoint.pkl")
-        try:
-            checkpoint_data = {
-                "generation": self.generation,
-                "best_genome": winner,
-                "population": population
-            }
-        
-            with open(checkpoint_file, "wb") as f:
-                pickle.dump(checkpoint_data, f)
-            logging.info(f"Checkpoint saved at generation {self.generation}.")
-        
-        except Exception as e:
-            logging.error(f"Failed to save checkpoint: {e}")
             
-        self.state = "IDLE"
+            if trainer.poll() is not None:
+                self.generation = trainer.generation
+            
+            self.screen.fill(BACKGROUND)
+            draw_progress_bar(self.screen, self.generation, total_gens, self.font_med, self.WINDOW_WIDTH, self.WINDOW_HEIGHT)
+            pg.display.update()
+            clock.tick(60)
+        
+        trainer.stop()
+        if self.state == "FAST_TRAINING":
+            self.state = "IDLE"
     
 if __name__ == "__main__":
     app = App()
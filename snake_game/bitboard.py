@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+from snake_game.game import SnakeGame
+
+
+class BitboardSnakeGame(SnakeGame):
+    """SnakeGame whose occupancy is one Python int, bit y * grid_width + x per cell.
+
+    Collisions are single bit tests and Sensor reads body rays as masked bit scans
+    instead of walking cells, so sensing no longer grows with the board. free_cells
+    and free_index are kept exactly as SnakeGame keeps them, so with the same rng
+    the food lands on the same cells and episodes match SnakeGame step for step.
+    """
+
+    def _empty_occupancy(self):
+        return 0
+
+    def _occupy(self, cell):
+        self.occupancy |= 1 << (cell[1] * self.grid_width + cell[0])
+        i = self.free_index.pop(cell)
+        last = self.free_cells.pop()
+        if last != cell:
+            self.free_cells[i] = last
+            self.free_index[last] = i
+
+    def _vacate(self, cell):
+        # the bit is known to be set, xor clears it without building a full-width mask
+        self.occupancy ^= 1 << (cell[1] * self.grid_width + cell[0])
+        self.free_index[cell] = len(self.free_cells)
+        self.free_cells.append(cell)
+
+    def is_occupied(self, x, y):
+        return self.occupancy >> (y * self.grid_width + x) & 1 == 1
+
+    def free_count(self):
+        return self.grid_width * self.grid_height - self.occupancy.bit_count()
+
+    def update(self):
+        if self.game_over:
+            return
+        head_x, head_y = self.snake[0]
+        dx, dy = self.direction
+        new_head = (head_x + dx, head_y + dy)
+        if not (0 <= new_head[0] < self.grid_width and 0 <= new_head[1] < self.grid_height):
+            self.game_over = True
+            self.death_cause = "wall"
+            return
+        if self.occupancy >> (new_head[1] * self.grid_width + new_head[0]) & 1:
+            self.game_over = True
+            self.death_cause = "self"
+            return
+        self.snake.appendleft(new_head)
+        self._occupy(new_head)
+        if new_head == self.food:
+            self.score += 1
+            self.place_food()
+        else:
+            self._vacate(self.snake.pop())
@@ -1,6 +1,6 @@
 #!/usr/bin/env python3
 import random
-import logging
+from collections import deque
 from typing import Tuple
 
 GRID_WIDTH = 17
@@ -11,30 +11,57 @@ DOWN = (0, 1)
 LEFT = (-1, 0)
 RIGHT = (1, 0)
 
-logging.basicConfig(level=logging.INFO)
-
 
 class SnakeGame:
-    def __init__(self, grid_width=GRID_WIDTH, grid_height=GRID_HEIGHT):
+    def __init__(self, grid_width=GRID_WIDTH, grid_height=GRID_HEIGHT, rng=None):
         self.grid_width = grid_width
         self.grid_height = grid_height
+        # any object with random.Random's choice() works, the module itself by default
+        self.rng = rng if rng is not None else random
         self.reset_game()
 
     def reset_game(self):
-        self.snake = [(self.grid_width // 2, self.grid_height // 2)]
-        self.direction = random.choice([UP, DOWN, LEFT, RIGHT])
+        start = (self.grid_width // 2, self.grid_height // 2)
+        self.snake = deque([start])
+
+        # occupancy is a flat grid indexed by y * grid_width + x, free_cells holds every
+        # empty cell and free_index maps a cell back to its slot so it can be swap-removed
+        self.occupancy = self._empty_occupancy()
+        self.free_cells = [(x, y) for y in range(self.grid_height) for x in range(self.grid_width)]
+        self.free_index = {cell: i for i, cell in enumerate(self.free_cells)}
+        self._occupy(start)
+
+        self.direction = self.rng.choice([UP, DOWN, LEFT, RIGHT])
         self.place_food()
         self.score = 0
         self.game_over = False
+        # "wall" or "self" once the game ends, callers log it if they care
+        self.death_cause = None
+
+    def _empty_occupancy(self):
+        return bytearray(self.grid_width * self.grid_height)
+
+    def _occupy(self, cell):
+        self.occupancy[cell[1] * self.grid_width + cell[0]] = 1
+        i = self.free_index.pop(cell)
+        last = self.free_cells.pop()
+        if last != cell:
+            self.free_cells[i] = last
+            self.free_index[last] = i
+
+    def _vacate(self, cell):
+        self.occupancy[cell[1] * self.grid_width + cell[0]] = 0
+        self.free_index[cell] = len(self.free_cells)
+        self.free_cells.append(cell)
+
+    def is_occupied(self, x, y):
+        return self.occupancy[y * self.grid_width + x] == 1
+
+    def free_count(self):
+        return len(self.free_cells)
 
     def place_food(self):
-        empty_cells= [
-            (x, y)
-            for x in range(self.grid_width)
-            for y in range(self.grid_height)
-            if (x, y) not in self.snake
-        ]
-        self.food = random.choice(empty_cells) if empty_cells else None
+        self.food = self.rng.choice(self.free_cells) if self.free_cells else None
 
     def change_direction(self, new_direction: Tuple[int, int]) -> None:
         opposite_direction = (-self.direction[0], -self.direction[1])
@@ -48,23 +75,24 @@ class SnakeGame:
         dx, dy = self.direction
         new_head = (head_x + dx, head_y + dy)
         if not (0 <= new_head[0] < self.grid_width and 0 <= new_head[1] < self.grid_height):
-            logging.info("Game over: Snake hit the wall.")
             self.game_over = True
+            self.death_cause = "wall"
             return
-        if new_head in self.snake:
-            logging.info("Game over: Snake collided with itself.")
+        if self.occupancy[new_head[1] * self.grid_width + new_head[0]]:
             self.game_over = True
+            self.death_cause = "self"
             return
-        self.snake.insert(0, new_head)
+        self.snake.appendleft(new_head)
+        self._occupy(new_head)
         if new_head == self.food:
             self.score += 1
             self.place_food()
         else:
-            self.snake.pop()
+            self._vacate(self.snake.pop())
 
     def get_state(self):
         return {
-            "snake": self.snake.copy(),
+            "snake": list(self.snake),
             "food": self.food,
             "score": self.score,
             "game_over": self.game_over,
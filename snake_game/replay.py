@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+import random
+import struct
+from collections import deque
+
+import numpy as np
+
+from snake_game.game import SnakeGame
+
+# Action i is the direction index i of ai.ai.DIRECTION_MAP: up, right, down, left
+ACTION_DIRECTIONS = ((0, -1), (1, 0), (0, 1), (-1, 0))
+
+KEYFRAME_INTERVAL = 64
+
+ARCHIVE_MAGIC = b"SNKE"
+ARCHIVE_VERSION = 1
+# magic, version, generation, genome key, seed, width, height, steps, score, fitness
+RECORD_HEADER = struct.Struct("<4sBiqQHHIId")
+
+
+def pack_actions(actions):
+    """Pack action indices 0-3 four to a byte, the first action in the low bits."""
+    values = np.frombuffer(bytes(actions), dtype=np.uint8)
+    padded = np.zeros(-(-len(values) // 4) * 4, dtype=np.uint8)
+    padded[:len(values)] = values
+    quads = padded.reshape(-1, 4)
+    return (quads[:, 0] | quads[:, 1] << 2 | quads[:, 2] << 4 | quads[:, 3] << 6).tobytes()
+
+
+def unpack_actions(packed, steps):
+    data = np.frombuffer(packed, dtype=np.uint8)
+    quads = np.stack([data & 3, data >> 2 & 3, data >> 4 & 3, data >> 6 & 3], axis=1)
+    return quads.reshape(-1)[:steps]
+
+
+class EpisodeRecording:
+    """Everything needed to rebuild an episode: the food seed, the grid and 2 bits per step."""
+
+    def __init__(self, seed, grid_width, grid_height, actions, steps=None, score=0, fitness=0.0, genome_key=-1, generation=-1):
+        self.seed = seed
+        self.grid_width = grid_width
+        self.grid_height = grid_height
+        if steps is None:
+            steps = len(actions)
+            actions = pack_actions(actions)
+        self.packed = actions
+        self.steps = steps
+        self.score = score
+        self.fitness = fitness
+        self.genome_key = genome_key
+        self.generation = generation
+
+    def actions(self):
+        return unpack_actions(self.packed, self.steps)
+
+    def to_bytes(self):
+        header = RECORD_HEADER.pack(ARCHIVE_MAGIC, ARCHIVE_VERSION, self.generation, self.genome_key, self.seed,
+                                    self.grid_width, self.grid_height, self.steps, self.score, self.fitness)
+        return header + self.packed
+
+    @classmethod
+    def read(cls, f):
+        """Read the next recording from f, or None at the end of the file."""
+        header = f.read(RECORD_HEADER.size)
+        if len(header) < RECORD_HEADER.size:
+            return None
+        magic, version, generation, key, seed, width, height, steps, score, fitness = RECORD_HEADER.unpack(header)
+        if magic != ARCHIVE_MAGIC or version != ARCHIVE_VERSION:
+            raise ValueError("Not an episode archive record")
+        packed = f.read((steps + 3) // 4)
+        return cls(seed, width, height, packed, steps, score, fitness, key, generation)
+
+
+def read_archive(path):
+    recordings = []
+    with open(path, "rb") as f:
+        while True:
+            recording = EpisodeRecording.read(f)
+            if recording is None:
+                return recordings
+            recordings.append(recording)
+
+
+def append_archive(path, recording):
+    with open(path, "ab") as f:
+        f.write(recording.to_bytes())
+
+
+def _snapshot(game):
+    return (tuple(game.snake), bytes(game.occupancy), list(game.free_cells), game.direction, game.food,
+            game.score, game.game_over, game.death_cause, game.rng.getstate())
+
+
+def _restore(game, snapshot):
+    snake, occupancy, free_cells, direction, food, score, game_over, death_cause, rng_state = snapshot
+    game.snake = deque(snake)
+    game.occupancy = bytearray(occupancy)
+    game.free_cells = list(free_cells)
+    game.free_index = {cell: i for i, cell in enumerate(game.free_cells)}
+    game.direction = direction
+    game.food = food
+    game.score = score
+    game.game_over = game_over
+    game.death_cause = death_cause
+    game.rng.setstate(rng_state)
+
+
+class EpisodeReplay:
+    """Rebuilds a recorded episode frame by frame on a SnakeGame, without the network.
+
+    A snapshot of the game is kept every keyframe_interval steps as they are first
+    reached, so seek() to any step replays at most keyframe_interval moves.
+    """
+
+    def __init__(self, recording, keyframe_interval=KEYFRAME_INTERVAL):
+        self.recording = recording
+        self.actions = recording.actions().tolist()
+        self.keyframe_interval = keyframe_interval
+        self.game = SnakeGame(recording.grid_width, recording.grid_height, rng=random.Random(recording.seed))
+        self.position = 0
+        self.keyframes = {0: _snapshot(self.game)}
+
+    @property
+    def finished(self):
+        return self.position >= len(self.actions)
+
+    def step(self):
+        if self.finished:
+            return
+        self.game.change_direction(ACTION_DIRECTIONS[self.actions[self.position]])
+        self.game.update()
+        self.position += 1
+        if self.position % self.keyframe_interval == 0 and self.position not in self.keyframes:
+            self.keyframes[self.position] = _snapshot(self.game)
+
+    def seek(self, position):
+        position = max(0, min(position, len(self.actions)))
+        keyframe = max(k for k in self.keyframes if k <= position)
+        if not keyframe <= self.position <= position:
+            _restore(self.game, self.keyframes[keyframe])
+            self.position = keyframe
+        while self.position < position:
+            self.step()
+        return self.game
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+import random
+
+import numpy as np
+
+from snake_game.game import GRID_WIDTH, GRID_HEIGHT
+
+# Same index order as ai.ai.DIRECTION_MAP: up, right, down, left
+DIRECTIONS = np.array([(0, -1), (1, 0), (0, 1), (-1, 0)], dtype=np.int64)
+
+# SnakeGame.reset_game draws from [UP, DOWN, LEFT, RIGHT], mapped to DIRECTIONS indices
+RESET_DIRECTIONS = (0, 2, 3, 1)
+
+# The 8 ray directions in compute_state order: N, NE, E, SE, S, SW, W, NW
+RAYS_8 = np.array([(0, -1), (1, -1), (1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1)], dtype=np.int64)
+
+STATE_SIZE = 32
+
+
+class VecSnakeGame:
+    """N independent snake boards stepped together.
+
+    Every board follows the exact rules and random draws of a SnakeGame built with
+    rng=random.Random(seed): bodies live in ring buffers, occupancy in flat grids and
+    empty cells in per-board swap-remove lists that mirror SnakeGame.free_cells.
+    """
+
+    def __init__(self, num_boards, grid_width=GRID_WIDTH, grid_height=GRID_HEIGHT, seeds=None, auto_reset=False):
+        self.num_boards = num_boards
+        self.grid_width = grid_width
+        self.grid_height = grid_height
+        self.num_cells = grid_width * grid_height
+        self.max_dim = max(grid_width, grid_height)
+        self.auto_reset = auto_reset
+
+        n, cells = num_boards, self.num_cells
+        self.occupancy = np.zeros((n, cells), dtype=np.uint8)
+        self.body = np.zeros((n, cells), dtype=np.int64)
+        self.head_ptr = np.zeros(n, dtype=np.int64)
+        self.length = np.zeros(n, dtype=np.int64)
+        self.free_cells = np.zeros((n, cells), dtype=np.int64)
+        self.free_index = np.zeros((n, cells), dtype=np.int64)
+        self.free_count = np.zeros(n, dtype=np.int64)
+        self.direction = np.zeros(n, dtype=np.int64)
+        self.food = np.full(n, -1, dtype=np.int64)
+        self.score = np.zeros(n, dtype=np.int64)
+        self.done = np.zeros(n, dtype=bool)
+        self.ate = np.zeros(n, dtype=bool)
+        self.final_score = np.zeros(n, dtype=np.int64)
+        self._rows = np.arange(n)
+
+        self.reset(seeds)
+
+    def reset(self, seeds=None):
+        if seeds is None:
+            # draw the seeds so every episode can still be replayed from its seed
+            seeds = [random.getrandbits(64) for _ in range(self.num_boards)]
+        elif len(seeds) != self.num_boards:
+            raise ValueError(f"Expected {self.num_boards} seeds, got {len(seeds)}")
+        self.seeds = list(seeds)
+        self.rngs = [random.Random(seed) for seed in seeds]
+        self.reset_boards(self._rows)
+        return self.observe()
+
+    def reset_boards(self, boards):
+        boards = np.asarray(boards, dtype=np.int64)
+        if boards.size == 0:
+            return
+        start = (self.grid_height // 2) * self.grid_width + self.grid_width // 2
+
+        self.occupancy[boards] = 0
+        self.free_cells[boards] = np.arange(self.num_cells)
+        self.free_index[boards] = np.arange(self.num_cells)
+        self.free_count[boards] = self.num_cells
+        self.head_ptr[boards] = 0
+        self.length[boards] = 1
+        self.body[boards, 0] = start
+        self._occupy(boards, np.full(boards.size, start, dtype=np.int64))
+
+        self.score[boards] = 0
+        self.done[boards] = False
+        self.ate[boards] = False
+        for b in boards.tolist():
+            rng = self.rngs[b]
+            self.direction[b] = rng.choice(RESET_DIRECTIONS)
+            self._place_food(b)
+
+    def _occupy(self, boards, cells):
+        self.occupancy[boards, cells] = 1
+        slot = self.free_index[boards, cells]
+        count = self.free_count[boards] - 1
+        last = self.free_cells[boards, count]
+        self.free_cells[boards, slot] = last
+        self.free_index[boards, last] = slot
+        self.free_count[boards] = count
+
+    def _vacate(self, boards, cells):
+        self.occupancy[boards, cells] = 0
+        count = self.free_count[boards]
+        self.free_cells[boards, count] = cells
+        self.free_index[boards, cells] = count
+        self.free_count[boards] = count + 1
+
+    def _place_food(self, b):
+        count = self.free_count[b]
+        if count:
+            self.food[b] = self.rngs[b].choice(self.free_cells[b, :count])
+        else:
+            self.food[b] = -1
+
+    @property
+    def heads(self):
+        return self.body[self._rows, self.head_ptr]
+
+    @property
+    def tails(self):
+        return self.body[self._rows, (self.head_ptr - self.length + 1) % self.num_cells]
+
+    def step(self, actions, boards=None):
+        """Apply one action per board, move every live board (or only the given boards) and observe."""
+        self.move(actions, boards)
+        return self.observe()
+
+    def move(self, actions, boards=None):
+        actions = np.asarray(actions, dtype=np.int64)
+        if boards is None:
+            live = np.flatnonzero(~self.done)
+        else:
+            boards = np.asarray(boards, dtype=np.int64)
+            live = boards[~self.done[boards]]
+        self.ate[:] = False
+
+        if live.size:
+            wanted = actions[live]
+            turn = wanted != (self.direction[live] + 2) % 4
+            self.direction[live[turn]] = wanted[turn]
+
+            head = self.body[live, self.head_ptr[live]]
+            dx, dy = DIRECTIONS[self.direction[live]].T
+            new_x = head % self.grid_width + dx
+            new_y = head // self.grid_width + dy
+            inside = (new_x >= 0) & (new_x < self.grid_width) & (new_y >= 0) & (new_y < self.grid_height)
+            new_head = np.where(inside, new_y * self.grid_width + new_x, 0)
+            crashed = ~inside | (self.occupancy[live, new_head] == 1)
+            self.done[live[crashed]] = True
+
+            moving = live[~crashed]
+            new_head = new_head[~crashed]
+            ptr = (self.head_ptr[moving] + 1) % self.num_cells
+            self.head_ptr[moving] = ptr
+            self.body[moving, ptr] = new_head
+            self._occupy(moving, new_head)
+
+            ate = new_head == self.food[moving]
+            eaters = moving[ate]
+            self.ate[eaters] = True
+            self.score[eaters] += 1
+            self.length[eaters] += 1
+            for b in eaters.tolist():
+                self._place_food(b)
+
+            movers = moving[~ate]
+            tail = self.body[movers, (self.head_ptr[movers] - self.length[movers]) % self.num_cells]
+            self._vacate(movers, tail)
+
+        if self.auto_reset:
+            finished = np.flatnonzero(self.done)
+            self.final_score[finished] = self.score[finished]
+            self.reset_boards(finished)
+
+    def observe(self):
+        width, height, max_dim = self.grid_width, self.grid_height, self.max_dim
+        n = self.num_boards
+        head = self.heads
+        hx = head % width
+        hy = head // width
+
+        states = np.zeros((n, STATE_SIZE), dtype=np.float64)
+
+        # walls: cells left along each ray before leaving the grid
+        right = width - 1 - hx
+        down = height - 1 - hy
+        states[:, 0] = hy
+        states[:, 1] = np.minimum(right, hy)
+        states[:, 2] = right
+        states[:, 3] = np.minimum(right, down)
+        states[:, 4] = down
+        states[:, 5] = np.minimum(hx, down)
+        states[:, 6] = hx
+        states[:, 7] = np.minimum(hx, hy)
+        states[:, 0:8] /= max_dim
+
+        # food: compute_state treats a missing food as (-1, -1)
+        has_food = self.food >= 0
+        fx = np.where(has_food, self.food % width, -1)
+        fy = np.where(has_food, self.food // width, -1)
+        diff_x = (fx - hx)[:, None]
+        diff_y = (fy - hy)[:, None]
+        ray_dx, ray_dy = RAYS_8[:, 0], RAYS_8[:, 1]
+        along_x = diff_x * ray_dx
+        along_y = diff_y * ray_dy
+        reach = np.where(ray_dx == 0, along_y, along_x)
+        on_ray = np.where(ray_dx == 0, diff_x == 0, np.where(ray_dy == 0, diff_y == 0, along_x == along_y))
+        food_hit = on_ray & (reach > 0)
+        states[:, 8:16] = np.where(food_hit, reach, 0) / max_dim
+
+        # body: first occupied cell along each ray, the head itself sits at distance 0
+        found = np.zeros((n, 8), dtype=np.int64)
+        rows = np.arange(n)[:, None]
+        for k in range(1, max_dim):
+            x = hx[:, None] + k * ray_dx
+            y = hy[:, None] + k * ray_dy
+            inside = (x >= 0) & (x < width) & (y >= 0) & (y < height)
+            if not inside.any():
+                break
+            cells = np.where(inside, y * width + x, 0)
+            hit = inside & (found == 0) & (self.occupancy[rows, cells] == 1)
+            found[hit] = k
+        states[:, 16:24] = found / max_dim
+
+        states[rows[:, 0], 24 + self.direction] = 1
+
+        tail = self.tails
+        tdx = tail % width - hx
+        tdy = tail // width - hy
+        horizontal = np.abs(tdx) >= np.abs(tdy)
+        tail_dir = np.full(n, -1, dtype=np.int64)
+        tail_dir[(tdx > 0) & horizontal] = 1
+        tail_dir[(tdx < 0) & horizontal] = 3
+        tail_dir[(tdy > 0) & ~horizontal] = 2
+        tail_dir[(tdy < 0) & ~horizontal] = 0
+        # abs(tdx) >= abs(tdy) with tdx == 0 forces tdy == 0, a length-one snake
+        has_tail = tail_dir >= 0
+        states[rows[has_tail, 0], 28 + tail_dir[has_tail]] = 1
+
+        if not self.auto_reset:
+            states[self.done] = 0
+        return states
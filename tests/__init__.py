@@ -0,0 +1,60 @@
+"""Seeded parity checks of the fast paths against the implementations they replace.
+
+    python -m pytest tests
+"""
+import os
+import random
+import warnings
+import functools
+
+from ai.parallel import load_config
+from bench.boards import synthetic_genome
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@functools.lru_cache(maxsize=None)
+def neat_config():
+    # config.txt leaves some options at neat's defaults, which neat warns about
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DeprecationWarning)
+        return load_config(os.path.join(PROJECT_DIR, "config.txt"))
+
+
+def genes(genome):
+    """Every gene attribute of genome, for comparing copies."""
+    return ({key: (ng.bias, ng.response, ng.activation, ng.aggregation) for key, ng in genome.nodes.items()},
+            {key: (cg.weight, cg.enabled) for key, cg in genome.connections.items()})
+
+
+def sample_genomes(count, seed=0, max_hidden=12):
+    """count (key, genome) pairs with 0 to max_hidden hidden nodes, the same for a given seed."""
+    genomes = []
+    for key in range(count):
+        genome = synthetic_genome(neat_config(), key % (max_hidden + 1), seed * 1000 + key)
+        genome.key = key
+        genomes.append((key, genome))
+    return genomes
+
+
+def playing_genomes(count, seed=0):
+    """sample_genomes with links wired in to steer at food in line and away from walls, never back.
+
+    Their episodes run from a few steps to past MAX_STEPS_WITHOUT_FOOD, where the
+    random genomes all crash within a few steps.
+    """
+    genome_config = neat_config().genome_config
+    inputs, outputs = genome_config.input_keys, genome_config.output_keys
+    rng = random.Random(seed)
+    genomes = sample_genomes(count, seed)
+    for _, genome in genomes:
+        for cg in genome.connections.values():
+            cg.weight *= 0.05
+        # inputs 0-7 are wall distances and 8-15 food distances along N, NE, E, ..., 24-27 the heading
+        for direction, output in enumerate(outputs):
+            for source, weight in ((8 + 2 * direction, 4.0), (2 * direction, 3.0), (24 + (direction + 2) % 4, -10.0)):
+                key = (inputs[source], output)
+                cg = genome.create_connection(genome_config, *key)
+                cg.weight = weight + rng.gauss(0.0, 0.3)
+                genome.connections[key] = cg
+    return genomes
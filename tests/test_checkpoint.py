@@ -0,0 +1,80 @@
+import random
+import shutil
+import tempfile
+import unittest
+
+import neat
+
+from ai.checkpoint import Checkpointer, load_latest, list_checkpoints
+from ai.lockstep import eval_genomes_lockstep
+from tests import neat_config, genes
+
+
+def evaluate(genomes, config):
+    # one fixed board for everyone keeps the fitness a function of the genome alone
+    eval_genomes_lockstep(genomes, config, [7] * len(genomes))
+
+
+def run(population, generations):
+    """(key, fitness) of every genome evaluated, generation by generation."""
+    history = []
+    for _ in range(generations):
+        population.run(evaluate, 1)
+        history.append(sorted((key, genome.fitness) for key, genome in population.population.items()))
+    return history
+
+
+class CheckpointTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.state = random.getstate()
+        random.seed(8)
+
+    def tearDown(self):
+        random.setstate(self.state)
+        shutil.rmtree(self.directory)
+
+    def test_round_trip_resumes_the_same_run(self):
+        population = neat.Population(neat_config())
+        run(population, 2)
+        checkpointer = Checkpointer(self.directory, keep=2)
+        checkpointer.save(population, population.best_genome)
+        checkpointer.wait()
+        expected = run(population, 3)
+
+        state = load_latest(self.directory)
+        restored = state["population"]
+        self.assertEqual(state["generation"], 2)
+        self.assertEqual(restored.generation, 2)
+        self.assertEqual(run(restored, 3), expected)
+
+    def test_genomes_and_species_survive(self):
+        population = neat.Population(neat_config())
+        run(population, 2)
+        checkpointer = Checkpointer(self.directory)
+        checkpointer.finish(population, population.best_genome)
+
+        restored = load_latest(self.directory, restore_random=False)["population"]
+        self.assertEqual(sorted(restored.population), sorted(population.population))
+        for key, genome in population.population.items():
+            self.assertEqual(genes(restored.population[key]), genes(genome))
+            self.assertEqual(restored.population[key].fitness, genome.fitness)
+        for key, species in population.species.species.items():
+            members = restored.species.species[key].members
+            self.assertEqual(sorted(members), sorted(species.members))
+            # species members are the population's genomes, not copies
+            for member in members:
+                self.assertIs(members[member], restored.population[member])
+
+    def test_keeps_the_newest(self):
+        population = neat.Population(neat_config())
+        checkpointer = Checkpointer(self.directory, keep=2)
+        for _ in range(4):
+            run(population, 1)
+            checkpointer.save(population, population.best_genome)
+        checkpointer.close()
+        self.assertEqual([generation for generation, _ in list_checkpoints(self.directory)], [3, 4])
+
+
+if __name__ == "__main__":
+    unittest.main()
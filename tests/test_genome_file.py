@@ -0,0 +1,54 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from ai.genome_file import GenomeFile, write_genomes, read_genomes
+from ai.network import CompiledNetwork
+from tests import neat_config, sample_genomes, genes
+
+
+class GenomeFileTest(unittest.TestCase):
+    def setUp(self):
+        self.config = neat_config()
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "population.sng")
+        self.genomes = [genome for _, genome in sample_genomes(20, seed=10)]
+        for genome in self.genomes:
+            genome.fitness = genome.key * 1.5 - 3.0
+        self.genomes[0].fitness = None
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_round_trip(self):
+        write_genomes(self.path, self.genomes, {"generation": 12})
+        restored, metadata = read_genomes(self.path, self.config)
+        self.assertEqual(metadata, {"generation": 12})
+        self.assertEqual([genome.key for genome in restored], [genome.key for genome in self.genomes])
+        for genome, copy in zip(self.genomes, restored):
+            self.assertEqual(genes(copy), genes(genome))
+            self.assertEqual(copy.fitness, genome.fitness)
+            self.assertIsInstance(copy, self.config.genome_type)
+
+    def test_memory_mapped_genome_by_key(self):
+        write_genomes(self.path, self.genomes)
+        gf = GenomeFile(self.path)
+        self.assertEqual(len(gf), len(self.genomes))
+        genome = self.genomes[7]
+        copy = gf.genome_by_key(genome.key, self.config)
+        self.assertEqual(genes(copy), genes(genome))
+        state = [0.25] * self.config.genome_config.num_inputs
+        self.assertEqual(CompiledNetwork.create(copy, self.config).activate(state),
+                         CompiledNetwork.create(genome, self.config).activate(state))
+        del copy, gf
+
+    def test_rejects_other_files(self):
+        with open(self.path, "wb") as f:
+            f.write(b"\0" * 64)
+        with self.assertRaises(ValueError):
+            GenomeFile(self.path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import random
+import unittest
+
+import numpy as np
+
+from ai.ai import run_episode, new_training_game
+from ai.network import CompiledNetwork
+from ai.lockstep import LockstepEpisodes, group_networks
+from ai.seeding import SeedSchedule, MultiSeedEvaluator
+from tests import neat_config, playing_genomes
+
+
+class LockstepTest(unittest.TestCase):
+    def setUp(self):
+        self.config = neat_config()
+        self.genomes = playing_genomes(40, seed=4)
+        self.nets = [CompiledNetwork.create(genome, self.config) for _, genome in self.genomes]
+        rng = random.Random(5)
+        self.seeds = [rng.getrandbits(32) for _ in self.nets]
+
+    def test_matches_run_episode(self):
+        episodes = LockstepEpisodes(self.nets, self.seeds, record=True)
+        episodes.advance()
+        self.assertFalse(episodes.running.any())
+        recorded = episodes.recorded_actions()
+        for board, (net, seed) in enumerate(zip(self.nets, self.seeds)):
+            game = new_training_game(random.Random(seed))
+            actions = bytearray()
+            self.assertAlmostEqual(episodes.fitness[board], run_episode(net, game, actions), places=9)
+            self.assertEqual(recorded[board], bytes(actions))
+            self.assertEqual(int(episodes.games.score[board]), game.score)
+
+    def test_multi_seed_evaluator_batched_matches_sequential(self):
+        schedule = SeedSchedule(6, episodes=3)
+        batched = playing_genomes(40, seed=4)
+        sequential = playing_genomes(40, seed=4)
+        MultiSeedEvaluator(schedule)(batched, self.config)
+        MultiSeedEvaluator(schedule, batched=False)(sequential, self.config)
+        for (_, a), (_, b) in zip(batched, sequential):
+            self.assertAlmostEqual(a.fitness, b.fitness, places=9)
+
+    def test_pause_and_resume(self):
+        whole = LockstepEpisodes(self.nets, self.seeds, record=True)
+        whole.advance()
+
+        paused = LockstepEpisodes(self.nets, self.seeds, record=True)
+        paused.advance(max_steps=10)
+        self.assertTrue((paused.steps <= 10).all())
+        paused.advance(boards=np.arange(0, len(self.nets), 2), max_steps=40)
+        paused.advance(boards=np.arange(1, len(self.nets), 2))
+        paused.advance()
+
+        np.testing.assert_array_equal(paused.fitness, whole.fitness)
+        np.testing.assert_array_equal(paused.steps, whole.steps)
+        np.testing.assert_array_equal(paused.games.score, whole.games.score)
+        self.assertEqual(paused.recorded_actions(), whole.recorded_actions())
+
+    def test_groups_cover_every_network_once(self):
+        groups = group_networks(self.nets)
+        members = sorted(member for group in groups for member in group.members.tolist())
+        self.assertEqual(members, list(range(len(self.nets))))
+        states = np.random.default_rng(7).uniform(-1.0, 1.0, (len(self.nets), self.nets[0].num_inputs))
+        for group in groups:
+            outputs = group.activate(states[group.members])
+            for member, output in zip(group.members.tolist(), outputs):
+                np.testing.assert_allclose(output, self.nets[member].activate(states[member].tolist()), rtol=1e-12, atol=1e-12)
+
+
+if __name__ == "__main__":
+    unittest.main()
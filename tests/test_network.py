@@ -0,0 +1,52 @@
+import random
+import unittest
+
+import numpy as np
+import neat
+
+from ai.network import CompiledNetwork
+from tests import neat_config, sample_genomes
+
+
+class CompiledNetworkTest(unittest.TestCase):
+    def setUp(self):
+        self.config = neat_config()
+        self.genomes = [genome for _, genome in sample_genomes(26, seed=1)]
+        rng = random.Random(2)
+        self.states = [[rng.uniform(-1.0, 1.0) for _ in range(self.config.genome_config.num_inputs)] for _ in range(20)]
+
+    def test_activate_matches_neat(self):
+        for genome in self.genomes:
+            reference = neat.nn.FeedForwardNetwork.create(genome, self.config)
+            net = CompiledNetwork.create(genome, self.config)
+            for state in self.states:
+                self.assertEqual(net.activate(state), reference.activate(state))
+
+    def test_activate_batch_matches_neat(self):
+        for genome in self.genomes:
+            reference = neat.nn.FeedForwardNetwork.create(genome, self.config)
+            net = CompiledNetwork.create(genome, self.config)
+            expected = [reference.activate(state) for state in self.states]
+            np.testing.assert_allclose(net.activate_batch(self.states), expected, rtol=1e-12, atol=1e-12)
+
+    def test_patched_matches_a_fresh_compile(self):
+        genome = self.genomes[12]
+        other = self.config.genome_type(99)
+        other.nodes = {key: ng.copy() for key, ng in genome.nodes.items()}
+        other.connections = {key: cg.copy() for key, cg in genome.connections.items()}
+        rng = random.Random(3)
+        for cg in other.connections.values():
+            cg.weight = rng.uniform(-2.0, 2.0)
+        patched = CompiledNetwork.create(genome, self.config).patched(other)
+        compiled = CompiledNetwork.create(other, self.config)
+        for state in self.states:
+            self.assertEqual(patched.activate(state), compiled.activate(state))
+
+    def test_wrong_input_count(self):
+        net = CompiledNetwork.create(self.genomes[0], self.config)
+        with self.assertRaises(RuntimeError):
+            net.activate([0.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
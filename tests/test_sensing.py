@@ -0,0 +1,111 @@
+import random
+import unittest
+
+import numpy as np
+
+from snake_game.game import SnakeGame
+from snake_game.bitboard import BitboardSnakeGame
+from snake_game.vec_game import VecSnakeGame
+from ai.ai import DIRECTION_MAP, compute_state
+from ai.sensing import DIRECTIONS_8
+
+BOARD_SIZES = ((10, 10), (7, 12), (16, 16))
+
+
+def reference_state(game):
+    """The 32 inputs found by walking every ray cell by cell, the way compute_state used to."""
+    head_x, head_y = game.snake[0]
+    max_dim = max(game.grid_width, game.grid_height)
+    body = set(list(game.snake)[1:])
+    walls, food, hits = [], [], []
+    for dx, dy in DIRECTIONS_8:
+        x, y, steps = head_x + dx, head_y + dy, 1
+        food_steps = body_steps = 0
+        while 0 <= x < game.grid_width and 0 <= y < game.grid_height:
+            if (x, y) == game.food:
+                food_steps = steps
+            if (x, y) in body and not body_steps:
+                body_steps = steps
+            x, y, steps = x + dx, y + dy, steps + 1
+        walls.append((steps - 1) / max_dim)
+        food.append(food_steps / max_dim)
+        hits.append(body_steps / max_dim)
+
+    current = [int(game.direction == DIRECTION_MAP[i]) for i in range(4)]
+    tail_x, tail_y = game.snake[-1][0] - head_x, game.snake[-1][1] - head_y
+    tail = [0, 0, 0, 0]
+    if abs(tail_x) >= abs(tail_y) and tail_x:
+        tail[1 if tail_x > 0 else 3] = 1
+    elif tail_y:
+        tail[2 if tail_y > 0 else 0] = 1
+    return walls + food + hits + current + tail
+
+
+def choose_action(game, rng):
+    """A seeded policy that mostly heads for the food and avoids walls and its own body, so snakes grow long."""
+    head_x, head_y = game.snake[0]
+    body = set(game.snake)
+    safe = []
+    for action, (dx, dy) in DIRECTION_MAP.items():
+        x, y = head_x + dx, head_y + dy
+        if (dx, dy) != (-game.direction[0], -game.direction[1]) and 0 <= x < game.grid_width \
+                and 0 <= y < game.grid_height and (x, y) not in body:
+            safe.append(action)
+    if not safe:
+        return rng.randrange(4)
+    if game.food is not None and rng.random() < 0.8:
+        food_x, food_y = game.food
+        return min(safe, key=lambda a: abs(head_x + DIRECTION_MAP[a][0] - food_x) + abs(head_y + DIRECTION_MAP[a][1] - food_y))
+    return rng.choice(safe)
+
+
+class SensorTest(unittest.TestCase):
+    def play(self, game_type, width, height, seed):
+        game = game_type(width, height, rng=random.Random(seed))
+        rng = random.Random(seed + 1)
+        while not game.is_game_over():
+            yield game
+            game.change_direction(DIRECTION_MAP[choose_action(game, rng)])
+            game.update()
+
+    def test_matches_reference(self):
+        for width, height in BOARD_SIZES:
+            for seed in range(20):
+                for game in self.play(SnakeGame, width, height, seed):
+                    self.assertEqual(compute_state(game), reference_state(game))
+
+    def test_bitboard_plays_and_senses_like_snake_game(self):
+        for width, height in BOARD_SIZES:
+            for seed in range(20):
+                games = zip(self.play(SnakeGame, width, height, seed), self.play(BitboardSnakeGame, width, height, seed))
+                for game, bitboard in games:
+                    self.assertEqual(list(bitboard.snake), list(game.snake))
+                    self.assertEqual(bitboard.food, game.food)
+                    self.assertEqual(compute_state(bitboard), compute_state(game))
+
+
+class VecSnakeGameTest(unittest.TestCase):
+    def test_matches_snake_game(self):
+        for width, height in BOARD_SIZES:
+            seeds = list(range(30))
+            games = [SnakeGame(width, height, rng=random.Random(seed)) for seed in seeds]
+            vec = VecSnakeGame(len(seeds), width, height, seeds=seeds)
+            rngs = [random.Random(seed + 1) for seed in seeds]
+            states = vec.observe()
+            while not vec.done.all():
+                actions = np.zeros(len(games), dtype=np.int64)
+                for board, game in enumerate(games):
+                    self.assertEqual(bool(vec.done[board]), game.is_game_over())
+                    if game.is_game_over():
+                        continue
+                    self.assertEqual(states[board].tolist(), compute_state(game))
+                    self.assertEqual(int(vec.score[board]), game.score)
+                    actions[board] = choose_action(game, rngs[board])
+                    game.change_direction(DIRECTION_MAP[int(actions[board])])
+                    game.update()
+                states = vec.step(actions)
+            self.assertTrue(all(game.is_game_over() for game in games))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -51,6 +51,96 @@ def draw_snake_game(surface, game, game_area, window_height, cell_size):
 
     surface.blit(game_surface, (0, offset_y))
     
+# gradient steps GameRenderer paints long snakes with, a move then recolours one cell per band
+GRADIENT_BANDS = 32
+
+def snake_palette(length, bands=None):
+    """The head-to-tail hue gradient of draw_snake_game, in at most bands steps if given."""
+    if bands is None or length <= bands:
+        steps, last = range(length), max(length - 1, 1)
+    else:
+        steps, last = [i * bands // length for i in range(length)], bands - 1
+    palette = []
+    for step in steps:
+        color = pg.Color(0)
+        color.hsva = (60 + 240 * step / last, 100, 100, 100)
+        palette.append(tuple(color))
+    return palette
+
+class GameRenderer:
+    """Draws a game onto a persistent surface, repainting only the cells that changed.
+
+    The background and border are rendered once per grid, and the gradient palette once
+    per snake length. draw() compares each cell's colour with the last frame, so a
+    step repaints the new head and vacated tail, the old and new food, and the body
+    cells whose gradient colour moved along. With the exact gradient that is every
+    body cell, so snakes longer than bands get a stepped one. draw() returns the
+    changed screen rects for pg.display.update(rects). Call invalidate() after
+    anything else paints over the game area.
+    """
+
+    def __init__(self, surface, game_area, window_height, bands=GRADIENT_BANDS):
+        self.surface = surface
+        self.game_area = game_area
+        self.window_height = window_height
+        self.bands = bands
+        self.palettes = {}
+        self.grid = None
+        self.cells = {}
+        self.full = True
+
+    def invalidate(self):
+        self.full = True
+
+    def _layout(self, game):
+        self.grid = (game.grid_width, game.grid_height)
+        self.cell_size = self.game_area // game.grid_width
+        width = game.grid_width * self.cell_size
+        height = game.grid_height * self.cell_size
+        self.offset_y = (self.window_height - height) // 2
+        self.rect = pg.Rect(0, self.offset_y, width, height)
+        self.background = pg.Surface((width, height))
+        self.background.fill(BACKGROUND)
+        pg.draw.rect(self.background, HIGHLIGHT_MAIN, (0, 0, width, height), 3)
+
+    def palette(self, length):
+        palette = self.palettes.get(length)
+        if palette is None:
+            palette = self.palettes[length] = snake_palette(length, self.bands)
+        return palette
+
+    def draw(self, game):
+        if (game.grid_width, game.grid_height) != self.grid:
+            self._layout(game)
+            self.full = True
+
+        cells = dict(zip(game.snake, self.palette(len(game.snake))))
+        if game.food:
+            cells[game.food] = FOOD_RED
+
+        size = self.cell_size
+        offset_y = self.offset_y
+        surface = self.surface
+        full = self.full
+        if full:
+            surface.blit(self.background, self.rect)
+            changed, vacated = cells, ()
+        else:
+            previous = self.cells
+            changed = {cell: color for cell, color in cells.items() if previous.get(cell) != color}
+            vacated = previous.keys() - cells.keys()
+
+        rects = []
+        for x, y in vacated:
+            area = pg.Rect(x * size, y * size, size, size)
+            rects.append(surface.blit(self.background, (area.x, area.y + offset_y), area))
+        for (x, y), color in changed.items():
+            rects.append(surface.fill(color, (x * size, y * size + offset_y, size, size)))
+
+        self.cells = cells
+        self.full = False
+        return [self.rect] if full else rects
+
 def draw_info_panel(surface, score, best_score, info, app):
     surface.fill(BACKGROUND)
     
@@ -81,29 +171,37 @@ def draw_main_menu(surface, window_width, window_height):
     pg.display.update()
     
 def compute_node_depths(genome, config):
+    """Longest path from the inputs to every node they reach over enabled connections.
+
+    A topological (Kahn) pass, so each connection is visited once. Nodes on a cycle
+    are never ready and keep the depth their other inputs gave them, if any.
+    """
+    outgoing = {}
+    indegree = {}
+    for conn in genome.connections.values():
+        if not conn.enabled:
+            continue
+        src, tgt = conn.key
+        outgoing.setdefault(src, []).append(tgt)
+        indegree[tgt] = indegree.get(tgt, 0) + 1
+    
     depths = {node: 0 for node in config.genome_config.input_keys}
-    changed = True
-    while changed:
-        changed = False
-        for conn in genome.connections.values():
-            if not conn.enabled:
-                continue
-            src, tgt = conn.key
-            if src in depths:
-                new_depth = depths[src] + 1
-                if new_depth > depths.get(tgt, -1):
-                    depths[tgt] = new_depth
-                    changed = True
+    ready = [node for node in outgoing if node not in indegree]
+    while ready:
+        src = ready.pop()
+        for tgt in outgoing.get(src, ()):
+            if src in depths and depths[src] + 1 > depths.get(tgt, -1):
+                depths[tgt] = depths[src] + 1
+            indegree[tgt] -= 1
+            if not indegree[tgt]:
+                ready.append(tgt)
     return depths
 
-def draw_neural_net(surface, genome, config, neural_net_width, neural_net_height):
-    surface.fill(SECONDARY_PANELS)
-    all_nodes = set(genome.nodes.keys())
+def net_layout(genome, config, neural_net_width, neural_net_height):
+    """Panel position of every node, one column per depth."""
     depths = compute_node_depths(genome, config)
-    
-    for node in all_nodes:
-        if node not in depths:
-            depths[node] = 0
+    for node in genome.nodes:
+        depths.setdefault(node, 0)
         
     layers = {}
     for node, depth in depths.items():
@@ -120,6 +218,12 @@ def draw_neural_net(surface, genome, config, neural_net_width, neural_net_height
         for i, node in enumerate(sorted(nodes)):
             y = spacing * (i + 1)
             positions[node] = (x, y)
+    return positions
+
+def draw_neural_net(surface, genome, config, neural_net_width, neural_net_height, positions=None):
+    surface.fill(SECONDARY_PANELS)
+    if positions is None:
+        positions = net_layout(genome, config, neural_net_width, neural_net_height)
     
     for conn in genome.connections.values():
         if not conn.enabled:
@@ -134,6 +238,66 @@ def draw_neural_net(surface, genome, config, neural_net_width, neural_net_height
     
     for node, pos in positions.items():
         pg.draw.circle(surface, TEXT, (int(pos[0]), int(pos[1])), 10)
+
+class NetPanel:
+    """The neural net panel, laid out and rendered once per genome and panel size.
+
+    draw() blits the cached surface only when it was rebuilt, when redraw is set or
+    while activation highlights are shown. activations maps node keys to their
+    values this frame; those nodes are tinted by magnitude on top of the cached
+    surface, so a frame costs the same however large the genome is.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.genome = None
+        self.size = None
+        self.positions = {}
+        self.surface = None
+        self.overlaid = False
+
+    def draw(self, target, dest, genome, neural_net_width, neural_net_height, activations=None, redraw=False):
+        size = (neural_net_width, neural_net_height)
+        if genome is not self.genome or size != self.size:
+            self.genome, self.size = genome, size
+            self.positions = net_layout(genome, self.config, neural_net_width, neural_net_height)
+            self.surface = pg.Surface((neural_net_width, neural_net_height))
+            draw_neural_net(self.surface, genome, self.config, neural_net_width, neural_net_height, self.positions)
+            redraw = True
+        
+        if not (redraw or activations or self.overlaid):
+            return []
+        rect = target.blit(self.surface, dest)
+        self.overlaid = bool(activations)
+        if activations:
+            positions = self.positions
+            for node, value in activations.items():
+                if node in positions:
+                    x, y = positions[node]
+                    intensity = min(1.0, abs(value))
+                    color = [int(t + (h - t) * intensity) for t, h in zip(TEXT, HIGHLIGHT_MAIN)]
+                    pg.draw.circle(target, color, (int(x) + rect.x, int(y) + rect.y), 10)
+        return [rect]
+    
+def draw_game_frame(app, info, info_height=None):
+    """Draw the game through app.renderer plus the info panel, returning the rects to update."""
+    full = app.renderer.full
+    if full:
+        app.screen.fill(BACKGROUND)
+    rects = app.renderer.draw(app.game)
+    
+    info_surface = pg.Surface((app.INFO_AREA_WIDTH, info_height or app.INFO_AREA_HEIGHT))
+    draw_info_panel(info_surface, app.game.score, app.best_score, info, app)
+    rects.append(app.screen.blit(info_surface, (app.GAME_AREA, 0)))
+    return [app.screen.get_rect()] if full else rects
+
+def draw_replay_frame(app, genome, info, neural_net_width, neural_net_height, activations=None):
+    # the net panel covers the info panel from y 80 down, so the info above it is all that is redrawn
+    full = app.renderer.full
+    rects = draw_game_frame(app, info, info_height=80)
+    rects += app.net_panel.draw(app.screen, (app.GAME_AREA, 80), genome, neural_net_width, neural_net_height,
+                                activations, redraw=full)
+    return rects
     
 def draw_progress_bar(surface, current, total, font, WINDOW_WIDTH, WINDOW_HEIGHT):
     gen_text = f"Gen: {current}/{total}"
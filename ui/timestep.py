@@ -0,0 +1,64 @@
+import time
+
+import pygame as pg
+
+# simulation speed multipliers, None runs as many ticks as fit in a frame
+SPEEDS = (1, 4, 16, None)
+
+
+class FixedTimestep:
+    """Decouples simulation ticks from render frames.
+
+    ticks() yields once for every tick due since the last frame at tick_rate times
+    the current speed, so a render loop steps the simulation that many times and
+    draws once. Lag is capped at max_lag seconds of ticks so a stalled frame does not
+    turn into a burst. At max speed it keeps yielding until frame_seconds have
+    passed. handle_key() steps through speeds with - and +.
+    """
+
+    def __init__(self, tick_rate, speeds=SPEEDS, speed_index=0, frame_seconds=1 / 60, max_lag=0.25):
+        self.tick_rate = tick_rate
+        self.speeds = speeds
+        self.speed_index = speed_index
+        self.frame_seconds = frame_seconds
+        self.max_lag = max_lag
+        self.reset()
+
+    @property
+    def speed(self):
+        return self.speeds[self.speed_index]
+
+    @property
+    def label(self):
+        return "max" if self.speed is None else f"{self.speed}x"
+
+    def reset(self):
+        self.last = time.perf_counter()
+        self.accumulator = 0.0
+
+    def handle_key(self, key):
+        """Change speed on - or +, returning whether key was one of them."""
+        if key in (pg.K_MINUS, pg.K_KP_MINUS):
+            self.speed_index = max(0, self.speed_index - 1)
+        elif key in (pg.K_EQUALS, pg.K_PLUS, pg.K_KP_PLUS):
+            self.speed_index = min(len(self.speeds) - 1, self.speed_index + 1)
+        else:
+            return False
+        self.accumulator = 0.0
+        return True
+
+    def ticks(self):
+        clock = time.perf_counter
+        now = clock()
+        elapsed, self.last = now - self.last, now
+        if self.speed is None:
+            deadline = now + self.frame_seconds
+            while clock() < deadline:
+                yield
+            return
+
+        rate = self.tick_rate * self.speed
+        self.accumulator = min(self.accumulator + elapsed * rate, max(1.0, self.max_lag * rate))
+        while self.accumulator >= 1.0:
+            self.accumulator -= 1.0
+            yield